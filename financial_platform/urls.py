@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from stocks import views as stocks_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('stocks/', include('stocks.urls')),
+    path('metrics', stocks_views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -1,13 +1,30 @@
 from django.contrib import admin
-from .models import Company, StockData
+from .models import Company, CompanySummary, CorporateAction, StockData
+
 
 @admin.register(Company)
 class CompanyAdmin(admin.ModelAdmin):
     list_display = ['symbol', 'name', 'sector']
     search_fields = ['symbol', 'name']
 
+
 @admin.register(StockData)
 class StockDataAdmin(admin.ModelAdmin):
     list_display = ['company', 'date', 'close_price', 'daily_return', 'volume']
     list_filter = ['company', 'date']
-    date_hierarchy = 'date'
\ No newline at end of file
+    date_hierarchy = 'date'
+    ordering = ['-date']
+
+
+@admin.register(CompanySummary)
+class CompanySummaryAdmin(admin.ModelAdmin):
+    list_display = ['company', 'current_price', 'week_52_high', 'week_52_low', 'last_updated']
+    search_fields = ['company__symbol', 'company__name']
+
+
+@admin.register(CorporateAction)
+class CorporateActionAdmin(admin.ModelAdmin):
+    list_display = ['company', 'ex_date', 'kind', 'value', 'cumulative_factor']
+    list_filter = ['kind']
+    search_fields = ['company__symbol']
+    ordering = ['company', '-ex_date']
@@ -1,12 +1,29 @@
+import math
+
+import numpy as np
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Avg, Max, Min
-from .models import Company, StockData
+from django.db.models import Avg, F
+from django.utils.dateparse import parse_date
+from .models import Company, CompanySummary, StockData
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, encode_cursor, keyset_page, keyset_slice
 from .serializers import *
+from .services.analytics import (
+    INSIGHT_FIELDS, compare_panel, format_insights, frame_columns, insights_frame, load_recent_panel, panel_frame,
+)
+from .services.adjustments import adjust_series
+from .services.backtest import MAX_COST_BPS, Rule, load_universe, parse_parameters, run_backtest, run_grid
+from .services.cache import cached_api_view, split_symbols
+from .services.correlation import CORRELATION_WINDOWS, DEFAULT_WINDOW, matrix_npz, top_peers
+from .services.export import EXPORT_FORMATS, export_chunks
+from .services.columnar_store import COLUMN_DTYPES, get_store, series_to_json
+from .services.summaries import refresh_company_summary
 
 
 @api_view(['GET'])
+@cached_api_view
 def companies_list(request):
     """Returns a list of all available companies"""
     companies = Company.objects.all()
@@ -14,62 +31,270 @@ def companies_list(request):
     return Response(serializer.data)
 
 
+# Query parameters that switch /api/data/ from the latest-30 view to ranged pages
+RANGE_PARAMS = ('start', 'end', 'fields', 'limit', 'cursor', 'order', 'adjusted')
+
+
+def _bad_request(message):
+    return Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _parse_symbols(request):
+    """?symbols=A,B,C as a list; the response cache keys on the same parsing"""
+    return split_symbols(request.GET.getlist('symbols'))
+
+
+def _missing_companies(symbols, known=None):
+    """404 response naming the symbols without a Company (known: symbols already loaded), or None"""
+    if known is None:
+        known = set(Company.objects.filter(symbol__in=symbols).values_list('symbol', flat=True))
+    missing = [symbol for symbol in symbols if symbol not in known]
+    if missing:
+        return Response(
+            {"error": f"Companies not found: {', '.join(missing)}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return None
+
+
+def _parse_dates(params):
+    """Parse ?start=/?end=, returns ({param: date} for those given, error response)"""
+    dates = {}
+    for param in ('start', 'end'):
+        if params.get(param):
+            try:
+                dates[param] = parse_date(params[param])
+            except ValueError:  # well formed but impossible, e.g. 2024-02-30
+                dates[param] = None
+            if dates[param] is None:
+                return None, _bad_request(f"{param} must be a date in YYYY-MM-DD format")
+    return dates, None
+
+
+def _parse_fields(params):
+    """Parse ?fields= (default: every column), returns (fields, error response)"""
+    if not params.get('fields'):
+        return STOCK_DATA_COLUMNS, None
+    try:
+        return parse_fields(params['fields']), None
+    except ValueError as e:
+        return None, _bad_request(str(e))
+
+
 @api_view(['GET'])
+@cached_api_view
 def stock_data(request, symbol):
-    """Returns last 30 days of stock data for a company"""
+    """Returns last 30 days of stock data for a company
+
+    ?layout=columns returns one company header and an array per field
+    instead of a list of row objects.
+
+    Any of ?start=&end= (YYYY-MM-DD), ?fields=a,b, ?limit=, ?order=asc|desc or
+    ?cursor= returns a page of the requested range instead, with a
+    next_cursor to pass back for the following page. ?adjusted=1 returns
+    those pages adjusted for splits and dividends.
+    """
+    layout = request.GET.get('layout', 'rows')
+    if layout not in ('rows', 'columns'):
+        return _bad_request("layout must be 'rows' or 'columns'")
+
     try:
         company = Company.objects.get(symbol=symbol)
-        stock_data = StockData.objects.filter(company=company).order_by('-date')[:30]
-        serializer = StockDataSerializer(stock_data, many=True)
-        return Response(serializer.data)
     except Company.DoesNotExist:
         return Response(
             {"error": f"Company with symbol '{symbol}' not found"},
             status=status.HTTP_404_NOT_FOUND
         )
 
+    if any(param in request.GET for param in RANGE_PARAMS):
+        return _stock_data_page(request, company, layout)
+
+    stock_data = StockData.objects.filter(company=company).order_by('-date')[:30]
+
+    if layout == 'columns':
+        series = _stored_series(company, STOCK_DATA_COLUMNS)
+        if series is not None:
+            latest = {field: values[-30:][::-1] for field, values in series.items()}
+            return Response(_series_payload(company, latest, STOCK_DATA_COLUMNS, layout))
+        return Response(serialize_columns(company, list(column_values(stock_data))))
+
+    serializer = StockDataSerializer(stock_data.select_related('company'), many=True)
+    return Response(serializer.data)
+
+
+def _stock_data_page(request, company, layout):
+    """One keyset-paginated page of a company's history"""
+    params = request.GET
+
+    dates, error = _parse_dates(params)
+    if error:
+        return error
+    # date is always returned; it is the pagination key
+    fields, error = _parse_fields(params)
+    if error:
+        return error
+
+    order = params.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        return _bad_request("order must be 'asc' or 'desc'")
+
+    adjusted = params.get('adjusted', '0')
+    if adjusted not in ('0', '1'):
+        return _bad_request("adjusted must be 0 or 1")
+    adjusted = adjusted == '1'
+
+    try:
+        limit = int(params.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return _bad_request("limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return _bad_request(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    series = _stored_series(company, fields, dates.get('start'), dates.get('end'))
+    if series is not None:
+        try:
+            page = keyset_slice(series, order=order, cursor=params.get('cursor'), limit=limit)
+        except InvalidCursor as e:
+            return _bad_request(str(e))
+        page_dates = page['date']
+        next_cursor = encode_cursor(order, page_dates[limit - 1].astype(object)) if len(page_dates) > limit else None
+        page = {field: values[:limit] for field, values in page.items()}
+        if adjusted:
+            page = adjust_series(company.symbol, page)
+        payload = _series_payload(company, page, fields, layout)
+        payload['next_cursor'] = next_cursor
+        return Response(payload)
+
+    stock_data = StockData.objects.filter(company=company)
+    if 'start' in dates:
+        stock_data = stock_data.filter(date__gte=dates['start'])
+    if 'end' in dates:
+        stock_data = stock_data.filter(date__lte=dates['end'])
+
+    try:
+        page = keyset_page(stock_data, order=order, cursor=params.get('cursor'), limit=limit)
+    except InvalidCursor as e:
+        return _bad_request(str(e))
+
+    rows = list(column_values(page, fields))
+    next_cursor = encode_cursor(order, rows[limit - 1][0]) if len(rows) > limit else None
+    rows = rows[:limit]
+
+    if adjusted:
+        series = {
+            field: np.array(values, dtype=COLUMN_DTYPES[field])
+            for field, values in zip(fields, zip(*rows) if rows else [()] * len(fields))
+        }
+        payload = _series_payload(company, adjust_series(company.symbol, series), fields, layout)
+    elif layout == 'columns':
+        payload = serialize_columns(company, rows, fields)
+    else:
+        payload = {
+            'company': {'symbol': company.symbol, 'name': company.name},
+            'count': len(rows),
+            'results': [
+                dict(zip(fields, (row[0].isoformat(),) + tuple(row[1:])))
+                for row in rows
+            ],
+        }
+    payload['next_cursor'] = next_cursor
+    return Response(payload)
+
+
+def _stored_series(company, fields, start=None, end=None):
+    """Column views from the columnar store, or None to fall back to the database"""
+    store = get_store()
+    return store.get_series(company.symbol, fields, start, end) if store is not None else None
+
+
+def _series_payload(company, series, fields, layout):
+    """/api/data/ payload built straight from column views"""
+    columns = {field: series_to_json(series[field]) for field in fields}
+    payload = {
+        'company': {'symbol': company.symbol, 'name': company.name},
+        'count': len(series['date']),
+    }
+    if layout == 'columns':
+        payload['columns'] = columns
+    else:
+        payload['results'] = [dict(zip(fields, values)) for values in zip(*columns.values())]
+    return payload
+
 
 @api_view(['GET'])
+@cached_api_view
 def stock_summary(request, symbol):
-    """Returns 52-week high, low, and average close"""
-    try:
-        company = Company.objects.get(symbol=symbol)
+    """Returns 52-week high, low, and average close
+
+    ?window=all (default) aggregates the whole stored history,
+    ?window=trailing uses the 52 weeks ending at the latest row.
+    """
+    window = request.GET.get('window', 'all')
+    if window not in ('all', 'trailing'):
+        return Response(
+            {"error": "window must be 'all' or 'trailing'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-        # Get the latest stock data
-        latest_data = StockData.objects.filter(company=company).order_by('-date').first()
+    try:
+        summary = CompanySummary.objects.select_related('company').get(company_id=symbol)
+    except CompanySummary.DoesNotExist:
+        # Not built yet (e.g. data loaded before summaries existed)
+        try:
+            company = Company.objects.get(symbol=symbol)
+        except Company.DoesNotExist:
+            return Response(
+                {"error": f"Company with symbol '{symbol}' not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-        if not latest_data:
+        summary = refresh_company_summary(company)
+        if summary is None:
             return Response(
                 {"error": f"No data available for '{symbol}'"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Calculate summary statistics
-        stock_data = StockData.objects.filter(company=company)
-
-        summary_data = {
-            'symbol': company.symbol,
-            'name': company.name,
-            'current_price': latest_data.close_price,
-            'week_52_high': stock_data.aggregate(Max('week_52_high'))['week_52_high__max'],
-            'week_52_low': stock_data.aggregate(Min('week_52_low'))['week_52_low__min'],
-            'average_close': stock_data.aggregate(Avg('close_price'))['close_price__avg'],
-            'last_updated': latest_data.date
-        }
+    return Response(_summary_payload(summary, window))
 
-        serializer = StockSummarySerializer(summary_data)
-        return Response(serializer.data)
 
-    except Company.DoesNotExist:
-        return Response(
-            {"error": f"Company with symbol '{symbol}' not found"},
-            status=status.HTTP_404_NOT_FOUND
-        )
+def _summary_payload(summary, window):
+    if window == 'trailing':
+        high, low, average = summary.trailing_high, summary.trailing_low, summary.trailing_average_close
+    else:
+        high, low, average = summary.week_52_high, summary.week_52_low, summary.average_close
+
+    summary_data = {
+        'symbol': summary.company.symbol,
+        'name': summary.company.name,
+        'current_price': summary.current_price,
+        'week_52_high': high,
+        'week_52_low': low,
+        'average_close': average,
+        'last_updated': summary.last_updated
+    }
+
+    serializer = StockSummarySerializer(summary_data)
+    return serializer.data
+
+
+# Limits for the multi-symbol compare mode
+COMPARE_DEFAULT_DAYS = 30
+COMPARE_MAX_DAYS = 252
+COMPARE_MAX_SYMBOLS = 500
 
 
 @api_view(['GET'])
+@cached_api_view
 def compare_stocks(request):
-    """Compare two stocks' performance (Bonus feature)"""
+    """Compare two stocks' performance (Bonus feature)
+
+    ?symbols=A,B,C[&days=30] compares any number of symbols in one response:
+    returns, volatility, correlation matrix and rankings.
+    """
+    if request.GET.get('symbols'):
+        return _compare_many(request)
+
     symbol1 = request.GET.get('symbol1')
     symbol2 = request.GET.get('symbol2')
 
@@ -88,103 +313,466 @@ def compare_stocks(request):
         data2 = StockData.objects.filter(company=company2).order_by('-date')[:30]
 
         # Calculate comparison metrics
-        avg_return1 = data1.aggregate(Avg('daily_return'))['daily_return__avg'] or 0
-        avg_return2 = data2.aggregate(Avg('daily_return'))['daily_return__avg'] or 0
+        totals1 = data1.aggregate(Avg('daily_return'), Avg('volatility_score'))
+        totals2 = data2.aggregate(Avg('daily_return'), Avg('volatility_score'))
 
-        volatility1 = data1.aggregate(Avg('volatility_score'))['volatility_score__avg'] or 0
-        volatility2 = data2.aggregate(Avg('volatility_score'))['volatility_score__avg'] or 0
+        return Response(_pair_comparison(
+            (symbol1, company1, totals1, data1.first()),
+            (symbol2, company2, totals2, data2.first()),
+        ))
 
-        comparison_data = {
-            'companies': {
-                symbol1: CompanySerializer(company1).data,
-                symbol2: CompanySerializer(company2).data
-            },
-            'performance': {
-                symbol1: {
-                    'avg_daily_return': round(float(avg_return1) * 100, 2),  # as percentage
-                    'volatility_score': round(float(volatility1), 2),
-                    'current_price': data1.first().close_price if data1 else 0
-                },
-                symbol2: {
-                    'avg_daily_return': round(float(avg_return2) * 100, 2),
-                    'volatility_score': round(float(volatility2), 2),
-                    'current_price': data2.first().close_price if data2 else 0
-                }
+    except Company.DoesNotExist:
+        return Response(
+            {"error": "One or both companies not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+
+def _pair_comparison(first, second):
+    """Two-symbol comparison payload from (symbol, company, averages, latest row) for each side"""
+    (symbol1, company1, totals1, latest1), (symbol2, company2, totals2, latest2) = first, second
+
+    avg_return1 = totals1['daily_return__avg'] or 0
+    avg_return2 = totals2['daily_return__avg'] or 0
+
+    volatility1 = totals1['volatility_score__avg'] or 0
+    volatility2 = totals2['volatility_score__avg'] or 0
+
+    comparison_data = {
+        'companies': {
+            symbol1: CompanySerializer(company1).data,
+            symbol2: CompanySerializer(company2).data
+        },
+        'performance': {
+            symbol1: {
+                'avg_daily_return': round(float(avg_return1) * 100, 2),  # as percentage
+                'volatility_score': round(float(volatility1), 2),
+                'current_price': latest1.close_price if latest1 else 0
             },
-            'comparison': {
-                'higher_return': symbol1 if avg_return1 > avg_return2 else symbol2,
-                'lower_volatility': symbol1 if volatility1 < volatility2 else symbol2,
-                'return_difference': round(abs(avg_return1 - avg_return2) * 100, 2)
+            symbol2: {
+                'avg_daily_return': round(float(avg_return2) * 100, 2),
+                'volatility_score': round(float(volatility2), 2),
+                'current_price': latest2.close_price if latest2 else 0
             }
+        },
+        'comparison': {
+            'higher_return': symbol1 if avg_return1 > avg_return2 else symbol2,
+            'lower_volatility': symbol1 if volatility1 < volatility2 else symbol2,
+            'return_difference': round(abs(avg_return1 - avg_return2) * 100, 2)
         }
+    }
+
+    serializer = ComparisonSerializer({
+        'symbol1': symbol1,
+        'symbol2': symbol2,
+        'comparison_data': comparison_data
+    })
+    return serializer.data
+
+
+def _compare_many(request):
+    """Vectorized comparison of an arbitrary symbol list from one panel query"""
+    symbols = _parse_symbols(request)
+    if len(symbols) > COMPARE_MAX_SYMBOLS:
+        return _bad_request(f"At most {COMPARE_MAX_SYMBOLS} symbols can be compared")
+
+    try:
+        days = int(request.GET.get('days', COMPARE_DEFAULT_DAYS))
+    except ValueError:
+        return _bad_request("days must be an integer")
+    if not 2 <= days <= COMPARE_MAX_DAYS:
+        return _bad_request(f"days must be between 2 and {COMPARE_MAX_DAYS}")
+
+    companies = {
+        company['symbol']: company
+        for company in Company.objects.filter(symbol__in=symbols).values('symbol', 'name', 'sector')
+    }
+    error = _missing_companies(symbols, companies)
+    if error:
+        return error
+
+    panel = load_recent_panel(symbols, days, ['close_price', 'daily_return', 'volatility_score'])
+    comparison = compare_panel(panel, symbols)
+    comparison['days'] = days
+    comparison['companies'] = {symbol: companies[symbol] for symbol in symbols}
+    return Response(comparison)
+
+
+# Lookback window for the insights endpoints
+INSIGHTS_DEFAULT_DAYS = 60
+INSIGHTS_MAX_DAYS = 252
+
+
+def _insights_days(request):
+    """Parse ?days= for the insights endpoints, returns (days, error response)"""
+    try:
+        days = int(request.GET.get('days', INSIGHTS_DEFAULT_DAYS))
+    except ValueError:
+        return None, _bad_request("days must be an integer")
+    if not 1 <= days <= INSIGHTS_MAX_DAYS:
+        return None, _bad_request(f"days must be between 1 and {INSIGHTS_MAX_DAYS}")
+    return days, None
 
-        serializer = ComparisonSerializer({
-            'symbol1': symbol1,
-            'symbol2': symbol2,
-            'comparison_data': comparison_data
-        })
 
-        return Response(serializer.data)
+# Creative Bonus API - Stock Insights
+@api_view(['GET'])
+@cached_api_view
+def stock_insights(request, symbol):
+    """Creative endpoint: Provides insights and analysis for a stock
+
+    ?days= sets the lookback window (default 60). The window is read as one
+    array block and reduced with pandas instead of through model instances.
+    """
+    days, error = _insights_days(request)
+    if error:
+        return error
 
+    try:
+        company = Company.objects.only('symbol', 'name').get(symbol=symbol)
     except Company.DoesNotExist:
         return Response(
-            {"error": "One or both companies not found"},
+            {"error": f"Company with symbol '{symbol}' not found"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    recent = StockData.objects.filter(company=company).order_by('-date')[:days]
+    panel = panel_frame(column_values(recent, INSIGHT_FIELDS, keys=('company_id',)), INSIGHT_FIELDS)
+    if panel.empty:
+        return Response(
+            {"error": f"No data available for '{symbol}'"},
             status=status.HTTP_404_NOT_FOUND
         )
 
+    row = insights_frame(panel).loc[company.symbol]
+    return Response(format_insights(company.symbol, company.name, row))
+
 
-# Creative Bonus API - Stock Insights
 @api_view(['GET'])
-def stock_insights(request, symbol):
-    """Creative endpoint: Provides insights and analysis for a stock"""
-    try:
-        company = Company.objects.get(symbol=symbol)
-        stock_data = StockData.objects.filter(company=company).order_by('-date')[:60]  # Last 60 days
+@cached_api_view
+def stock_insights_batch(request):
+    """Insights for every company (or ?symbols=A,B,C) from one windowed query
+
+    Companies without data are left out. Accepts the same ?days= as the
+    single-symbol endpoint.
+    """
+    days, error = _insights_days(request)
+    if error:
+        return error
+
+    symbols = _parse_symbols(request) or None
+    companies = Company.objects.order_by('symbol')
+    if symbols is not None:
+        companies = companies.filter(symbol__in=symbols)
+    names = dict(companies.values_list('symbol', 'name'))
+
+    panel = load_recent_panel(symbols, days, INSIGHT_FIELDS)
+    # Plain tuples: per-company Series lookups would dominate for large universes
+    rows = {row.Index: row for row in insights_frame(panel).itertuples()} if not panel.empty else {}
+    results = [
+        format_insights(symbol, name, rows[symbol])
+        for symbol, name in names.items()
+        if symbol in rows
+    ]
+    return Response({'days': days, 'count': len(results), 'results': results})
+
+
+# Rows of price history in each dashboard series
+DASHBOARD_SERIES_DAYS = 30
 
-        if not stock_data:
-            return Response(
-                {"error": f"No data available for '{symbol}'"},
-                status=status.HTTP_404_NOT_FOUND
-            )
 
-        latest = stock_data.first()
-
-        # Calculate insights
-        positive_days = sum(1 for data in stock_data if data.daily_return > 0)
-        negative_days = sum(1 for data in stock_data if data.daily_return < 0)
-
-        # Trend analysis (simple)
-        recent_trend = "Bullish" if latest.daily_return > 0 else "Bearish"
-
-        # Volatility assessment
-        avg_volatility = stock_data.aggregate(Avg('volatility_score'))['volatility_score__avg'] or 0
-        volatility_level = "High" if avg_volatility > 2 else "Low" if avg_volatility < 1 else "Medium"
-
-        insights = {
-            'symbol': company.symbol,
-            'name': company.name,
-            'current_price': latest.close_price,
-            'insights': {
-                'trend': recent_trend,
-                'volatility_level': volatility_level,
-                'positive_days_ratio': f"{positive_days}/{len(stock_data)}",
-                'performance_rating': "Good" if latest.daily_return > 0.01 else "Neutral" if latest.daily_return > -0.01 else "Poor",
-                'momentum_strength': "Strong" if abs(latest.momentum or 0) > 5 else "Weak",
-                'recommendation': "Watch" if volatility_level == "High" else "Consider" if latest.daily_return > 0 else "Hold"
-            },
-            'key_metrics': {
-                'daily_change_percent': round(float(latest.daily_return or 0) * 100, 2),
-                'volume_today': latest.volume,
-                'distance_from_52_week_high': round(
-                    float(((latest.week_52_high or 0) - latest.close_price) / (latest.week_52_high or 1) * 100), 2),
-                'moving_avg_trend': "Above MA" if latest.close_price > (latest.moving_avg_7 or 0) else "Below MA"
+@api_view(['GET'])
+@cached_api_view(universe=True)
+def dashboard(request, symbol=None):
+    """Everything the dashboard renders in one response
+
+    Returns the companies list and, for the URL symbol (or ?symbols=A,B), the
+    latest 30-day series, the summary and the insights (?days= window). All
+    series and insights come from one shared window query; summaries are
+    joined onto the companies list query.
+    """
+    days, error = _insights_days(request)
+    if error:
+        return error
+
+    if symbol is not None:
+        symbols = [symbol]
+    else:
+        symbols = _parse_symbols(request)
+    if len(symbols) > COMPARE_MAX_SYMBOLS:
+        return _bad_request(f"At most {COMPARE_MAX_SYMBOLS} symbols can be requested")
+
+    companies = list(Company.objects.select_related('summary'))
+    by_symbol = {company.symbol: company for company in companies}
+    error = _missing_companies(symbols, by_symbol)
+    if error:
+        return error
+
+    stocks = {}
+    if symbols:
+        panel = load_recent_panel(symbols, max(days, DASHBOARD_SERIES_DAYS), STOCK_DATA_COLUMNS)
+        panel = panel.sort_values(['company_id', 'date'], ascending=[True, False])
+        recent = panel.groupby('company_id', sort=False)
+        series = dict(tuple(recent.head(DASHBOARD_SERIES_DAYS).groupby('company_id', sort=False)))
+        insights = insights_frame(recent.head(days)) if not panel.empty else None
+
+        for ticker in symbols:
+            company = by_symbol[ticker]
+            frame = series.get(ticker, panel.iloc[:0])
+            try:
+                summary = company.summary
+            except CompanySummary.DoesNotExist:
+                summary = refresh_company_summary(company)
+
+            stocks[ticker] = {
+                'series': {'count': len(frame), 'columns': frame_columns(frame, STOCK_DATA_COLUMNS)},
+                'summary': _summary_payload(summary, 'all') if summary is not None else None,
+                'insights': (
+                    format_insights(ticker, company.name, insights.loc[ticker])
+                    if insights is not None and ticker in insights.index else None
+                ),
             }
+
+    return Response({
+        'companies': CompanySerializer(companies, many=True).data,
+        'stocks': stocks,
+    })
+
+
+# Limits for /api/backtest/, which runs in the request process
+BACKTEST_MAX_SYMBOLS = 500
+BACKTEST_MAX_COMBINATIONS = 100
+
+
+@api_view(['GET'])
+@cached_api_view
+def backtest(request):
+    """Backtest a signal rule over stored prices
+
+    ?rule=momentum > threshold and close_price > moving_avg_7&symbols=A,B
+    [&start=&end=&cost_bps=] holds the symbols the rule selects each day in
+    equal weight. Rule parameters are given as ?param=threshold=0,1,2 (one
+    ?param per parameter, one or more comma-separated values); a single
+    combination returns the equity, drawdown and turnover curves, a grid
+    returns the stats of every combination.
+    """
+    try:
+        rule = Rule(request.GET.get('rule', ''))
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    symbols = _parse_symbols(request)
+    if not symbols:
+        return _bad_request("Please provide a symbols parameter")
+    if len(symbols) > BACKTEST_MAX_SYMBOLS:
+        return _bad_request(f"At most {BACKTEST_MAX_SYMBOLS} symbols can be backtested")
+
+    dates, error = _parse_dates(request.GET)
+    if error:
+        return error
+    try:
+        cost_bps = float(request.GET.get('cost_bps', 0))
+    except ValueError:
+        cost_bps = math.nan
+    if not 0 <= cost_bps <= MAX_COST_BPS:
+        return _bad_request(f"cost_bps must be a number between 0 and {MAX_COST_BPS}")
+    try:
+        grid = parse_parameters(request.GET.getlist('param'))
+    except ValueError:
+        return _bad_request("param must be name=value[,value...] with numeric values")
+
+    unknown = sorted(set(grid) - set(rule.parameters))
+    if unknown:
+        return _bad_request(f"Unknown rule parameters: {', '.join(unknown)}")
+    missing = [name for name in rule.parameters if name not in grid]
+    if missing:
+        return _bad_request(f"Missing rule parameters: {', '.join(missing)}")
+    combinations = int(np.prod([len(values) for values in grid.values()]))
+    if combinations > BACKTEST_MAX_COMBINATIONS:
+        return _bad_request(f"At most {BACKTEST_MAX_COMBINATIONS} parameter combinations can be run")
+
+    error = _missing_companies(symbols)
+    if error:
+        return error
+
+    universe = load_universe(symbols, rule.fields, dates.get('start'), dates.get('end'))
+    payload = {'rule': rule.text, 'symbols': symbols, 'cost_bps': cost_bps}
+    if combinations == 1:
+        payload.update(run_backtest(universe, rule, {name: values[0] for name, values in grid.items()}, cost_bps))
+    else:
+        payload['results'] = run_grid(universe, rule, grid, cost_bps)
+    return Response(payload)
+
+
+# Latest-day CompanySummary columns the screener filters and sorts on
+SCREENER_METRICS = ('momentum', 'volatility_score', 'daily_return', 'distance_from_high', 'current_price')
+SCREENER_DEFAULT_LIMIT = 50
+SCREENER_MAX_LIMIT = 1000
+
+
+@api_view(['GET'])
+@cached_api_view(universe=True)
+def screener(request):
+    """Rank every company by its latest-day metrics
+
+    ?sector=Technology,Energy filters by sector, ?min_momentum=, ?max_volatility_score=
+    (min_/max_ for any metric) by value, ?sort=-momentum (default; any
+    metric, '-' for descending) orders and ?limit= (default 50) keeps the top
+    N. Reads only the CompanySummary snapshot ingestion maintains, through
+    an index on each metric.
+    """
+    sort = request.GET.get('sort', '-momentum')
+    if sort.lstrip('-') not in SCREENER_METRICS:
+        return _bad_request(f"sort must be one of {', '.join(SCREENER_METRICS)}, optionally prefixed with '-'")
+    try:
+        limit = int(request.GET.get('limit', SCREENER_DEFAULT_LIMIT))
+    except ValueError:
+        return _bad_request("limit must be an integer")
+    if not 1 <= limit <= SCREENER_MAX_LIMIT:
+        return _bad_request(f"limit must be between 1 and {SCREENER_MAX_LIMIT}")
+
+    summaries = CompanySummary.objects.all()
+    sectors = [sector.strip() for param in request.GET.getlist('sector') for sector in param.split(',') if sector.strip()]
+    if sectors:
+        summaries = summaries.filter(company__sector__in=sectors)
+    for bound, lookup in (('min', 'gte'), ('max', 'lte')):
+        for metric in SCREENER_METRICS:
+            value = request.GET.get(f'{bound}_{metric}')
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except ValueError:
+                value = math.nan
+            if not math.isfinite(value):
+                return _bad_request(f"{bound}_{metric} must be a finite number")
+            summaries = summaries.filter(**{f'{metric}__{lookup}': value})
+
+    field = sort.lstrip('-')
+    order = F(field).desc(nulls_last=True) if sort.startswith('-') else F(field).asc(nulls_last=True)
+    rows = summaries.order_by(order, 'company_id').values_list(
+        'company_id', 'company__name', 'company__sector', 'last_updated', *SCREENER_METRICS
+    )[:limit]
+    results = [
+        {
+            'symbol': symbol, 'name': name, 'sector': sector, 'last_updated': last_updated,
+            **{metric: float(value) if value is not None else None for metric, value in zip(SCREENER_METRICS, values)},
         }
+        for symbol, name, sector, last_updated, *values in rows
+    ]
+    return Response({'sort': sort, 'count': len(results), 'results': results})
 
-        return Response(insights)
 
-    except Company.DoesNotExist:
+PEERS_DEFAULT_LIMIT = 10
+PEERS_MAX_LIMIT = 100
+
+
+def _correlation_window(request):
+    """Parse ?window= for the correlation endpoints, returns (window, error response)"""
+    try:
+        window = int(request.GET.get('window', DEFAULT_WINDOW))
+    except ValueError:
+        window = None
+    if window not in CORRELATION_WINDOWS:
+        return None, _bad_request(f"window must be one of {', '.join(map(str, CORRELATION_WINDOWS))}")
+    return window, None
+
+
+@api_view(['GET'])
+@cached_api_view(universe=True)
+def correlated_peers(request, symbol):
+    """The companies whose daily returns correlate most with a symbol's over a rolling window
+
+    ?window= is 20, 60 (default) or 252 trading days, ?limit= the number of
+    peers (default 10). Served from rolling sums that each new day updates
+    incrementally.
+    """
+    window, error = _correlation_window(request)
+    if error:
+        return error
+    try:
+        limit = int(request.GET.get('limit', PEERS_DEFAULT_LIMIT))
+    except ValueError:
+        return _bad_request("limit must be an integer")
+    if not 1 <= limit <= PEERS_MAX_LIMIT:
+        return _bad_request(f"limit must be between 1 and {PEERS_MAX_LIMIT}")
+
+    if not Company.objects.filter(symbol=symbol).exists():
         return Response(
             {"error": f"Company with symbol '{symbol}' not found"},
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+
+    dates, peers = top_peers(symbol, window, limit)
+    return Response({
+        'symbol': symbol,
+        'window': window,
+        'start': dates[0] if dates else None,
+        'end': dates[-1] if dates else None,
+        'peers': peers,
+    })
+
+
+@api_view(['GET'])
+def correlation_matrix(request):
+    """The rolling correlation (or ?kind=covariance) matrix as a NumPy .npz file
+
+    Holds 'symbols', 'dates' and a float32 'matrix' (NaN where a pair shares
+    fewer than two days); ?symbols=A,B,C selects a sub-matrix and ?window=
+    works as for the peers endpoint. Read it with numpy.load(io.BytesIO(body)).
+    """
+    window, error = _correlation_window(request)
+    if error:
+        return error
+    kind = request.GET.get('kind', 'correlation')
+    if kind not in ('correlation', 'covariance'):
+        return _bad_request("kind must be 'correlation' or 'covariance'")
+
+    symbols = _parse_symbols(request) or None
+    error = _missing_companies(symbols) if symbols else None
+    if error:
+        return error
+
+    return HttpResponse(
+        matrix_npz(window, kind, symbols),
+        content_type='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename="{kind}_{window}d.npz"'},
+    )
+
+
+@api_view(['GET'])
+def export_stock_data(request):
+    """Stream full StockData histories as CSV, Parquet or an Arrow IPC stream
+
+    ?output=csv (default), parquet or arrow; ?symbols=A,B (default: every
+    company), ?start=/?end= dates and ?fields= select what is exported. Rows
+    are read in chunks and written as they arrive, so memory use does not
+    grow with the export. Parquet and Arrow need pyarrow.
+    """
+    params = request.GET
+    output = params.get('output', 'csv')
+    if output not in EXPORT_FORMATS:
+        return _bad_request(f"output must be one of {', '.join(EXPORT_FORMATS)}")
+
+    dates, error = _parse_dates(params)
+    if error:
+        return error
+    fields, error = _parse_fields(params)
+    if error:
+        return error
+
+    symbols = _parse_symbols(request) or None
+    error = _missing_companies(symbols) if symbols else None
+    if error:
+        return error
+
+    try:
+        chunks = export_chunks(output, symbols, dates.get('start'), dates.get('end'), fields)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    content_type, extension = EXPORT_FORMATS[output]
+    return StreamingHttpResponse(
+        chunks,
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename="stock_data.{extension}"'},
+    )
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class StocksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stocks'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .services.metrics import install_query_wrapper
+        from .services.sqlite import configure_connection
+
+        connection_created.connect(install_query_wrapper, dispatch_uid='stocks_query_metrics')
+        connection_created.connect(configure_connection, dispatch_uid='stocks_sqlite_pragmas')
@@ -0,0 +1,145 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db.models import Avg
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import api_views
+from .models import Company, CompanySummary, StockData
+from .serializers import CompanySerializer, StockDataSerializer, column_values, serialize_columns
+from .services.analytics import INSIGHT_FIELDS, format_insights, insights_frame, panel_frame
+from .services.cache import cached_async_view
+from .services.summaries import refresh_company_summary
+
+# Async versions of the read endpoints in api_views, for ASGI deployments.
+# Database work goes through Django's async ORM so a slow query suspends the
+# request instead of holding a worker; payloads match the DRF endpoints.
+
+
+def _json(data, status=status.HTTP_200_OK):
+    # DRF's encoder, so decimals and dates render exactly as in the DRF views
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def _error(message, status):
+    return _json({"error": message}, status=status)
+
+
+def _from_drf(response):
+    """JsonResponse from an unrendered DRF Response returned by a shared sync helper"""
+    return _json(response.data, status=response.status_code)
+
+
+@cached_async_view
+async def companies_list(request):
+    """Returns a list of all available companies"""
+    companies = [company async for company in Company.objects.all()]
+    return _json(CompanySerializer(companies, many=True).data)
+
+
+@cached_async_view
+async def stock_data(request, symbol):
+    """Returns last 30 days of stock data for a company (see api_views.stock_data)"""
+    layout = request.GET.get('layout', 'rows')
+    if layout not in ('rows', 'columns'):
+        return _error("layout must be 'rows' or 'columns'", status.HTTP_400_BAD_REQUEST)
+
+    try:
+        company = await Company.objects.aget(symbol=symbol)
+    except Company.DoesNotExist:
+        return _error(f"Company with symbol '{symbol}' not found", status.HTTP_404_NOT_FOUND)
+
+    if any(param in request.GET for param in api_views.RANGE_PARAMS):
+        return _from_drf(await sync_to_async(api_views._stock_data_page)(request, company, layout))
+
+    stock_data = StockData.objects.filter(company=company).order_by('-date')[:30]
+
+    if layout == 'columns':
+        rows = [row async for row in column_values(stock_data)]
+        return _json(serialize_columns(company, rows))
+
+    rows = [row async for row in stock_data.select_related('company')]
+    return _json(StockDataSerializer(rows, many=True).data)
+
+
+@cached_async_view
+async def stock_summary(request, symbol):
+    """Returns 52-week high, low, and average close (see api_views.stock_summary)"""
+    window = request.GET.get('window', 'all')
+    if window not in ('all', 'trailing'):
+        return _error("window must be 'all' or 'trailing'", status.HTTP_400_BAD_REQUEST)
+
+    try:
+        summary = await CompanySummary.objects.select_related('company').aget(company_id=symbol)
+    except CompanySummary.DoesNotExist:
+        try:
+            company = await Company.objects.aget(symbol=symbol)
+        except Company.DoesNotExist:
+            return _error(f"Company with symbol '{symbol}' not found", status.HTTP_404_NOT_FOUND)
+
+        summary = await sync_to_async(refresh_company_summary)(company)
+        if summary is None:
+            return _error(f"No data available for '{symbol}'", status.HTTP_404_NOT_FOUND)
+
+    return _json(api_views._summary_payload(summary, window))
+
+
+async def _recent_stats(symbol):
+    """(symbol, company, 30-day averages, latest row) for one side of a comparison"""
+    company = await Company.objects.aget(symbol=symbol)
+    recent = StockData.objects.filter(company=company).order_by('-date')[:30]
+    totals, latest = await asyncio.gather(
+        recent.aaggregate(Avg('daily_return'), Avg('volatility_score')),
+        recent.afirst(),
+    )
+    return symbol, company, totals, latest
+
+
+@cached_async_view
+async def compare_stocks(request):
+    """Compare two stocks' performance
+
+    Both symbols' queries are gathered, but the async ORM runs them on the
+    request's single thread-sensitive executor thread, so they still execute
+    one after the other; awaiting them only frees the event loop meanwhile.
+    ?symbols= is served by the vectorized multi-symbol compare.
+    """
+    if request.GET.get('symbols'):
+        return _from_drf(await sync_to_async(api_views._compare_many)(request))
+
+    symbol1 = request.GET.get('symbol1')
+    symbol2 = request.GET.get('symbol2')
+
+    if not symbol1 or not symbol2:
+        return _error("Please provide both symbol1 and symbol2 parameters", status.HTTP_400_BAD_REQUEST)
+
+    try:
+        first, second = await asyncio.gather(_recent_stats(symbol1), _recent_stats(symbol2))
+    except Company.DoesNotExist:
+        return _error("One or both companies not found", status.HTTP_404_NOT_FOUND)
+
+    return _json(api_views._pair_comparison(first, second))
+
+
+@cached_async_view
+async def stock_insights(request, symbol):
+    """Insights and analysis for a stock (see api_views.stock_insights)"""
+    days, error = api_views._insights_days(request)
+    if error:
+        return _from_drf(error)
+
+    try:
+        company = await Company.objects.only('symbol', 'name').aget(symbol=symbol)
+    except Company.DoesNotExist:
+        return _error(f"Company with symbol '{symbol}' not found", status.HTTP_404_NOT_FOUND)
+
+    recent = StockData.objects.filter(company=company).order_by('-date')[:days]
+    rows = [row async for row in column_values(recent, INSIGHT_FIELDS, keys=('company_id',))]
+    panel = panel_frame(rows, INSIGHT_FIELDS)
+    if panel.empty:
+        return _error(f"No data available for '{symbol}'", status.HTTP_404_NOT_FOUND)
+
+    row = insights_frame(panel).loc[company.symbol]
+    return _json(format_insights(company.symbol, company.name, row))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from stocks.models import Company, CorporateAction
+from stocks.services.corporate_actions import record_corporate_action
+
+
+class Command(BaseCommand):
+    help = 'Record a split or dividend and recompute only the metrics it affects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbol', help='Company symbol')
+        parser.add_argument('ex_date', help='Ex-date (YYYY-MM-DD)')
+        kind = parser.add_mutually_exclusive_group(required=True)
+        kind.add_argument('--split', help='Split ratio, e.g. 2 for a 2-for-1 split')
+        kind.add_argument('--dividend', help='Cash dividend per share')
+
+    def handle(self, *args, **options):
+        try:
+            ex_date = parse_date(options['ex_date'])
+        except ValueError:  # well formed but impossible, e.g. 2024-02-30
+            ex_date = None
+        if ex_date is None:
+            raise CommandError('ex_date must be a date in YYYY-MM-DD format')
+
+        kind = CorporateAction.SPLIT if options['split'] else CorporateAction.DIVIDEND
+        try:
+            action = record_corporate_action(
+                options['symbol'], ex_date, kind, options['split'] or options['dividend']
+            )
+        except Company.DoesNotExist:
+            raise CommandError(f"Company with symbol '{options['symbol']}' not found")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Recorded {action}; earlier prices now scale by {action.cumulative_factor}')
+        )
@@ -1,66 +1,66 @@
+import time
+
 from django.core.management.base import BaseCommand
-from stocks.models import Company, StockData
-from datetime import datetime, timedelta
-import random
+from stocks.models import Company
+from stocks.services.data_collector import StockDataCollector
+from stocks.services.synthetic import generate_universe
+
+# Named companies for the first sample symbols; the rest are SYN0005, SYN0006, ...
+SAMPLE_COMPANIES = [
+    {'symbol': 'AAPL', 'name': 'Apple Inc.', 'sector': 'Technology'},
+    {'symbol': 'GOOGL', 'name': 'Alphabet Inc.', 'sector': 'Technology'},
+    {'symbol': 'MSFT', 'name': 'Microsoft Corporation', 'sector': 'Technology'},
+    {'symbol': 'TSLA', 'name': 'Tesla Inc.', 'sector': 'Automotive'},
+    {'symbol': 'AMZN', 'name': 'Amazon.com Inc.', 'sector': 'E-Commerce'},
+]
 
 
 class Command(BaseCommand):
-    help = 'Add sample stock data for testing'
+    help = 'Add reproducible synthetic stock data (seeded geometric Brownian motion) for testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbols', type=int, default=len(SAMPLE_COMPANIES),
+                            help='Number of companies to generate')
+        parser.add_argument('--days', type=int, default=252, help='Trading days of history per company')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data')
 
     def handle(self, *args, **options):
-        # Create sample companies
-        companies_data = [
-            {'symbol': 'AAPL', 'name': 'Apple Inc.', 'sector': 'Technology'},
-            {'symbol': 'GOOGL', 'name': 'Alphabet Inc.', 'sector': 'Technology'},
-            {'symbol': 'MSFT', 'name': 'Microsoft Corporation', 'sector': 'Technology'},
-            {'symbol': 'TSLA', 'name': 'Tesla Inc.', 'sector': 'Automotive'},
-            {'symbol': 'AMZN', 'name': 'Amazon.com Inc.', 'sector': 'E-Commerce'},
+        symbols = options['symbols']
+        companies = [
+            SAMPLE_COMPANIES[i] if i < len(SAMPLE_COMPANIES) else {
+                'symbol': f'SYN{i:04d}', 'name': f'Synthetic Company {i}', 'sector': 'Synthetic',
+            }
+            for i in range(symbols)
         ]
+        existing = set(
+            Company.objects.filter(symbol__in=[company['symbol'] for company in companies])
+            .values_list('symbol', flat=True)
+        )
+        Company.objects.bulk_create(
+            [Company(**company) for company in companies if company['symbol'] not in existing],
+            ignore_conflicts=True,
+        )
+        self.stdout.write(f"Created {len(companies) - len(existing)} companies, {len(existing)} already existed")
 
-        for company_data in companies_data:
-            company, created = Company.objects.get_or_create(
-                symbol=company_data['symbol'],
-                defaults=company_data
+        start = time.perf_counter()
+        rows = 0
+        # Per-symbol lines for small universes, periodic progress for large ones
+        verbose = options['verbosity'] > 1 or symbols <= 20
+        for i, frame in generate_universe(symbols, options['days'], seed=options['seed']):
+            company = companies[i]
+            saved = StockDataCollector.bulk_save_stock_data(
+                company['symbol'], StockDataCollector.calculate_metrics(frame)
             )
-            if created:
-                self.stdout.write(f"Created company: {company.name}")
-
-        # Add sample stock data
-        for company in Company.objects.all():
-            base_price = random.uniform(100, 300)
-            current_date = datetime.now().date()
-
-            for i in range(100):  # Add 100 days of data
-                date = current_date - timedelta(days=i)
-
-                open_price = base_price + random.uniform(-10, 10)
-                close_price = open_price + random.uniform(-5, 5)
-                high_price = max(open_price, close_price) + random.uniform(0, 5)
-                low_price = min(open_price, close_price) - random.uniform(0, 5)
-
-                # Calculate some metrics
-                daily_return = (close_price - open_price) / open_price
-
-                StockData.objects.get_or_create(
-                    company=company,
-                    date=date,
-                    defaults={
-                        'open_price': round(open_price, 2),
-                        'high_price': round(high_price, 2),
-                        'low_price': round(low_price, 2),
-                        'close_price': round(close_price, 2),
-                        'volume': random.randint(1000000, 5000000),
-                        'daily_return': round(daily_return, 4),
-                        'moving_avg_7': round(close_price + random.uniform(-2, 2), 2),
-                        'week_52_high': round(base_price * 1.2, 2),
-                        'week_52_low': round(base_price * 0.8, 2),
-                        'volatility_score': round(random.uniform(0.5, 3.0), 4),
-                        'momentum': round(random.uniform(-10, 10), 4),
-                    }
-                )
-
-            self.stdout.write(f"Added sample data for {company.name}")
+            rows += sum(saved)
+            if verbose:
+                self.stdout.write(f"Added sample data for {company['name']}")
+            elif (i + 1) % 100 == 0:
+                self.stdout.write(f"Added sample data for {i + 1}/{symbols} companies")
 
+        elapsed = time.perf_counter() - start
         self.stdout.write(
-            self.style.SUCCESS('Successfully added sample stock data!')
-        )
\ No newline at end of file
+            self.style.SUCCESS(
+                f'Successfully added sample stock data! '
+                f'({rows} rows in {elapsed:.1f}s, {rows / max(elapsed, 1e-9):.0f} rows/s)'
+            )
+        )
@@ -0,0 +1,53 @@
+import inspect
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from stocks.services.benchmarks import SUITES, find_regressions, results_document
+
+
+class Command(BaseCommand):
+    help = 'Run performance benchmarks against the configured database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suite', choices=sorted(SUITES), help='Benchmark suite to run')
+        parser.add_argument('--rows', type=int, help='Rows of synthetic data per symbol')
+        parser.add_argument('--symbols', type=int, help='Number of synthetic symbols (multi-symbol suites)')
+        parser.add_argument('--json', dest='json_path', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to check for regressions')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed slowdown against the baseline before failing (default 0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        suite = options['suite']
+        sizes = {key: options[key] for key in ('rows', 'symbols') if options[key] is not None}
+        unsupported = [f'--{key}' for key in sizes if key not in inspect.signature(SUITES[suite]).parameters]
+        if unsupported:
+            raise CommandError(f"The {suite} suite does not take {', '.join(unsupported)}")
+
+        self.stdout.write(f'Running {suite} benchmark...')
+        try:
+            results = SUITES[suite](**sizes)
+        except ValueError as e:
+            raise CommandError(str(e))
+        for result in results:
+            line = ', '.join(f'{key}={value}' for key, value in result.items() if key != 'benchmark')
+            self.stdout.write(f'  {line}')
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results_document(suite, results, sizes), f, indent=2)
+            self.stdout.write(f"Wrote results to {options['json_path']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = find_regressions(baseline['results'], results, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f"  regression: {regression['result']} {regression['metric']} "
+                    f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.0%})"
+                ))
+            if regressions:
+                raise CommandError(f'{len(regressions)} measurements regressed beyond the tolerance')
+
+        self.stdout.write(self.style.SUCCESS(f'Finished {suite} benchmark'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from stocks.services.columnar_store import get_store, sync_store
+
+
+class Command(BaseCommand):
+    help = 'Backfill the memory-mapped columnar store from StockData'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to sync (default: all companies)')
+
+    def handle(self, *args, **options):
+        if get_store() is None:
+            raise CommandError('Set STOCKS_COLUMNAR_STORE_DIR to enable the columnar store')
+
+        synced = sync_store(options['symbols'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Synced {synced} symbols to {get_store().root}')
+        )
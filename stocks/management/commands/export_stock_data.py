@@ -0,0 +1,52 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from stocks.serializers import STOCK_DATA_COLUMNS, parse_fields
+from stocks.services.export import EXPORT_FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = 'Stream StockData histories to a CSV, Parquet or Arrow IPC file with bounded memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file ('-' for stdout)")
+        parser.add_argument('symbols', nargs='*', help='Symbols to export (default: all companies)')
+        parser.add_argument('--output', choices=sorted(EXPORT_FORMATS), default='csv', help='File format')
+        parser.add_argument('--start', help='First date (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last date (YYYY-MM-DD)')
+        parser.add_argument('--fields', help=f"Comma-separated columns (default: {','.join(STOCK_DATA_COLUMNS)})")
+
+    def handle(self, *args, **options):
+        try:
+            dates = {option: parse_date(options[option]) if options[option] else None for option in ('start', 'end')}
+        except ValueError:  # well formed but impossible, e.g. 2024-02-30
+            dates = dict.fromkeys(('start', 'end'))
+        if any(options[option] and value is None for option, value in dates.items()):
+            raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+
+        try:
+            fields = parse_fields(options['fields']) if options['fields'] else STOCK_DATA_COLUMNS
+            chunks = export_chunks(
+                options['output'], options['symbols'] or None, dates['start'], dates['end'], fields
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        start = time.perf_counter()
+        written = 0
+        output = sys.stdout.buffer if options['path'] == '-' else open(options['path'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        elapsed = time.perf_counter() - start
+        # Progress goes to stderr so '-' output stays a clean file
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {written / 1e6:.1f} MB in {elapsed:.1f}s ({written / 1e6 / max(elapsed, 1e-9):.1f} MB/s)'
+        ))
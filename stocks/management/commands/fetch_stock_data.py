@@ -1,19 +1,49 @@
 from django.core.management.base import BaseCommand
 from stocks.services.data_collector import StockDataCollector
+from stocks.services.providers import SyntheticProvider, YahooFinanceProvider
+
+PROVIDERS = {
+    'yahoo': YahooFinanceProvider,
+    'synthetic': SyntheticProvider,
+}
 
 
 class Command(BaseCommand):
     help = 'Fetch and update stock market data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=StockDataCollector.DEFAULT_WORKERS,
+                            help='Number of symbols fetched concurrently')
+        parser.add_argument('--retries', type=int, default=StockDataCollector.DEFAULT_RETRIES,
+                            help='Retries per symbol after a failed fetch')
+        parser.add_argument('--backoff', type=float, default=StockDataCollector.DEFAULT_BACKOFF,
+                            help='Initial retry delay in seconds, doubled on each retry')
+        parser.add_argument('--provider', choices=sorted(PROVIDERS), default='yahoo',
+                            help='Data source (synthetic needs no network)')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only fetch days after the latest stored row for each symbol')
+
     def handle(self, *args, **options):
         self.stdout.write('Starting stock data collection...')
 
         try:
-            StockDataCollector.collect_all_data()
-            self.stdout.write(
-                self.style.SUCCESS('Successfully collected all stock data!')
+            results = StockDataCollector.collect_all_data(
+                workers=options['workers'],
+                provider=PROVIDERS[options['provider']](),
+                retries=options['retries'],
+                backoff=options['backoff'],
+                incremental=options['incremental'],
             )
+            failed = [symbol for symbol, result in results.items() if result is None]
+            if failed:
+                self.stdout.write(
+                    self.style.WARNING(f"Collected stock data, but {len(failed)} symbols failed: {', '.join(failed)}")
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS('Successfully collected all stock data!')
+                )
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Error collecting stock data: {e}')
-            )
\ No newline at end of file
+            )
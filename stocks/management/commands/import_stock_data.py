@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from stocks.services.importer import IMPORT_CHUNK_ROWS, METRIC_MODES, import_file
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load OHLCV history from a CSV or Parquet file in chunks, with resumable checkpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (optionally .gz/.zip etc.) or .parquet file with symbol, date, '
+                                         'open, high, low, close and volume columns')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_ROWS, help='Rows per chunk')
+        parser.add_argument('--metrics', choices=METRIC_MODES, default='pandas',
+                            help='pandas: calculate_metrics per symbol and chunk, redone at the end for rows '
+                                 'imported out of date order; database: SQL window functions once '
+                                 'at the end; none: leave metrics NULL')
+        parser.add_argument('--create-companies', action='store_true',
+                            help='Create missing companies (named after their symbol) instead of rejecting their rows')
+        parser.add_argument('--resume', action='store_true',
+                            help='Continue after the last chunk an interrupted run committed')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Read, validate and compute metrics without writing; reports throughput')
+
+    def handle(self, *args, **options):
+        def progress(report):
+            if options['verbosity'] > 1 or report['chunks'] % 10 == 0:
+                self.stdout.write(f"  chunk {report['skipped_chunks'] + report['chunks']}: {report['rows']} rows, "
+                                  f"{report['valid']} valid")
+
+        try:
+            report = import_file(
+                options['path'],
+                chunk_size=options['chunk_size'],
+                metrics=options['metrics'],
+                dry_run=options['dry_run'],
+                resume=options['resume'],
+                create_companies=options['create_companies'],
+                progress=progress,
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if report['skipped_chunks']:
+            self.stdout.write(f"Resumed after {report['skipped_chunks']} committed chunks")
+        rejected = ', '.join(f'{reason}={count}' for reason, count in sorted(report['rejected'].items()))
+        self.stdout.write(f"Rejected rows: {rejected or 'none'}")
+        stages = ', '.join(
+            f"{stage} {seconds:.2f}s ({report['rows'] / seconds:.0f} rows/s)" if seconds else f'{stage} 0s'
+            for stage, seconds in report['seconds'].items()
+        )
+        self.stdout.write(f'Stages: {stages}')
+
+        summary = (
+            f"{report['rows']} rows in {report['chunks']} chunks, {report['valid']} valid, "
+            f"{report['symbols']} symbols, {report['rows_per_second']} rows/s"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: {summary}; nothing was written'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Imported {summary}: {report['created']} created, {report['updated']} updated, "
+                f"metrics recomputed on {report['recomputed']} rows"
+            ))
@@ -0,0 +1,42 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from stocks.services.loadtest import LOADTEST_ENDPOINTS, run_load, serves_cached
+
+
+class Command(BaseCommand):
+    help = 'Compare sync (WSGI) and async (ASGI) API endpoints under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', default='http://127.0.0.1:8000',
+                            help='Base URL of the WSGI server')
+        parser.add_argument('--async-url', default='http://127.0.0.1:8001',
+                            help='Base URL of the ASGI server')
+        parser.add_argument('--symbol', default='AAPL', help='Symbol to request')
+        parser.add_argument('--other', default='MSFT', help='Second symbol for compare')
+        parser.add_argument('--endpoints', nargs='*', choices=sorted(LOADTEST_ENDPOINTS),
+                            default=sorted(LOADTEST_ENDPOINTS), help='Endpoints to load')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and server')
+        parser.add_argument('--concurrency', type=int, default=100, help='Concurrent client threads')
+        parser.add_argument('--allow-cache', action='store_true',
+                            help='Run even if a server has the response cache enabled (measures cache hits)')
+
+    def handle(self, *args, **options):
+        for endpoint in options['endpoints']:
+            for mode, base_url, path in zip(('sync', 'async'), (options['sync_url'], options['async_url']),
+                                            LOADTEST_ENDPOINTS[endpoint]):
+                url = base_url.rstrip('/') + path.format(symbol=options['symbol'], other=options['other'])
+                if not options['allow_cache']:
+                    try:
+                        cached = serves_cached(url)
+                    except requests.RequestException as e:
+                        raise CommandError(f'Cannot reach {url}: {e}')
+                    if cached:
+                        raise CommandError(
+                            f'{base_url} serves responses from its cache; restart it with '
+                            'STOCKS_API_CACHE_ENABLED=0 (or pass --allow-cache to measure cache hits)'
+                        )
+                result = run_load(url, options['requests'], options['concurrency'])
+                line = ', '.join(f'{key}={value}' for key, value in result.items())
+                self.stdout.write(f'  {endpoint} [{mode}]: {line}')
+
+        self.stdout.write(self.style.SUCCESS('Finished load test'))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+from stocks.services.window_metrics import recompute_metrics
+
+
+class Command(BaseCommand):
+    help = 'Recompute derived metrics inside the database with SQL window functions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to recompute (default: all companies)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        updated = recompute_metrics(options['symbols'] or None)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f'Recomputed metrics for {updated} rows in {elapsed:.1f}s')
+        )
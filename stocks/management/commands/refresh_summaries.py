@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from stocks.services.summaries import refresh_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed per-company summaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('symbols', nargs='*', help='Symbols to refresh (default: all companies)')
+
+    def handle(self, *args, **options):
+        refreshed = refresh_summaries(options['symbols'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Refreshed {refreshed} company summaries')
+        )
@@ -0,0 +1,118 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .routers import api_request
+from .services.metrics import REGISTRY, RequestStats, current_request
+
+# Paths that are not measured (the scrape endpoint itself)
+UNMEASURED_PATHS = ('/metrics',)
+
+# Views whose reads ReadReplicaRouter may send to the read-only alias
+API_VIEW_MODULES = ('stocks.api_views', 'stocks.async_views')
+
+
+class RequestMetricsMiddleware:
+    """Record latency, query count and time, render time and response size per view
+
+    Queries are counted by the record_query execute wrapper installed on every
+    database connection; render time covers DRF's JSON rendering. Results are
+    exposed at /metrics.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _enabled(self, request):
+        return getattr(settings, 'STOCKS_METRICS_ENABLED', True) and request.path not in UNMEASURED_PATHS
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._enabled(request):
+            return self.get_response(request)
+
+        stats = RequestStats(request)
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self._record(stats, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self._enabled(request):
+            return await self.get_response(request)
+
+        stats = RequestStats(request)
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self._record(stats, response, time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        stats = current_request.get()
+        if stats is None:
+            return response
+
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                stats.render_seconds += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+    def _record(self, stats, response, seconds):
+        size = 0 if response.streaming else len(response.content)
+        REGISTRY.record(stats, response.status_code, seconds, size)
+
+
+class ReadRoutingMiddleware:
+    """Mark requests handled by the API views, so ReadReplicaRouter routes their reads"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = api_request.set(False)
+        try:
+            return self.get_response(request)
+        finally:
+            api_request.reset(token)
+
+    async def __acall__(self, request):
+        token = api_request.set(False)
+        try:
+            return await self.get_response(request)
+        finally:
+            api_request.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if view_func.__module__ in API_VIEW_MODULES:
+            api_request.set(True)
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanySummary',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='stocks.company')),
+                ('current_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('last_updated', models.DateField()),
+                ('week_52_high', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('week_52_low', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('average_close', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('trailing_high', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('trailing_low', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('trailing_average_close', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0002_companysummary'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='stockdata',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='stockdata',
+            index=models.Index(fields=['company', '-date', 'close_price', 'daily_return', 'volatility_score', 'momentum'], name='stockdata_company_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockdata',
+            index=models.Index(fields=['date'], name='stockdata_date_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0003_stockdata_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorporateAction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ex_date', models.DateField()),
+                ('kind', models.CharField(choices=[('split', 'Split'), ('dividend', 'Dividend')], max_length=10)),
+                ('value', models.DecimalField(decimal_places=6, max_digits=14)),
+                ('factor', models.DecimalField(decimal_places=12, max_digits=20)),
+                ('cumulative_factor', models.DecimalField(decimal_places=12, max_digits=20)),
+                ('cumulative_volume_factor', models.DecimalField(decimal_places=12, max_digits=20)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='corporate_actions', to='stocks.company')),
+            ],
+            options={
+                'ordering': ['company', 'ex_date'],
+                'unique_together': {('company', 'ex_date', 'kind')},
+            },
+        ),
+    ]
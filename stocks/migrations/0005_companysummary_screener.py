@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0004_corporateaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companysummary',
+            name='daily_return',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='companysummary',
+            name='distance_from_high',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='companysummary',
+            name='momentum',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='companysummary',
+            name='volatility_score',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True),
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='sector',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='companysummary',
+            index=models.Index(fields=['momentum'], name='summary_momentum_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companysummary',
+            index=models.Index(fields=['volatility_score'], name='summary_volatility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companysummary',
+            index=models.Index(fields=['daily_return'], name='summary_daily_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='companysummary',
+            index=models.Index(fields=['distance_from_high'], name='summary_distance_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Max
+
+# Mirrors stocks.services.summaries as of this migration
+TRAILING_WINDOW = timedelta(weeks=52)
+LATEST_METRICS = ('daily_return', 'volatility_score', 'momentum')
+
+
+def backfill_screener_metrics(apps, schema_editor):
+    """Fill the screener columns 0005 added to summaries built before it"""
+    CompanySummary = apps.get_model('stocks', 'CompanySummary')
+    StockData = apps.get_model('stocks', 'StockData')
+
+    for summary in CompanySummary.objects.all():
+        history = StockData.objects.filter(company_id=summary.company_id)
+        latest = history.order_by('-date').values('date', 'close_price', *LATEST_METRICS).first()
+        if latest is None:
+            continue
+
+        trailing_high = history.filter(date__gt=latest['date'] - TRAILING_WINDOW).aggregate(
+            high=Max('high_price')
+        )['high']
+        summary.distance_from_high = (
+            ((1 - latest['close_price'] / trailing_high) * 100).quantize(Decimal('0.0001'))
+            if trailing_high else None
+        )
+        for field in LATEST_METRICS:
+            setattr(summary, field, latest[field])
+        summary.save(update_fields=['distance_from_high', *LATEST_METRICS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0005_companysummary_screener'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_screener_metrics, migrations.RunPython.noop),
+    ]
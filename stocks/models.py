@@ -4,7 +4,7 @@ from django.db import models
 class Company(models.Model):
     symbol = models.CharField(max_length=20, primary_key=True)
     name = models.CharField(max_length=100)
-    sector = models.CharField(max_length=50, blank=True, null=True)
+    sector = models.CharField(max_length=50, blank=True, null=True, db_index=True)
     description = models.TextField(blank=True, null=True)
 
     def __str__(self):
@@ -32,7 +32,82 @@ class StockData(models.Model):
 
     class Meta:
         unique_together = ['company', 'date']
-        ordering = ['-date']
+        indexes = [
+            # Covers the "latest N rows of a company" windows aggregated by the
+            # compare/insights endpoints without touching the table rows
+            models.Index(
+                fields=['company', '-date', 'close_price', 'daily_return', 'volatility_score', 'momentum'],
+                name='stockdata_company_recent_idx',
+            ),
+            # Cross-sectional lookups (latest trading day, date-range exports)
+            models.Index(fields=['date'], name='stockdata_date_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.company.symbol} - {self.date} - ₹{self.close_price}"
\ No newline at end of file
+        return f"{self.company.symbol} - {self.date} - ₹{self.close_price}"
+
+
+class CompanySummary(models.Model):
+    """Per-company summary maintained by ingestion, so /api/summary is a single lookup"""
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    current_price = models.DecimalField(max_digits=10, decimal_places=2)
+    last_updated = models.DateField()
+
+    # All-time aggregates over the stored history
+    week_52_high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    week_52_low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    average_close = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Trailing 52 weeks of traded prices, ending at last_updated
+    trailing_high = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    trailing_low = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    trailing_average_close = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Latest-day metrics, ranked by the screener
+    daily_return = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
+    volatility_score = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
+    momentum = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
+    # Percent the current price sits below the trailing 52-week high (0 at the high)
+    distance_from_high = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['momentum'], name='summary_momentum_idx'),
+            models.Index(fields=['volatility_score'], name='summary_volatility_idx'),
+            models.Index(fields=['daily_return'], name='summary_daily_return_idx'),
+            models.Index(fields=['distance_from_high'], name='summary_distance_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} summary as of {self.last_updated}"
+
+
+class CorporateAction(models.Model):
+    """A split or cash dividend, with the price adjustment it implies for earlier rows
+
+    StockData keeps prices as traded. Adjusted prices are derived on read:
+    a row dated before an action's ex_date is multiplied by that action's
+    cumulative_factor (the product of its own and every later action's factor).
+    """
+    SPLIT = 'split'
+    DIVIDEND = 'dividend'
+    KIND_CHOICES = [(SPLIT, 'Split'), (DIVIDEND, 'Dividend')]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='corporate_actions')
+    ex_date = models.DateField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Shares per old share for splits (2 for a 2-for-1), cash per share for dividends
+    value = models.DecimalField(max_digits=14, decimal_places=6)
+
+    # Price multiplier for rows before ex_date from this action alone
+    factor = models.DecimalField(max_digits=20, decimal_places=12)
+    # Products over this and all later actions of the company; volume only changes with splits
+    cumulative_factor = models.DecimalField(max_digits=20, decimal_places=12)
+    cumulative_volume_factor = models.DecimalField(max_digits=20, decimal_places=12)
+
+    class Meta:
+        unique_together = ['company', 'ex_date', 'kind']
+        ordering = ['company', 'ex_date']
+
+    def __str__(self):
+        return f"{self.company_id} {self.kind} {self.value} on {self.ex_date}"
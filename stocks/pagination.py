@@ -0,0 +1,73 @@
+import base64
+import binascii
+
+import numpy as np
+from django.utils.dateparse import parse_date
+
+# Default and maximum rows per page for ranged time-series requests
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order, last_date):
+    """Opaque cursor pointing just past last_date in the given order"""
+    raw = f'{order}:{last_date.isoformat()}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, order):
+    """Return the date a cursor points past, checking it was issued for this order"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        cursor_order, value = raw.split(':', 1)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Malformed cursor')
+
+    try:
+        cursor_date = parse_date(value)
+    except ValueError:
+        raise InvalidCursor('Malformed cursor')
+    if cursor_date is None or cursor_order != order:
+        raise InvalidCursor('Cursor does not match this request')
+    return cursor_date
+
+
+def keyset_page(queryset, order='desc', cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Order a per-company StockData queryset by date and apply a keyset cursor
+
+    Seeks on (company, date) instead of using OFFSET, so deep pages cost the
+    same as the first. Returns the queryset sliced to limit + 1 rows; the extra
+    row only signals that another page exists.
+    """
+    if cursor is not None:
+        cursor_date = decode_cursor(cursor, order)
+        lookup = 'date__lt' if order == 'desc' else 'date__gt'
+        queryset = queryset.filter(**{lookup: cursor_date})
+
+    return queryset.order_by('-date' if order == 'desc' else 'date')[:limit + 1]
+
+
+def keyset_slice(series, order='desc', cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Array counterpart of keyset_page for ascending column views ({'date': ..., field: ...})
+
+    Binary-searches the cursor date and returns views of up to limit + 1 rows
+    in the requested order.
+    """
+    dates = series['date']
+    lo, hi = 0, len(dates)
+    if cursor is not None:
+        cursor_date = np.datetime64(decode_cursor(cursor, order), 'D')
+        if order == 'desc':
+            hi = np.searchsorted(dates, cursor_date, 'left')
+        else:
+            lo = np.searchsorted(dates, cursor_date, 'right')
+
+    if order == 'desc':
+        window = slice(max(hi - limit - 1, lo), hi)
+        return {field: values[window][::-1] for field, values in series.items()}
+    window = slice(lo, min(lo + limit + 1, hi))
+    return {field: values[window] for field, values in series.items()}
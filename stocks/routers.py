@@ -0,0 +1,34 @@
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READ_ALIAS = 'read'
+
+# True while an API view handles the request; set by ReadRoutingMiddleware
+api_request = ContextVar('stocks_api_request', default=False)
+
+
+class ReadReplicaRouter:
+    """Send the API views' reads to the read-only 'read' alias when it is configured
+
+    Everything else, every write and reads inside a transaction on 'default'
+    use 'default'. Both aliases point at the same data, so relations between
+    their objects are allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not api_request.get() or READ_ALIAS not in connections.settings:
+            return None
+        # Inside a transaction on default, read its uncommitted writes too
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return READ_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db == READ_ALIAS else None
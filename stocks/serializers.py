@@ -1,6 +1,15 @@
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
 from rest_framework import serializers
 from .models import Company, StockData
 
+# StockData columns available to the column-oriented layout
+STOCK_DATA_COLUMNS = [
+    'date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume',
+    'daily_return', 'moving_avg_7', 'week_52_high', 'week_52_low',
+    'volatility_score', 'momentum',
+]
+
 
 class CompanySerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,4 +44,48 @@ class StockSummarySerializer(serializers.Serializer):
 class ComparisonSerializer(serializers.Serializer):
     symbol1 = serializers.CharField()
     symbol2 = serializers.CharField()
-    comparison_data = serializers.DictField()
\ No newline at end of file
+    comparison_data = serializers.DictField()
+
+
+def parse_fields(value):
+    """STOCK_DATA_COLUMNS named in a comma-separated ?fields=/--fields value, date first
+
+    date is always included (it keys every row); raises ValueError naming unknown fields.
+    """
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(STOCK_DATA_COLUMNS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ['date'] + [field for field in fields if field != 'date']
+
+
+def column_values(queryset, fields=STOCK_DATA_COLUMNS, keys=()):
+    """values_list() over the given fields, with decimals cast to floats in the database
+
+    Skips model instances and the per-value Decimal conversion, which dominate
+    serialization cost for long time series. `keys` (e.g. 'company_id') are
+    selected as-is ahead of the fields.
+    """
+    expressions = {f'_{key}': F(key) for key in keys}
+    for field in fields:
+        if field not in STOCK_DATA_COLUMNS:
+            raise ValueError(f"Unknown StockData column '{field}'")
+        internal_type = StockData._meta.get_field(field).get_internal_type()
+        expressions[f'_{field}'] = (
+            Cast(field, FloatField()) if internal_type == 'DecimalField' else F(field)
+        )
+    return queryset.values_list(*expressions.values())
+
+
+def serialize_columns(company, rows, fields=STOCK_DATA_COLUMNS):
+    """Column-oriented payload: one company header plus an array per field"""
+    columns = list(zip(*rows)) if rows else [()] * len(fields)
+    data = {}
+    for field, values in zip(fields, columns):
+        data[field] = [value.isoformat() for value in values] if field == 'date' else list(values)
+
+    return {
+        'company': {'symbol': company.symbol, 'name': company.name},
+        'count': len(rows),
+        'columns': data,
+    }
\ No newline at end of file
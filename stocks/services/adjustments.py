@@ -0,0 +1,54 @@
+import numpy as np
+
+from stocks.models import CorporateAction
+
+# Price-level columns multiplied by the adjustment factor; returns, volatility
+# and momentum are ratios and read the same adjusted or not
+PRICE_FIELDS = (
+    'open_price', 'high_price', 'low_price', 'close_price', 'moving_avg_7', 'week_52_high', 'week_52_low',
+)
+
+
+def adjustment_factors(symbol):
+    """(ex_dates, cumulative price factors, cumulative volume factors) of a symbol's actions, oldest first"""
+    actions = list(
+        CorporateAction.objects
+        .filter(company_id=symbol)
+        .order_by('ex_date')
+        .values_list('ex_date', 'cumulative_factor', 'cumulative_volume_factor')
+    )
+    if not actions:
+        return np.array([], dtype='datetime64[D]'), np.array([]), np.array([])
+    ex_dates, price, volume = zip(*actions)
+    return (
+        np.array(ex_dates, dtype='datetime64[D]'),
+        np.array(price, dtype='float64'),
+        np.array(volume, dtype='float64'),
+    )
+
+
+def factors_for(dates, factors):
+    """Per-row (price, volume) multipliers for an array of datetime64[D] dates
+
+    A row takes the cumulative factor of the first action dated after it, or
+    1 when no later action exists.
+    """
+    ex_dates, price, volume = factors
+    index = np.searchsorted(ex_dates, dates, side='right')
+    return np.append(price, 1.0)[index], np.append(volume, 1.0)[index]
+
+
+def adjust_series(symbol, series):
+    """Copy of {field: array} columns (with a 'date' column) adjusted for the symbol's corporate actions"""
+    factors = adjustment_factors(symbol)
+    if not len(factors[0]):
+        return series
+
+    price, volume = factors_for(np.asarray(series['date'], dtype='datetime64[D]'), factors)
+    adjusted = dict(series)
+    for field in PRICE_FIELDS:
+        if field in adjusted:
+            adjusted[field] = np.round(adjusted[field] * price, 4)
+    if 'volume' in adjusted:
+        adjusted['volume'] = np.rint(adjusted['volume'] * volume).astype('int64')
+    return adjusted
@@ -0,0 +1,230 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.db.models import DateField, F, Min, OuterRef, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from stocks.models import Company, StockData
+from stocks.services.columnar_store import get_store
+from stocks.serializers import column_values
+
+
+def load_recent_panel(symbols, days, fields):
+    """Latest `days` rows of every symbol in one query, as a long DataFrame (company_id, *fields)
+
+    symbols=None loads every company.
+
+    A ROW_NUMBER() window per company picks each symbol's own latest rows, so
+    symbols with different last trading days still get full windows. An
+    uncorrelated scalar subquery bounds the scan at the earliest per-symbol
+    cutoff date, so only the recent end of each company's index is read.
+
+    When the columnar store holds every requested symbol, the panel is sliced
+    from its memory-mapped columns instead.
+    """
+    fields = ['date'] + [field for field in fields if field != 'date']
+    store = get_store()
+    if store is not None:
+        panel = _stored_panel(store, symbols, days, fields)
+        if panel is not None:
+            return panel
+
+    nth_latest_date = (
+        StockData.objects
+        .filter(company_id=OuterRef('symbol'))
+        .order_by('-date')
+        .values('date')[days - 1:days]
+    )
+    companies = Company.objects.all()
+    history = StockData.objects.all()
+    if symbols is not None:
+        companies = companies.filter(symbol__in=symbols)
+        history = history.filter(company_id__in=symbols)
+
+    earliest_cutoff = (
+        companies
+        .annotate(universe=Value(1))
+        .values('universe')
+        # Symbols with fewer than `days` rows need their whole history
+        .annotate(cutoff=Min(Coalesce(Subquery(nth_latest_date), Value(datetime.date.min), output_field=DateField())))
+        .values('cutoff')
+    )
+    queryset = (
+        history
+        .filter(date__gte=Subquery(earliest_cutoff))
+        .annotate(recent_rank=Window(RowNumber(), partition_by=[F('company_id')], order_by=F('date').desc()))
+        .filter(recent_rank__lte=days)
+    )
+    return panel_frame(column_values(queryset, fields, keys=('company_id',)), fields)
+
+
+def _stored_panel(store, symbols, days, fields):
+    """load_recent_panel from the columnar store, or None if a symbol is missing from it"""
+    if symbols is None:
+        symbols = list(Company.objects.values_list('symbol', flat=True))
+
+    columns = {'company_id': []}
+    columns.update({field: [] for field in fields})
+    for symbol in symbols:
+        series = store.get_series(symbol, fields)
+        if series is None:
+            return None
+        recent = {field: values[-days:] for field, values in series.items()}
+        columns['company_id'].append(np.full(len(recent['date']), symbol, dtype=object))
+        for field in fields:
+            columns[field].append(recent[field])
+
+    if not symbols:
+        return pd.DataFrame(columns=['company_id'] + fields)
+    # Same dtypes as the database path: dates as datetime.date, numbers as floats
+    panel = pd.DataFrame({
+        field: np.concatenate(parts).astype(object) if field == 'date' else np.concatenate(parts)
+        for field, parts in columns.items()
+    })
+    numeric = [field for field in fields if field != 'date']
+    panel[numeric] = panel[numeric].astype(float)
+    return panel
+
+
+def panel_frame(rows, fields):
+    """Long DataFrame from column_values(..., keys=('company_id',)) rows"""
+    fields = ['date'] + [field for field in fields if field != 'date']
+    panel = pd.DataFrame.from_records(list(rows), columns=['company_id'] + fields)
+    numeric = [field for field in fields if field != 'date']
+    panel[numeric] = panel[numeric].astype(float)
+    return panel
+
+
+def frame_columns(frame, fields):
+    """JSON-ready {field: list} of a panel slice, with the same values as serialize_columns"""
+    columns = {}
+    for field in fields:
+        values = frame[field]
+        if field == 'date':
+            columns[field] = [value.isoformat() for value in values]
+        elif field == 'volume':
+            columns[field] = values.astype('int64').tolist()
+        else:
+            columns[field] = values.astype(object).where(values.notna(), None).tolist()
+    return columns
+
+
+def _json_values(values, digits):
+    """Round a float array and turn it into nested lists with NaN/inf as None"""
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, digits).astype(object)
+    rounded[~np.isfinite(values)] = None
+    return rounded.tolist()
+
+
+def compare_panel(panel, symbols):
+    """Cross-sectional comparison of a recent-window panel: returns, volatility, correlation and rankings"""
+    panel = panel.sort_values('date')
+    closes = panel.pivot(index='date', columns='company_id', values='close_price').reindex(columns=symbols)
+    returns = panel.pivot(index='date', columns='company_id', values='daily_return').reindex(columns=symbols)
+    vol_scores = panel.pivot(index='date', columns='company_id', values='volatility_score').reindex(columns=symbols)
+
+    # Per-symbol first/last close in its own window (symbols may have gaps)
+    first_close = closes.bfill().iloc[0] if len(closes) else pd.Series(np.nan, index=symbols)
+    last_close = closes.ffill().iloc[-1] if len(closes) else pd.Series(np.nan, index=symbols)
+
+    stats = pd.DataFrame({
+        'current_price': last_close,
+        'total_return': (last_close / first_close - 1) * 100,
+        'avg_daily_return': returns.mean() * 100,
+        'volatility': returns.std() * 100,
+        'volatility_score': vol_scores.mean(),
+        'days': returns.count(),
+    })
+    stats['risk_adjusted_return'] = stats['avg_daily_return'] / stats['volatility']
+
+    correlation = returns.corr().reindex(index=symbols, columns=symbols)
+
+    def ranking(column, ascending):
+        return stats[column].dropna().sort_values(ascending=ascending, kind='mergesort').index.tolist()
+
+    columns = {
+        'current_price': _json_values(stats['current_price'], 2),
+        'total_return': _json_values(stats['total_return'], 2),
+        'avg_daily_return': _json_values(stats['avg_daily_return'], 4),
+        'volatility': _json_values(stats['volatility'], 4),
+        'volatility_score': _json_values(stats['volatility_score'], 4),
+        'risk_adjusted_return': _json_values(stats['risk_adjusted_return'], 4),
+        'days': stats['days'].astype(int).tolist(),
+    }
+
+    return {
+        'symbols': symbols,
+        'as_of': panel['date'].max().isoformat() if len(panel) else None,
+        'performance': {
+            symbol: {name: values[i] for name, values in columns.items()}
+            for i, symbol in enumerate(symbols)
+        },
+        'correlation': _json_values(correlation.to_numpy(), 4),
+        'rankings': {
+            'total_return': ranking('total_return', ascending=False),
+            'volatility': ranking('volatility', ascending=True),
+            'risk_adjusted_return': ranking('risk_adjusted_return', ascending=False),
+        },
+    }
+
+
+# Columns the insights endpoints read for each row of the window
+INSIGHT_FIELDS = [
+    'date', 'close_price', 'volume', 'daily_return', 'moving_avg_7',
+    'week_52_high', 'volatility_score', 'momentum',
+]
+
+
+def _value_or(value, default):
+    return default if pd.isna(value) else value
+
+
+def insights_frame(panel):
+    """Per-company insight inputs from a recent-window panel, vectorized across companies
+
+    One row per company: its latest row's columns plus window counts and the
+    average volatility score.
+    """
+    panel = panel.sort_values(['company_id', 'date'], ascending=[True, False])
+    companies = panel['company_id']
+    stats = pd.DataFrame({
+        'days': companies.value_counts(sort=False),
+        'positive_days': (panel['daily_return'] > 0).groupby(companies).sum(),
+        'negative_days': (panel['daily_return'] < 0).groupby(companies).sum(),
+        'avg_volatility': panel['volatility_score'].groupby(companies).mean(),
+    })
+    latest = panel.drop_duplicates('company_id').set_index('company_id')
+    return latest.join(stats)
+
+
+def format_insights(symbol, name, row):
+    """Insights payload for one company from its insights_frame row"""
+    daily_return = _value_or(row.daily_return, 0)
+    week_52_high = _value_or(row.week_52_high, 0)
+
+    # Volatility assessment
+    avg_volatility = _value_or(row.avg_volatility, 0)
+    volatility_level = "High" if avg_volatility > 2 else "Low" if avg_volatility < 1 else "Medium"
+
+    return {
+        'symbol': symbol,
+        'name': name,
+        'current_price': row.close_price,
+        'insights': {
+            'trend': "Bullish" if daily_return > 0 else "Bearish",
+            'volatility_level': volatility_level,
+            'positive_days_ratio': f"{int(row.positive_days)}/{int(row.days)}",
+            'performance_rating': "Good" if daily_return > 0.01 else "Neutral" if daily_return > -0.01 else "Poor",
+            'momentum_strength': "Strong" if abs(_value_or(row.momentum, 0)) > 5 else "Weak",
+            'recommendation': "Watch" if volatility_level == "High" else "Consider" if daily_return > 0 else "Hold"
+        },
+        'key_metrics': {
+            'daily_change_percent': round(float(daily_return) * 100, 2),
+            'volume_today': int(row.volume),
+            'distance_from_52_week_high': round(
+                float((week_52_high - row.close_price) / (week_52_high or 1) * 100), 2),
+            'moving_avg_trend': "Above MA" if row.close_price > _value_or(row.moving_avg_7, 0) else "Below MA"
+        }
+    }
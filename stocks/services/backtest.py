@@ -0,0 +1,338 @@
+import ast
+import itertools
+import multiprocessing
+import operator
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+from stocks.models import CorporateAction, StockData
+from stocks.serializers import STOCK_DATA_COLUMNS, column_values
+from stocks.services.adjustments import factors_for
+
+TRADING_DAYS = 252
+
+# Trading costs above 100% of the traded value are never meaningful
+MAX_COST_BPS = 10_000
+
+# Columns a rule may reference, as (days x symbols) arrays
+RULE_FIELDS = [field for field in STOCK_DATA_COLUMNS if field != 'date']
+
+
+class Universe:
+    """Aligned (days x symbols) float arrays of StockData columns; NaN where a symbol has no row
+
+    Fields hold stored (traded-unit) values, so a rule compares columns of
+    the same row in one unit; price_factors adjusts closes across splits and
+    dividends for the returns.
+    """
+
+    def __init__(self, dates, symbols, fields, price_factors=None):
+        self.dates = dates
+        self.symbols = symbols
+        self.fields = fields
+        self.price_factors = price_factors
+
+    @property
+    def returns(self):
+        """Close-to-close returns of adjusted closes, 0 where either close is missing"""
+        close = self.fields['close_price']
+        if self.price_factors is not None:
+            close = close * self.price_factors
+        returns = np.zeros_like(close)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[1:] = close[1:] / close[:-1] - 1
+        returns[~np.isfinite(returns)] = 0.0
+        return returns
+
+
+def _price_factors(dates, symbols):
+    """(days x symbols) corporate action price factors, or None when no symbol has actions"""
+    actions = (
+        CorporateAction.objects
+        .filter(company_id__in=symbols)
+        .order_by('company_id', 'ex_date')
+        .values_list('company_id', 'ex_date', 'cumulative_factor', 'cumulative_volume_factor')
+    )
+    by_symbol = {}
+    for symbol, *action in actions:
+        by_symbol.setdefault(symbol, []).append(action)
+    if not by_symbol:
+        return None
+
+    factors = np.ones((len(dates), len(symbols)))
+    for column, symbol in enumerate(symbols):
+        if symbol in by_symbol:
+            ex_dates, price, volume = zip(*by_symbol[symbol])
+            factors[:, column] = factors_for(dates, (
+                np.array(ex_dates, dtype='datetime64[D]'), np.array(price, dtype='float64'),
+                np.array(volume, dtype='float64'),
+            ))[0]
+    return factors
+
+
+def load_universe(symbols, fields, start=None, end=None):
+    """Load symbols' history between start and end (inclusive) into a Universe
+
+    One query reads the history and one the symbols' corporate actions.
+    """
+    fields = list(dict.fromkeys(['close_price'] + list(fields)))
+    history = StockData.objects.filter(company_id__in=symbols)
+    if start:
+        history = history.filter(date__gte=start)
+    if end:
+        history = history.filter(date__lte=end)
+
+    frame = pd.DataFrame.from_records(
+        list(column_values(history, ['date'] + fields, keys=('company_id',))),
+        columns=['company_id', 'date'] + fields,
+    )
+    dates = np.array(sorted(frame['date'].unique()), dtype='datetime64[D]')
+    arrays = {
+        field: (
+            frame.pivot(index='date', columns='company_id', values=field)
+            .reindex(columns=symbols)
+            .to_numpy(dtype='float64')
+        ) if not frame.empty else np.empty((0, len(symbols)))
+        for field in fields
+    }
+    return Universe(dates, list(symbols), arrays, _price_factors(dates, symbols))
+
+
+def _truth(value):
+    """Element-wise truth of a rule value; NaN (e.g. a metric still warming up) is False"""
+    value = np.asarray(value)
+    if value.dtype.kind == 'f':
+        return ~np.isnan(value) & (value != 0)
+    return value.astype(bool)
+
+
+def _number(value):
+    """Arithmetic operand of a rule; booleans (comparison results) count as 0 and 1, as in Python"""
+    value = np.asarray(value)
+    return value.astype('float64') if value.dtype.kind == 'b' else value
+
+
+# Operators allowed in rules; `and`/`or`/`not` and `&`/`|`/`~` act element-wise on the arrays' truth
+ARITHMETIC_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+}
+LOGICAL_OPERATORS = {ast.BitAnd: np.logical_and, ast.BitOr: np.logical_or}
+BINARY_OPERATORS = {**ARITHMETIC_OPERATORS, **LOGICAL_OPERATORS}
+COMPARISONS = {
+    ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+FUNCTIONS = {'abs': np.abs}
+
+
+class Rule:
+    """A signal rule such as "momentum > min_momentum and close_price > moving_avg_7"
+
+    Names are StockData columns or parameters supplied at evaluation time.
+    The rule is parsed once into a Python AST and evaluated over whole
+    (days x symbols) arrays; anything beyond arithmetic, comparisons,
+    and/or/not and abs() is rejected, so rules from API users never reach eval().
+    """
+
+    def __init__(self, text):
+        self.text = text
+        try:
+            self.tree = ast.parse(text, mode='eval').body
+        except SyntaxError as e:
+            raise ValueError(f'Invalid rule: {e.msg}')
+
+        names = set()
+        self._check(self.tree, names)
+        self.fields = sorted(names & set(RULE_FIELDS))
+        self.parameters = sorted(names - set(RULE_FIELDS))
+
+    def _check(self, node, names):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError('Rules may only contain numeric constants')
+        elif isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            self._check(node.left, names)
+            self._check(node.right, names)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.Not, ast.Invert)):
+            self._check(node.operand, names)
+        elif isinstance(node, ast.BoolOp):
+            for value in node.values:
+                self._check(value, names)
+        elif isinstance(node, ast.Compare) and all(type(op) in COMPARISONS for op in node.ops):
+            for operand in [node.left] + node.comparators:
+                self._check(operand, names)
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+              and len(node.args) == 1 and not node.keywords):
+            self._check(node.args[0], names)
+        else:
+            raise ValueError(f'Unsupported expression in rule: {ast.unparse(node)}')
+
+    def evaluate(self, fields, parameters):
+        """Boolean (days x symbols) signal; comparisons with NaN and bare NaN values are False"""
+        missing = [name for name in self.parameters if name not in parameters]
+        if missing:
+            raise ValueError(f"Missing rule parameters: {', '.join(missing)}")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            signal = self._eval(self.tree, fields, parameters)
+        return np.broadcast_to(_truth(signal), fields['close_price'].shape)
+
+    def _eval(self, node, fields, parameters):
+        evaluate = lambda child: self._eval(child, fields, parameters)  # noqa: E731
+        if isinstance(node, ast.Name):
+            return fields[node.id] if node.id in fields else parameters[node.id]
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.BinOp):
+            if type(node.op) in LOGICAL_OPERATORS:
+                return LOGICAL_OPERATORS[type(node.op)](_truth(evaluate(node.left)), _truth(evaluate(node.right)))
+            return ARITHMETIC_OPERATORS[type(node.op)](_number(evaluate(node.left)), _number(evaluate(node.right)))
+        if isinstance(node, ast.UnaryOp):
+            operand = evaluate(node.operand)
+            return -_number(operand) if isinstance(node.op, ast.USub) else ~_truth(operand)
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            values = [_truth(evaluate(value)) for value in node.values]
+            return combine.reduce(np.broadcast_arrays(*values)) if len(values) > 1 else values[0]
+        if isinstance(node, ast.Compare):
+            result, left = True, evaluate(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = evaluate(comparator)
+                result = np.logical_and(result, COMPARISONS[type(op)](left, right))
+                left = right
+            return result
+        return FUNCTIONS[node.func.id](_number(evaluate(node.args[0])))
+
+
+def simulate(signal, returns, cost_bps=0.0):
+    """Equal-weight long-only portfolio of the symbols signalled each day, traded at the next close
+
+    Returns (daily returns, equity curve, drawdown, turnover) arrays; the
+    position chosen on day t earns day t+1's return, so there is no lookahead.
+    Equity stays at 0 once losses and costs have wiped it out.
+    """
+    held = signal.sum(axis=1, keepdims=True)
+    weights = np.divide(signal, held, out=np.zeros(signal.shape), where=held > 0)
+
+    previous = np.vstack([np.zeros((1, weights.shape[1])), weights[:-1]])
+    turnover = np.abs(weights - previous).sum(axis=1)
+    daily = (previous * returns).sum(axis=1) - turnover * cost_bps / 10_000
+
+    equity = np.cumprod(1 + daily)
+    equity[np.logical_or.accumulate(equity <= 0)] = 0.0
+    drawdown = equity / np.maximum.accumulate(equity) - 1 if len(equity) else equity
+    return daily, equity, drawdown, turnover
+
+
+def summarize(daily, equity, drawdown, turnover):
+    """Headline statistics of one simulated run"""
+    if not len(equity):
+        return {'days': 0}
+    deviation = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    return {
+        'days': len(equity),
+        'total_return': round(float(equity[-1] - 1), 6),
+        'annual_return': round(float(equity[-1] ** (TRADING_DAYS / len(equity)) - 1), 6),
+        'annual_volatility': round(float(deviation * np.sqrt(TRADING_DAYS)), 6),
+        'sharpe': round(float(daily.mean() / deviation * np.sqrt(TRADING_DAYS)), 4) if deviation > 0 else None,
+        'max_drawdown': round(float(drawdown.min()), 6),
+        'average_turnover': round(float(turnover.mean()), 6),
+    }
+
+
+def run_backtest(universe, rule, parameters=None, cost_bps=0.0):
+    """Simulate one rule over a Universe, returns stats plus the daily curves"""
+    signal = rule.evaluate(universe.fields, parameters or {})
+    daily, equity, drawdown, turnover = simulate(signal, universe.returns, cost_bps)
+    return {
+        'parameters': parameters or {},
+        'stats': summarize(daily, equity, drawdown, turnover),
+        'curves': {
+            'date': np.datetime_as_string(universe.dates, unit='D').tolist(),
+            'equity': np.round(equity, 6).tolist(),
+            'drawdown': np.round(drawdown, 6).tolist(),
+            'turnover': np.round(turnover, 6).tolist(),
+        },
+    }
+
+
+def parse_parameters(values):
+    """{name: [values]} from 'name=v1,v2' strings, the form of --param and ?param="""
+    grid = {}
+    for value in values:
+        name, separator, numbers = value.partition('=')
+        if not separator or not name.strip():
+            raise ValueError(f"Rule parameters must look like name=v1,v2, not '{value}'")
+        grid[name.strip()] = [float(number) for number in numbers.split(',')]
+    return grid
+
+
+def parameter_grid(grid):
+    """Every combination of {name: [values]} as a list of {name: value}"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# Worker process state: shared-memory blocks and the arrays viewing them
+_worker = {}
+
+
+def _attach(specs, rule_text, cost_bps):
+    """Process pool initializer: map the parent's shared arrays without copying them"""
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in specs.items():
+        # Forked workers share the parent's resource tracker, so the parent's unlink() stays the only cleanup
+        block = SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _worker.update(blocks=blocks, arrays=arrays, rule=Rule(rule_text), cost_bps=cost_bps)
+
+
+def _run_shared(parameters):
+    arrays = _worker['arrays']
+    signal = _worker['rule'].evaluate(arrays, parameters)
+    return summarize(*simulate(signal, arrays['returns'], _worker['cost_bps']))
+
+
+def run_grid(universe, rule, grid, cost_bps=0.0, workers=1):
+    """Stats for every parameter combination of `grid`, in grid order
+
+    With workers > 1 the universe's arrays are copied once into shared memory
+    and every pool process maps them, so each combination only ships its
+    parameters. Workers are forked: they run NumPy only, never touch the
+    inherited database connections and exit without closing them.
+    """
+    combinations = parameter_grid(grid)
+    arrays = dict(universe.fields, returns=universe.returns)
+    if workers <= 1 or len(combinations) <= 1:
+        return [
+            {'parameters': parameters,
+             'stats': summarize(*simulate(rule.evaluate(arrays, parameters), arrays['returns'], cost_bps))}
+            for parameters in combinations
+        ]
+
+    blocks, specs = [], {}
+    try:
+        for name, array in arrays.items():
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            specs[name] = (block.name, array.shape, array.dtype.str)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_attach,
+            initargs=(specs, rule.text, cost_bps),
+        ) as pool:
+            stats = list(pool.map(_run_shared, combinations, chunksize=max(1, len(combinations) // (workers * 4))))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return [{'parameters': parameters, 'stats': result} for parameters, result in zip(combinations, stats)]
@@ -0,0 +1,631 @@
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import django
+import pandas as pd
+from django.db import OperationalError, connection, connections, transaction
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+
+from stocks.models import Company, StockData
+from stocks.routers import READ_ALIAS
+from stocks.services.analytics import load_recent_panel
+from stocks.services.cache import bump_data_version
+from stocks.services.columnar_store import ColumnarStore, get_store, sync_store
+from stocks.serializers import StockDataSerializer, column_values, serialize_columns
+from stocks.services.data_collector import StockDataCollector
+from stocks.services.export import EXPORT_FORMATS, export_rows
+from stocks.services.providers import SyntheticProvider
+from stocks.services.query_plans import HOT_ENDPOINTS, audit_hot_queries, local_client
+from stocks.services.sqlite import apply_pragmas
+from stocks.services.summaries import refresh_summaries
+from stocks.services.synthetic import generate_ohlcv, generate_universe
+from stocks.services.window_metrics import recompute_metrics
+
+BENCHMARK_SYMBOL = 'BENCH'
+
+# Driftless, low-volatility paths stay inside the price columns' range over centuries of rows
+LONG_HISTORY = {'annual_drift': (0.0, 0.0), 'annual_volatility': (0.05, 0.05), 'start_price': (100.0, 100.0)}
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _create_companies(tickers):
+    """Create the benchmark companies, refusing symbols that already exist
+
+    Benchmarks delete their companies afterwards, so they must never adopt an
+    existing one: a real company, or one a killed run left behind.
+    """
+    existing = list(Company.objects.filter(symbol__in=tickers).order_by('symbol').values_list('symbol', flat=True))
+    if existing:
+        raise ValueError(
+            f"Benchmark symbols already exist: {', '.join(existing[:5])}{', ...' if len(existing) > 5 else ''}; "
+            "benchmarks create and delete their own companies, so remove or rename these first"
+        )
+    return Company.objects.bulk_create(
+        [Company(symbol=ticker, name=f'Benchmark {ticker}', sector='Benchmark') for ticker in tickers]
+    )
+
+
+def seed_history(symbols, rows, prefix=BENCHMARK_SYMBOL, seed=0, **universe_options):
+    """Create benchmark companies and insert a synthetic universe with raw executemany, returns the symbols
+
+    universe_options are passed to generate_universe (e.g. a lower volatility
+    keeps very long histories inside the price columns' range).
+    """
+    tickers = [f'{prefix}{i:05d}' for i in range(symbols)]
+    _create_companies(tickers)
+
+    fields = ['company_id', 'date'] + [
+        field for field, _ in (
+            list(StockDataCollector.PRICE_COLUMNS.values()) + [('volume', 0)]
+            + list(StockDataCollector.METRIC_COLUMNS.values())
+        )
+    ]
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        StockData._meta.db_table, ', '.join(fields), ', '.join(['%s'] * len(fields))
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i, frame in generate_universe(symbols, rows, seed=seed, **universe_options):
+            columns = StockDataCollector.frame_to_columns(StockDataCollector.calculate_metrics(frame))
+            cursor.executemany(sql, [
+                (tickers[i], *values)
+                for values in zip(*(columns[field] for field in fields[1:]))
+            ])
+        if connection.vendor in ('sqlite', 'postgresql'):
+            cursor.execute('ANALYZE')
+
+    # The raw inserts bypass the ingestion paths, which bump these themselves
+    bump_data_version(*tickers)
+    return tickers
+
+
+def drop_seeded(tickers):
+    """Delete benchmark companies with their history, cached responses and columnar store entries"""
+    StockData.objects.filter(company_id__in=tickers).delete()
+    Company.objects.filter(symbol__in=tickers).delete()
+    store = get_store()
+    if store is not None:
+        for ticker in tickers:
+            store.delete(ticker)
+    bump_data_version(*tickers)
+
+
+def bench_ingestion(rows=500, batch_size=None):
+    """Compare the per-row and bulk ingestion paths on a synthetic symbol"""
+    frame = StockDataCollector.calculate_metrics(generate_ohlcv(rows, seed=42))
+    paths = {
+        'per_row': StockDataCollector.save_stock_data,
+        'bulk': lambda symbol, df: StockDataCollector.bulk_save_stock_data(symbol, df, batch_size),
+    }
+
+    symbol = BENCHMARK_SYMBOL
+    _create_companies([symbol])
+    results = []
+    try:
+        for path, save in paths.items():
+            StockData.objects.filter(company_id=symbol).delete()
+            # First pass inserts every row, second pass updates every row
+            for phase in ('insert', 'update'):
+                _, elapsed = _timed(save, symbol, frame)
+                results.append({
+                    'benchmark': 'ingestion',
+                    'path': path,
+                    'phase': phase,
+                    'rows': rows,
+                    'seconds': round(elapsed, 4),
+                    'rows_per_second': round(rows / elapsed, 1),
+                })
+    finally:
+        drop_seeded([symbol])
+
+    return results
+
+
+def bench_collection(rows=500, symbols=20, latency=0.25, worker_counts=(1, 4, 8)):
+    """Time collect_symbols at several worker counts with a simulated network latency"""
+    tickers = [f'{BENCHMARK_SYMBOL}{i:03d}' for i in range(symbols)]
+    _create_companies(tickers)
+    results = []
+    try:
+        for workers in worker_counts:
+            StockData.objects.filter(company_id__in=tickers).delete()
+            provider = SyntheticProvider(latency=latency, days=rows)
+            _, elapsed = _timed(StockDataCollector.collect_symbols, tickers, workers=workers, provider=provider)
+            results.append({
+                'benchmark': 'collection',
+                'workers': workers,
+                'symbols': symbols,
+                'rows': rows * symbols,
+                'latency': latency,
+                'seconds': round(elapsed, 4),
+                'symbols_per_second': round(symbols / elapsed, 2),
+            })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+def bench_query_plans(rows=1000, symbols=1000, repeat=20):
+    """Seed a large table, then time each hot endpoint (uncached) and check its query plans use indexes"""
+    tickers = seed_history(symbols, rows)
+    refresh_summaries(tickers[:2])
+    client = local_client()
+    results = []
+    try:
+        for endpoint, (status_code, report) in audit_hot_queries(tickers[0], tickers[1]).items():
+            url = HOT_ENDPOINTS[endpoint].format(symbol=tickers[0], other=tickers[1])
+            with override_settings(STOCKS_API_CACHE_ENABLED=False):
+                _, elapsed = _timed(lambda: [client.get(url) for _ in range(repeat)])
+            results.append({
+                'benchmark': 'query_plans',
+                'endpoint': endpoint,
+                'table_rows': rows * symbols,
+                'status': status_code,
+                'queries': len(report),
+                'plan_problems': sum(len(query['problems']) for query in report),
+                'ms_per_request': round(elapsed / repeat * 1000, 3),
+            })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+def bench_serialization(rows=None, sizes=(30, 1000, 100000), repeat=3):
+    """Rows/second of the ModelSerializer and column-oriented paths, including JSON rendering"""
+    sizes = [rows] if rows else sizes
+    renderer = JSONRenderer()
+    tickers = seed_history(1, max(sizes), **LONG_HISTORY)
+    company = Company.objects.get(symbol=tickers[0])
+
+    paths = {
+        'model_serializer': lambda qs: StockDataSerializer(qs, many=True).data,
+        'model_serializer_select_related': lambda qs: StockDataSerializer(qs.select_related('company'), many=True).data,
+        'columns': lambda qs: serialize_columns(company, list(column_values(qs))),
+    }
+
+    results = []
+    try:
+        for size in sizes:
+            queryset = StockData.objects.filter(company=company).order_by('-date')[:size]
+            for path, serialize in paths.items():
+                # The N+1 path issues one company query per row; skip it at scale
+                if path == 'model_serializer' and size > 1000:
+                    continue
+                _, elapsed = _timed(lambda: [renderer.render(serialize(queryset)) for _ in range(repeat)])
+                results.append({
+                    'benchmark': 'serialization',
+                    'path': path,
+                    'rows': size,
+                    'seconds': round(elapsed / repeat, 4),
+                    'rows_per_second': round(size * repeat / elapsed, 1),
+                })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+def bench_compare(rows=300, symbols=None, symbol_counts=(2, 10, 50, 200), repeat=5):
+    """Latency of the multi-symbol compare mode as the symbol count grows"""
+    symbol_counts = [symbols] if symbols else symbol_counts
+    tickers = seed_history(max(symbol_counts), rows)
+    client = local_client()
+    results = []
+    try:
+        for count in symbol_counts:
+            url = f"/stocks/api/compare/?symbols={','.join(tickers[:count])}&days=30"
+            with override_settings(STOCKS_API_CACHE_ENABLED=False):
+                _, elapsed = _timed(lambda: [client.get(url) for _ in range(repeat)])
+            results.append({
+                'benchmark': 'compare',
+                'symbols': count,
+                'rows_per_symbol': rows,
+                'ms_per_request': round(elapsed / repeat * 1000, 3),
+            })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+def bench_columnar(rows=5000, symbols=20, repeat=5):
+    """Full-history and panel reads through the ORM versus the memory-mapped columnar store"""
+    tickers = seed_history(symbols, rows, **LONG_HISTORY)
+    fields = ['date', 'close_price', 'volume', 'daily_return']
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as root, override_settings(STOCKS_COLUMNAR_STORE_DIR=root):
+            _, elapsed = _timed(sync_store, tickers)
+            results.append({
+                'benchmark': 'columnar',
+                'read': 'sync',
+                'path': 'store',
+                'rows': rows * symbols,
+                'seconds': round(elapsed, 4),
+                'rows_per_second': round(rows * symbols / elapsed, 1),
+            })
+
+            store = ColumnarStore(root)
+            reads = {
+                'full_history': {
+                    'orm': lambda: [
+                        list(column_values(StockData.objects.filter(company_id=ticker).order_by('date'), fields))
+                        for ticker in tickers
+                    ],
+                    # Sum forces every page of the mapped files to be read
+                    'store': lambda: [
+                        store.get_series(ticker, fields)['close_price'].sum() for ticker in tickers
+                    ],
+                },
+                'panel_252': {
+                    'orm': lambda: load_recent_panel(tickers, 252, fields),
+                    'store': lambda: load_recent_panel(tickers, 252, fields),
+                },
+            }
+            for read, paths in reads.items():
+                for path, func in paths.items():
+                    # Only the store path sees the store directory
+                    with override_settings(STOCKS_COLUMNAR_STORE_DIR=root if path == 'store' else None):
+                        _, elapsed = _timed(lambda: [func() for _ in range(repeat)])
+                    read_rows = rows * symbols if read == 'full_history' else min(rows, 252) * symbols
+                    results.append({
+                        'benchmark': 'columnar',
+                        'read': read,
+                        'path': path,
+                        'rows': read_rows,
+                        'seconds': round(elapsed / repeat, 4),
+                        'rows_per_second': round(read_rows * repeat / elapsed, 1),
+                    })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+def bench_endpoints(rows=None, symbols=None, scales=((10, 252), (50, 1260), (200, 2520)), repeat=20):
+    """Uncached latency of every hot endpoint at several (symbols, rows per symbol) data scales"""
+    if rows or symbols:
+        scales = [(symbols or 10, rows or 252)]
+    client = local_client()
+    results = []
+    for scale_symbols, scale_rows in scales:
+        tickers = seed_history(scale_symbols, scale_rows)
+        try:
+            refresh_summaries(tickers[:2])
+            for endpoint, url in HOT_ENDPOINTS.items():
+                url = url.format(symbol=tickers[0], other=tickers[1])
+                latencies = []
+                with override_settings(STOCKS_API_CACHE_ENABLED=False):
+                    for _ in range(repeat):
+                        response, elapsed = _timed(client.get, url)
+                        latencies.append(elapsed * 1000)
+                latencies.sort()
+                results.append({
+                    'benchmark': 'endpoints',
+                    'endpoint': endpoint,
+                    'symbols': scale_symbols,
+                    'rows_per_symbol': scale_rows,
+                    'status': response.status_code,
+                    'p50_ms': round(latencies[len(latencies) // 2], 3),
+                    'max_ms': round(latencies[-1], 3),
+                })
+        finally:
+            drop_seeded(tickers)
+
+    return results
+
+
+def bench_metrics(rows=1260, symbols=20):
+    """Recompute every symbol's metrics in pandas (load, calculate, upsert) versus SQL window functions"""
+    tickers = seed_history(symbols, rows)
+
+    def pandas_recompute():
+        for ticker in tickers:
+            history = StockDataCollector.load_recent_history(ticker, rows)
+            StockDataCollector.bulk_save_stock_data(ticker, StockDataCollector.calculate_metrics(history))
+
+    results = []
+    try:
+        for path, func in (('pandas', pandas_recompute), ('database', lambda: recompute_metrics(tickers))):
+            _, elapsed = _timed(func)
+            results.append({
+                'benchmark': 'metrics',
+                'path': path,
+                'rows': rows * symbols,
+                'seconds': round(elapsed, 4),
+                'rows_per_second': round(rows * symbols / elapsed, 1),
+            })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+# Endpoints hit by the readers of the read-during-ingest benchmark
+INGEST_READS = ('stock_data', 'stock_summary', 'stock_insights')
+
+
+def _reads_during_ingest(tickers, frames, seconds, readers):
+    """Run one writer re-ingesting history and `readers` API clients for `seconds`"""
+    stop = threading.Event()
+    latencies, errors, writes, write_errors = [], [], [], []
+
+    def write():
+        try:
+            i = 0
+            while not stop.is_set():
+                try:
+                    _, elapsed = _timed(
+                        StockDataCollector.bulk_save_stock_data, tickers[i % len(tickers)], frames[i % len(frames)]
+                    )
+                    writes.append(elapsed)
+                except OperationalError:
+                    # 'database is locked' once the busy timeout runs out
+                    write_errors.append(i)
+                i += 1
+        finally:
+            # Each thread has its own connection
+            connection.close()
+
+    def read(reader):
+        client = local_client()
+        urls = [
+            HOT_ENDPOINTS[endpoint].format(symbol=ticker, other=ticker)
+            for ticker in tickers for endpoint in INGEST_READS
+        ]
+        try:
+            i = reader
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    ok = client.get(urls[i % len(urls)]).status_code == 200
+                except Exception:
+                    ok = False
+                (latencies if ok else errors).append((time.perf_counter() - start) * 1000)
+                i += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=write)] + [
+        threading.Thread(target=read, args=(reader,)) for reader in range(readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors, writes, write_errors
+
+
+def bench_read_during_ingest(rows=2520, symbols=4, seconds=5.0, readers=4):
+    """API read latency while a writer keeps re-ingesting history, per SQLite journal profile
+
+    'rollback' is SQLite's default (rollback journal, no tuning), 'wal' the
+    stocks.services.sqlite profile. Other backends run once as configured.
+    Reads go to the 'read' alias when DATABASE_READ_URL configures one.
+    """
+    tickers = seed_history(symbols, rows)
+    refresh_summaries(tickers)
+    frames = [StockDataCollector.calculate_metrics(frame) for _, frame in generate_universe(symbols, rows, seed=1)]
+    profiles = ('rollback', 'wal') if connection.vendor == 'sqlite' else ('configured',)
+    results = []
+    try:
+        for profile in profiles:
+            connections.close_all()
+            with override_settings(STOCKS_SQLITE_TUNING=profile != 'rollback', STOCKS_API_CACHE_ENABLED=False):
+                if profile == 'rollback':
+                    # journal_mode is stored in the database file, so switch it back explicitly
+                    connection.ensure_connection()
+                    apply_pragmas(connection, {'journal_mode': 'DELETE'})
+                latencies, errors, writes, write_errors = _reads_during_ingest(tickers, frames, seconds, readers)
+                connections.close_all()
+
+            results.append({
+                'benchmark': 'read_during_ingest',
+                'profile': profile,
+                'read_connection': READ_ALIAS if READ_ALIAS in connections.settings else 'default',
+                'readers': readers,
+                'reads': len(latencies),
+                'errors': len(errors),
+                'reads_per_second': round(len(latencies) / seconds, 1),
+                'p50_ms': round(latencies[len(latencies) // 2], 3) if latencies else None,
+                'p99_ms': round(latencies[int(len(latencies) * 0.99)], 3) if latencies else None,
+                'max_ms': round(latencies[-1], 3) if latencies else None,
+                'write_errors': len(write_errors),
+                'rows_per_second': round(rows * len(writes) / sum(writes), 1) if writes else None,
+            })
+    finally:
+        # Leave the database in the configured profile
+        connections.close_all()
+        connection.ensure_connection()
+        drop_seeded(tickers)
+
+    return results
+
+
+def _rss_mb():
+    """Current RSS in MB, or None without /proc (e.g. macOS)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError:
+        return None
+
+
+def _peak_rss_mb():
+    """Peak RSS of this process in MB, or None without the resource module (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux and the BSDs
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def _measure_child(func, pipe):
+    start_rss = _rss_mb()
+    result, elapsed = _timed(func)
+    peak_rss = _peak_rss_mb()
+    growth = peak_rss - start_rss if peak_rss is not None and start_rss is not None else None
+    pipe.send((result, elapsed, peak_rss, growth))
+    pipe.close()
+
+
+def _in_fresh_process(func):
+    """Run func() in a forked process, returns (result, seconds, peak RSS MB, RSS growth MB)
+
+    A process of its own gives every measurement its own RSS high-water mark.
+    The RSS figures are None where the platform cannot report them.
+    """
+    # The child opens its own connection instead of sharing the parent's
+    connections.close_all()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.get_context('fork').Process(target=_measure_child, args=(func, sender))
+    process.start()
+    sender.close()
+    measurement = receiver.recv()
+    process.join()
+    return measurement
+
+
+def bench_export(rows=2520, symbols=100):
+    """MB/s and peak RSS of the streaming export endpoint per format, against building a CSV in memory
+
+    Each export runs in a forked process so peak RSS is per export. Parquet and
+    Arrow are skipped without pyarrow. With the SQLite profile, pages of its
+    page cache and mmap window count towards RSS too (STOCKS_SQLITE_TUNING=0
+    leaves them out).
+    """
+    tickers = seed_history(symbols, rows)
+
+    def stream(output):
+        response = local_client().get(f'/stocks/api/export/?output={output}&symbols={",".join(tickers)}')
+        return sum(len(chunk) for chunk in response.streaming_content)
+
+    def materialized():
+        frame = pd.DataFrame(list(export_rows(tickers)))
+        return len(frame.to_csv(index=False).encode())
+
+    paths = {output: (lambda output=output: stream(output)) for output in EXPORT_FORMATS}
+    paths['csv_materialized'] = materialized
+    results = []
+    try:
+        for path, func in paths.items():
+            if path in ('parquet', 'arrow'):
+                try:
+                    import pyarrow  # noqa: F401
+                except ImportError:
+                    continue
+            size, elapsed, peak_rss, rss_growth = _in_fresh_process(func)
+            results.append({
+                'benchmark': 'export',
+                'path': path,
+                'rows': rows * symbols,
+                'megabytes': round(size / 1e6, 2),
+                'seconds': round(elapsed, 4),
+                'megabytes_per_second': round(size / 1e6 / elapsed, 2),
+                'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+                'rss_growth_mb': round(rss_growth, 1) if rss_growth is not None else None,
+            })
+    finally:
+        drop_seeded(tickers)
+
+    return results
+
+
+SUITES = {
+    'ingestion': bench_ingestion,
+    'collection': bench_collection,
+    'columnar': bench_columnar,
+    'compare': bench_compare,
+    'endpoints': bench_endpoints,
+    'export': bench_export,
+    'metrics': bench_metrics,
+    'query_plans': bench_query_plans,
+    'read_during_ingest': bench_read_during_ingest,
+    'serialization': bench_serialization,
+}
+
+
+# Result fields that are measurements, and whether lower values are better;
+# every other field identifies the measurement
+RESULT_METRICS = {
+    'seconds': True,
+    'ms_per_request': True,
+    'p50_ms': True,
+    'p99_ms': True,
+    'max_ms': True,
+    'reads': False,
+    'reads_per_second': False,
+    'errors': True,
+    'write_errors': True,
+    'rows_per_second': False,
+    'symbols_per_second': False,
+    'megabytes': True,
+    'megabytes_per_second': False,
+    'peak_rss_mb': True,
+    'rss_growth_mb': True,
+}
+
+
+def results_document(suite, results, parameters=None):
+    """JSON-serializable record of one suite run, for tracking regressions"""
+    return {
+        'suite': suite,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'parameters': parameters or {},
+        'results': results,
+    }
+
+
+def find_regressions(baseline, results, tolerance=0.2):
+    """Measurements more than `tolerance` worse than the matching baseline result
+
+    Results are matched on their identifying (non-metric) fields; returns a
+    list of {'result': identity, 'metric', 'baseline', 'current', 'change'}.
+    """
+    def identity(result):
+        return tuple(sorted((key, value) for key, value in result.items() if key not in RESULT_METRICS))
+
+    previous = {identity(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get(identity(result))
+        if before is None:
+            continue
+        for metric, lower_is_better in RESULT_METRICS.items():
+            if not before.get(metric) or result.get(metric) is None:
+                continue
+            change = result[metric] / before[metric] - 1
+            if (change > tolerance) if lower_is_better else (change < -tolerance):
+                regressions.append({
+                    'result': dict(identity(result)),
+                    'metric': metric,
+                    'baseline': before[metric],
+                    'current': result[metric],
+                    'change': round(change, 4),
+                })
+    return regressions
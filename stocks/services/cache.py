@@ -0,0 +1,171 @@
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+VERSION_KEY = 'stocks:version:{}'
+RESPONSE_KEY = 'stocks:api:{}:{}'
+
+# Version bumped on every change, for endpoints that span the whole universe
+UNIVERSE = '__all__'
+
+# Version bumped when stored history is rewritten rather than extended:
+# backfills, restatements, corrections and metric recomputes. State derived
+# from past days (the correlation windows) is rebuilt when it changes.
+HISTORY = '__history__'
+
+
+def _new_version():
+    # Fresh versions start from a clock value so an evicted version key can
+    # never come back as a number that earlier cache entries were stored under
+    return time.time_ns()
+
+
+def data_versions(symbols):
+    """Current data version for each symbol (and the universe), creating missing ones"""
+    keys = {VERSION_KEY.format(symbol): symbol for symbol in symbols}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, _new_version(), timeout=None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_data_version(*symbols):
+    """Invalidate every cached response that depends on the given symbols"""
+    for symbol in symbols + (UNIVERSE,):
+        key = VERSION_KEY.format(symbol)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=None)
+
+
+def bump_on_commit(*symbols):
+    """Bump versions once the surrounding transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: bump_data_version(*symbols))
+
+
+def split_symbols(values):
+    """Symbols from comma-separated values such as ?symbols=A,B: stripped and deduplicated in order
+
+    The views read ?symbols= through this too, so cached responses are
+    tagged with exactly the symbols the view loaded. Case is kept: symbols
+    are matched exactly everywhere else (URL kwargs, ingestion).
+    """
+    return list(dict.fromkeys(symbol.strip() for value in values for symbol in value.split(',') if symbol.strip()))
+
+
+def history_version():
+    """Current HISTORY version"""
+    return data_versions([HISTORY])[HISTORY]
+
+
+def bump_history_on_commit():
+    """Mark stored history as rewritten once the surrounding transaction commits"""
+    transaction.on_commit(lambda: bump_data_version(HISTORY))
+
+
+def request_symbols(request, kwargs):
+    """Symbols a request reads: the URL symbol plus symbol1/symbol2/symbols query params"""
+    symbols = set()
+    if 'symbol' in kwargs:
+        symbols.add(kwargs['symbol'])
+    for param in ('symbol1', 'symbol2'):
+        if request.GET.get(param):
+            symbols.add(request.GET[param])
+    symbols.update(split_symbols(request.GET.getlist('symbols')))
+    return sorted(symbols) or [UNIVERSE]
+
+
+def _cache_lookup(name, request, kwargs, universe=False):
+    """(ETag, response headers, cache key, cached value or None) for a request"""
+    symbols = request_symbols(request, kwargs)
+    versions = data_versions(symbols + [UNIVERSE] if universe else symbols)
+    material = '|'.join([
+        request.path,
+        '&'.join(sorted(f'{key}={value}' for key, values in request.GET.lists() for value in values)),
+        *(f'{symbol}:{version}' for symbol, version in sorted(versions.items())),
+    ])
+    digest = hashlib.sha1(material.encode()).hexdigest()
+    etag = f'"{digest}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    key = RESPONSE_KEY.format(name, digest)
+    return etag, headers, key, cache.get(key)
+
+
+def _not_modified(request, etag):
+    return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+
+def _cache_timeout():
+    return getattr(settings, 'STOCKS_API_CACHE_TIMEOUT', 86400)
+
+
+def cached_api_view(view=None, *, universe=False):
+    """Cache a DRF view's 200 responses per symbol data version, with ETag revalidation
+
+    Apply below @api_view. Entries are keyed by path, query string and the data
+    version of every symbol the request reads, so ingestion invalidates exactly
+    the affected responses; STOCKS_API_CACHE_TIMEOUT only bounds memory use.
+    @cached_api_view(universe=True) also keys on the universe version, for
+    views that embed data about every company.
+    """
+    if view is None:
+        return lambda view: cached_api_view(view, universe=universe)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not getattr(settings, 'STOCKS_API_CACHE_ENABLED', True):
+            return view(request, *args, **kwargs)
+
+        etag, headers, key, data = _cache_lookup(view.__name__, request, kwargs, universe)
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if data is not None:
+            return Response(data, headers=headers)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=_cache_timeout())
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    return wrapper
+
+
+def cached_async_view(view):
+    """cached_api_view for async views returning JSON HttpResponses
+
+    Shares the data versions (and so the invalidation) of the DRF views, but
+    caches rendered response bodies under the async view's own name.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not getattr(settings, 'STOCKS_API_CACHE_ENABLED', True):
+            return await view(request, *args, **kwargs)
+
+        name = f'async:{view.__name__}'
+        etag, headers, key, content = await sync_to_async(_cache_lookup)(name, request, kwargs)
+        if _not_modified(request, etag):
+            return HttpResponseNotModified(headers=headers)
+        if content is not None:
+            return HttpResponse(content, content_type='application/json', headers=headers)
+
+        response = await view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset(key, response.content, timeout=_cache_timeout())
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    return wrapper
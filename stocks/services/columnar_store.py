@@ -0,0 +1,199 @@
+import os
+import shutil
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from stocks.models import Company, StockData
+from stocks.serializers import STOCK_DATA_COLUMNS, column_values
+
+CURRENT_FILE = 'CURRENT'
+
+# On-disk dtype of each column; NULL metrics are stored as NaN
+COLUMN_DTYPES = {
+    field: 'datetime64[D]' if field == 'date' else 'int64' if field == 'volume' else 'float64'
+    for field in STOCK_DATA_COLUMNS
+}
+
+
+def _as_column(values, dtype):
+    """values as an array of a column's on-disk dtype, with None as NaN"""
+    if dtype == 'float64' and not isinstance(values, np.ndarray):
+        values = [np.nan if value is None else value for value in values]
+    return np.asarray(values, dtype=dtype)
+
+
+class ColumnarStore:
+    """Read-optimized copy of StockData: one memory-mapped .npy file per column per symbol
+
+    Layout: <root>/<symbol>/<version>/<field>.npy, with <root>/<symbol>/CURRENT
+    naming the live version. A sync writes a complete new version and then
+    swaps CURRENT atomically, so readers never see columns of different
+    lengths. The previous version is kept so readers that resolved it just
+    before a swap can still open it.
+    """
+
+    def __init__(self, root):
+        self.root = os.fspath(root)
+
+    def _symbol_dir(self, symbol):
+        if not symbol or os.sep in symbol or symbol.startswith('.'):
+            raise ValueError(f"Invalid symbol for the columnar store: '{symbol}'")
+        return os.path.join(self.root, symbol)
+
+    def _current_dir(self, symbol):
+        symbol_dir = self._symbol_dir(symbol)
+        try:
+            with open(os.path.join(symbol_dir, CURRENT_FILE)) as f:
+                return os.path.join(symbol_dir, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def symbols(self):
+        """Symbols with a live version in the store"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, CURRENT_FILE))
+        )
+
+    def write(self, symbol, columns):
+        """Replace a symbol's columns ({field: values or array} sorted by date ascending)"""
+        symbol_dir = self._symbol_dir(symbol)
+        version = str(time.time_ns())
+        version_dir = os.path.join(symbol_dir, version)
+        os.makedirs(version_dir)
+
+        for field, dtype in COLUMN_DTYPES.items():
+            np.save(os.path.join(version_dir, f'{field}.npy'), _as_column(columns[field], dtype))
+
+        pointer = os.path.join(symbol_dir, f'{CURRENT_FILE}.{version}')
+        with open(pointer, 'w') as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(symbol_dir, CURRENT_FILE))
+        self._prune(symbol_dir, keep=2)
+
+    def _prune(self, symbol_dir, keep):
+        versions = sorted(
+            (name for name in os.listdir(symbol_dir) if name.isdigit()),
+            key=int,
+        )
+        for name in versions[:-keep]:
+            shutil.rmtree(os.path.join(symbol_dir, name), ignore_errors=True)
+
+    def delete(self, symbol):
+        shutil.rmtree(self._symbol_dir(symbol), ignore_errors=True)
+
+    def get_series(self, symbol, fields=STOCK_DATA_COLUMNS, start=None, end=None):
+        """Zero-copy views of a symbol's columns between start and end (inclusive dates)
+
+        Returns {'date': ..., field: ...} of read-only memory-mapped arrays in
+        ascending date order, or None when the symbol is not in the store.
+        """
+        for attempt in range(2):
+            version_dir = self._current_dir(symbol)
+            if version_dir is None:
+                return None
+            try:
+                dates = np.load(os.path.join(version_dir, 'date.npy'), mmap_mode='r')
+                lo = 0 if start is None else np.searchsorted(dates, np.datetime64(start, 'D'), 'left')
+                hi = len(dates) if end is None else np.searchsorted(dates, np.datetime64(end, 'D'), 'right')
+                series = {'date': dates[lo:hi]}
+                for field in fields:
+                    if field != 'date':
+                        series[field] = np.load(os.path.join(version_dir, f'{field}.npy'), mmap_mode='r')[lo:hi]
+                return series
+            except FileNotFoundError:
+                # The version was pruned between resolving CURRENT and opening it
+                if attempt:
+                    raise
+
+
+def get_store():
+    """The configured ColumnarStore, or None when STOCKS_COLUMNAR_STORE_DIR is unset"""
+    root = getattr(settings, 'STOCKS_COLUMNAR_STORE_DIR', None)
+    return ColumnarStore(root) if root else None
+
+
+def _stored_before(store, symbol, since):
+    """The stored columns of a symbol's rows dated before since, or None when there are none"""
+    if since is None:
+        return None
+    stored = store.get_series(symbol)
+    if stored is None:
+        return None
+    cut = np.searchsorted(stored['date'], np.datetime64(since, 'D'), 'left')
+    return {field: values[:cut] for field, values in stored.items()} if cut else None
+
+
+def sync_symbol(symbol, store=None, since=None):
+    """Rewrite one symbol's columns from StockData, returns the row count
+
+    With since, the caller guarantees no row dated before it changed: the
+    stored rows before it are kept and only later rows are read from the
+    database, so a daily ingestion no longer re-reads the whole history. The
+    new version is still a complete copy, but copying mapped arrays costs far
+    less than the query and conversion of every row a full sync does.
+    """
+    store = store or get_store()
+    if store is None:
+        return 0
+
+    history = StockData.objects.filter(company_id=symbol).order_by('date')
+    kept = _stored_before(store, symbol, since)
+    if kept is not None:
+        # After the last kept row rather than from since, so rows the store missed are picked up too
+        history = history.filter(date__gt=kept['date'][-1].item())
+    rows = list(column_values(history))
+    if kept is None:
+        if not rows:
+            store.delete(symbol)
+            return 0
+        store.write(symbol, dict(zip(STOCK_DATA_COLUMNS, zip(*rows))))
+        return len(rows)
+
+    added = dict(zip(STOCK_DATA_COLUMNS, zip(*rows))) if rows else dict.fromkeys(STOCK_DATA_COLUMNS, ())
+    store.write(symbol, {
+        field: np.concatenate([kept[field], _as_column(added[field], dtype)])
+        for field, dtype in COLUMN_DTYPES.items()
+    })
+    return len(kept['date']) + len(rows)
+
+
+def sync_on_commit(symbol, since=None):
+    """Sync a symbol once the surrounding transaction commits, if the store is enabled
+
+    Writers pass the earliest date they changed as since (see sync_symbol);
+    anything that may change earlier rows leaves it out for a full rewrite.
+    """
+    if get_store() is not None:
+        transaction.on_commit(lambda: sync_symbol(symbol, since=since))
+
+
+def sync_store(symbols=None):
+    """Sync the given symbols (default: all companies), returns the number synced"""
+    store = get_store()
+    if store is None:
+        return 0
+    if not symbols:
+        symbols = Company.objects.values_list('symbol', flat=True)
+    count = 0
+    for symbol in symbols:
+        sync_symbol(symbol, store)
+        count += 1
+    return count
+
+
+def series_to_json(values):
+    """Plain list of a column view, with dates as ISO strings and NaN as None"""
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='D').tolist()
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        if missing.any():
+            values = values.astype(object)
+            values[missing] = None
+    return values.tolist()
@@ -0,0 +1,124 @@
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+from django.db import transaction
+
+from stocks.models import Company, CorporateAction, StockData
+from stocks.services.adjustments import adjustment_factors, factors_for
+from stocks.services.cache import bump_on_commit
+from stocks.services.data_collector import StockDataCollector
+
+FACTOR_PLACES = Decimal('1e-12')
+
+# calculate_metrics output columns in price units, scaled back to traded units after recomputing
+PRICE_LEVEL_COLUMNS = ['Open', 'High', 'Low', 'Close', 'moving_avg_7', 'week_52_high', 'week_52_low']
+
+
+def action_factor(symbol, ex_date, kind, value):
+    """Price multiplier for rows before ex_date implied by one action"""
+    try:
+        value = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"Invalid corporate action value '{value}'")
+    if not value.is_finite() or value <= 0:
+        raise ValueError('Corporate action value must be positive')
+    if kind == CorporateAction.SPLIT:
+        return (1 / value).quantize(FACTOR_PLACES)
+
+    # Dividends scale earlier prices by the drop they cause on the previous close
+    previous = (
+        StockData.objects
+        .filter(company_id=symbol, date__lt=ex_date)
+        .order_by('-date')
+        .values_list('close_price', flat=True)
+        .first()
+    )
+    if previous is None:
+        raise ValueError(f"No close before {ex_date} to compute the dividend adjustment for '{symbol}'")
+    if value >= previous:
+        raise ValueError(f'Dividend {value} is not below the previous close {previous}')
+    return (1 - value / previous).quantize(FACTOR_PLACES)
+
+
+def refresh_factors(symbol):
+    """Recompute the cumulative factors of a symbol's actions (latest first)"""
+    actions = list(CorporateAction.objects.filter(company_id=symbol).order_by('-ex_date'))
+    price = volume = Decimal(1)
+    for action in actions:
+        price *= action.factor
+        if action.kind == CorporateAction.SPLIT:
+            volume *= action.value
+        action.cumulative_factor = price.quantize(FACTOR_PLACES)
+        action.cumulative_volume_factor = volume.quantize(FACTOR_PLACES)
+    CorporateAction.objects.bulk_update(actions, ['cumulative_factor', 'cumulative_volume_factor'])
+
+
+def recompute_metrics_from(symbol, start, rows=None):
+    """Recompute the stored metrics of a symbol's rows dated on or after start, returns rows rewritten
+
+    Covers the first `rows` such rows (default: all of them). The rolling
+    windows are seeded with the HISTORY_WINDOW - 1 rows before start.
+    """
+    window = StockDataCollector.HISTORY_WINDOW
+    columns = ('date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+    history = StockData.objects.filter(company_id=symbol)
+    earlier = list(history.filter(date__lt=start).order_by('-date').values_list(*columns)[:window - 1])[::-1]
+    affected = history.filter(date__gte=start).order_by('date').values_list(*columns)
+    affected = list(affected[:rows] if rows is not None else affected)
+    if not affected:
+        return 0
+
+    frame = pd.DataFrame.from_records(earlier + affected, columns=['date'] + StockDataCollector.OHLCV_COLUMNS)
+    frame = frame.set_index(pd.DatetimeIndex(frame.pop('date'))).astype(float)
+
+    # Compute in the units of the last loaded row, so no window straddles an
+    # unadjusted jump, then scale each affected row back to its own units
+    price, _ = factors_for(frame.index.values.astype('datetime64[D]'), adjustment_factors(symbol))
+    relative = price / price[-1]
+    frame[['Open', 'High', 'Low', 'Close']] = frame[['Open', 'High', 'Low', 'Close']].mul(relative, axis=0)
+    metrics = StockDataCollector.calculate_metrics(frame)
+    metrics[PRICE_LEVEL_COLUMNS] = metrics[PRICE_LEVEL_COLUMNS].div(relative, axis=0)
+
+    StockDataCollector.bulk_save_stock_data(symbol, metrics.iloc[len(earlier):])
+    return len(affected)
+
+
+def recompute_affected_metrics(symbol, ex_date):
+    """Recompute the stored metrics whose rolling windows span ex_date, returns rows rewritten
+
+    Stored metrics are expressed in each row's traded units, so a new action
+    only changes rows on or after ex_date that still reach back past it: the
+    first HISTORY_WINDOW rows (the longest, 52-week window). Earlier and later
+    rows keep their values.
+    """
+    return recompute_metrics_from(symbol, ex_date, StockDataCollector.HISTORY_WINDOW)
+
+
+def record_corporate_action(symbol, ex_date, kind, value):
+    """Store (or correct) a split or dividend and update what depends on it, returns the action
+
+    Only the action table and the rows whose windows span ex_date are
+    rewritten; adjusted prices are derived on read from the cumulative factors.
+    """
+    if kind not in dict(CorporateAction.KIND_CHOICES):
+        raise ValueError(f"Unknown corporate action kind '{kind}'")
+
+    with transaction.atomic():
+        company = Company.objects.get(symbol=symbol)
+        factor = action_factor(symbol, ex_date, kind, value)
+        action, _ = CorporateAction.objects.update_or_create(
+            company=company, ex_date=ex_date, kind=kind,
+            defaults={
+                'value': Decimal(value),
+                'factor': factor,
+                'cumulative_factor': factor,
+                'cumulative_volume_factor': Decimal(1),
+            },
+        )
+        refresh_factors(symbol)
+        recompute_affected_metrics(symbol, ex_date)
+        # Adjusted responses change for every date before ex_date
+        bump_on_commit(symbol)
+
+    action.refresh_from_db()
+    return action
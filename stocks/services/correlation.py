@@ -0,0 +1,216 @@
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+
+from stocks.models import Company, StockData
+from stocks.serializers import column_values
+from stocks.services.cache import HISTORY, bump_data_version, history_version
+
+# Rolling windows (trading days) kept up to date, each in its own RollingMoments
+CORRELATION_WINDOWS = (20, 60, 252)
+DEFAULT_WINDOW = 60
+
+
+class RollingMoments:
+    """Pairwise running sums of daily returns over the last `window` trading days of a universe
+
+    For every symbol pair (i, j) it keeps, over the days both have a return,
+    the day count and the sums of x_i, x_i^2 and x_i * x_j. A day entering
+    and the oldest leaving the window is a rank-two update of those
+    (symbols x symbols) matrices, so advancing by a day costs O(symbols^2)
+    instead of recomputing O(symbols^2 x days). Memory is four float64 matrices.
+    """
+
+    def __init__(self, symbols, window):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.window = window
+        self.dates = []
+        self.days = []
+        size = (len(self.symbols), len(self.symbols))
+        self.count = np.zeros(size)
+        # sum[i, j] adds up x_i over the days j also has a return; likewise sum_squares
+        self.sum = np.zeros(size)
+        self.sum_squares = np.zeros(size)
+        self.sum_products = np.zeros(size)
+
+    @classmethod
+    def from_days(cls, symbols, window, dates, returns):
+        """Build from a (days x symbols) block of returns (NaN where missing), oldest day first
+
+        Uses matrix products over the whole block rather than one update per day.
+        """
+        moments = cls(symbols, window)
+        returns = np.asarray(returns, dtype='float64')[-window:]
+        moments.dates = list(dates)[-window:]
+        moments.days = list(returns)
+        present = ~np.isnan(returns)
+        values = np.where(present, returns, 0.0)
+        mask = present.astype('float64')
+        moments.count = mask.T @ mask
+        moments.sum = values.T @ mask
+        moments.sum_squares = (values * values).T @ mask
+        moments.sum_products = values.T @ values
+        return moments
+
+    def _update(self, added=(), removed=()):
+        """Add and remove days' return vectors as one low-rank update of every running sum"""
+        days = [*added, *removed]
+        signs = np.array([1.0] * len(added) + [-1.0] * len(removed))[:, None]
+        returns = np.vstack(days)
+        present = ~np.isnan(returns)
+        values = np.where(present, returns, 0.0)
+        mask = present.astype('float64')
+        # (days x symbols)^T @ (days x symbols): one BLAS call per sum, no symbols^2 temporaries per day
+        self.count += (signs * mask).T @ mask
+        self.sum += (signs * values).T @ mask
+        self.sum_squares += (signs * values * values).T @ mask
+        self.sum_products += (signs * values).T @ values
+
+    def push(self, date, returns):
+        """Add the next day's returns (one per symbol, NaN where missing), dropping the oldest day if full"""
+        returns = np.asarray(returns, dtype='float64')
+        self.dates.append(date)
+        self.days.append(returns)
+        if len(self.days) > self.window:
+            self.dates.pop(0)
+            self._update(added=[returns], removed=[self.days.pop(0)])
+        else:
+            self._update(added=[returns])
+
+    def replace_latest(self, returns):
+        """Swap the latest day's returns, e.g. when more symbols of that day were ingested"""
+        returns = np.asarray(returns, dtype='float64')
+        self._update(added=[returns], removed=[self.days[-1]])
+        self.days[-1] = returns
+
+    def _pairs(self, rows):
+        """(count, covariance, correlation) for the given row indexes against every symbol"""
+        count = self.count[rows]
+        sum_x, sum_y = self.sum[rows], self.sum[:, rows].T
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_product = sum_x * sum_y / count
+            centred_xy = self.sum_products[rows] - mean_product
+            # Clamped at zero: removing days from the running sums leaves rounding error
+            centred_xx = np.maximum(self.sum_squares[rows] - sum_x * sum_x / count, 0)
+            centred_yy = np.maximum(self.sum_squares[:, rows].T - sum_y * sum_y / count, 0)
+            covariance = np.where(count > 1, centred_xy / (count - 1), np.nan)
+            correlation = np.clip(centred_xy / np.sqrt(centred_xx * centred_yy), -1, 1)
+        correlation[(count < 2) | ~np.isfinite(correlation)] = np.nan
+        return count, covariance, correlation
+
+    def matrix(self, kind='correlation', symbols=None):
+        """(symbols x symbols) correlation or covariance matrix, NaN where a pair shares under 2 days"""
+        indexes = [self.index[symbol] for symbol in symbols] if symbols is not None else slice(None)
+        count, covariance, correlation = self._pairs(indexes)
+        result = correlation if kind == 'correlation' else covariance
+        return result[:, indexes]
+
+    def peers(self, symbol, limit=10):
+        """The symbols most correlated with `symbol`, as dicts, highest correlation first"""
+        i = self.index[symbol]
+        count, covariance, correlation = (values[0] for values in self._pairs([i]))
+        candidates = [j for j in np.argsort(-np.nan_to_num(correlation, nan=-np.inf)) if j != i]
+        return [
+            {
+                'symbol': self.symbols[j],
+                'correlation': round(float(correlation[j]), 4),
+                'covariance': float(f'{covariance[j]:.6g}'),
+                'days': int(count[j]),
+            }
+            for j in candidates[:limit]
+            if not np.isnan(correlation[j])
+        ]
+
+
+def _daily_returns(symbols, since):
+    """(dates, days x symbols returns) from StockData on or after `since`, NaN where missing"""
+    rows = list(column_values(
+        StockData.objects.filter(date__gte=since), ['date', 'daily_return'], keys=('company_id',),
+    ))
+    if not rows:
+        return [], np.empty((0, len(symbols)))
+    frame = pd.DataFrame.from_records(rows, columns=['company_id', 'date', 'daily_return'])
+    table = frame.pivot(index='date', columns='company_id', values='daily_return').reindex(columns=symbols)
+    return list(table.index), table.to_numpy(dtype='float64')
+
+
+def build_moments(symbols, window):
+    """RollingMoments over the latest `window` trading days in StockData"""
+    dates = list(
+        StockData.objects.order_by('-date').values_list('date', flat=True).distinct()[:window]
+    )
+    if not dates:
+        return RollingMoments(symbols, window)
+    return RollingMoments.from_days(symbols, window, *_daily_returns(symbols, dates[-1]))
+
+
+def sync_moments(moments):
+    """Apply StockData days newer than the moments' window, and re-read its latest day
+
+    Days before the latest are taken as final here; _current rebuilds
+    instead when the shared HISTORY version shows history was rewritten.
+    Returns the number of days pushed.
+    """
+    if not moments.dates:
+        return 0
+    dates, returns = _daily_returns(moments.symbols, moments.dates[-1])
+    pushed = 0
+    for date, day in zip(dates, returns):
+        if date == moments.dates[-1]:
+            if not np.array_equal(day, moments.days[-1], equal_nan=True):
+                moments.replace_latest(day)
+        else:
+            moments.push(date, day)
+            pushed += 1
+    return pushed
+
+
+# Per-process (HISTORY version, moments) by window, synced with StockData on each use
+_windows = {}
+_lock = threading.Lock()
+
+
+def _current(window):
+    # Read before loading, so a rewrite committed meanwhile triggers another rebuild
+    version = history_version()
+    symbols = list(Company.objects.order_by('symbol').values_list('symbol', flat=True))
+    built, moments = _windows.get(window, (None, None))
+    if built != version or moments.symbols != symbols or not moments.dates:
+        moments = build_moments(symbols, window)
+        _windows[window] = (version, moments)
+    else:
+        sync_moments(moments)
+    return moments
+
+
+def top_peers(symbol, window=DEFAULT_WINDOW, limit=10):
+    """(window dates, most correlated peers) of a symbol over the rolling window"""
+    with _lock:
+        moments = _current(window)
+        return list(moments.dates), moments.peers(symbol, limit)
+
+
+def matrix_npz(window=DEFAULT_WINDOW, kind='correlation', symbols=None):
+    """The rolling matrix as NumPy .npz bytes: 'symbols', 'dates' and a float32 'matrix'
+
+    Readable with numpy.load(io.BytesIO(content)) and no pickling.
+    """
+    with _lock:
+        moments = _current(window)
+        symbols = moments.symbols if symbols is None else symbols
+        matrix = moments.matrix(kind, symbols).astype('float32')
+        dates = np.array(moments.dates, dtype='datetime64[D]')
+
+    buffer = io.BytesIO()
+    np.savez(buffer, symbols=np.array(symbols, dtype=str), dates=dates, matrix=matrix)
+    return buffer.getvalue()
+
+
+def reset_moments():
+    """Rebuild the windows of every process on next use, e.g. after history was edited by hand"""
+    with _lock:
+        _windows.clear()
+    bump_data_version(HISTORY)
@@ -1,7 +1,20 @@
-import yfinance as yf
+import time
+import numpy as np
 import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
+from django.db import connection, transaction
 from stocks.models import Company, StockData
+from stocks.services.adjustments import adjustment_factors, factors_for
+from stocks.services.cache import bump_history_on_commit, bump_on_commit
+from stocks.services import postgres
+from stocks.services.columnar_store import sync_on_commit
+from stocks.services.providers import YahooFinanceProvider
+from stocks.services.summaries import refresh_company_summary
+
+
+# Backends whose INSERT ... ON CONFLICT DO UPDATE the raw upsert path uses
+UPSERT_VENDORS = ('sqlite', 'postgresql')
 
 
 class StockDataCollector:
@@ -20,6 +33,37 @@ class StockDataCollector:
         'JNJ': 'Johnson & Johnson'
     }
 
+    # Source of OHLCV history; swap for SyntheticProvider to run offline
+    provider = YahooFinanceProvider()
+
+    # Concurrent fetches in collect_all_data and per-symbol retry policy
+    DEFAULT_WORKERS = 4
+    DEFAULT_RETRIES = 3
+    DEFAULT_BACKOFF = 1.0
+
+    # Stored rows needed to seed the longest rolling window (52 weeks)
+    HISTORY_WINDOW = 252
+    OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    # Rows per INSERT ... ON CONFLICT statement in the bulk ingestion path
+    BULK_BATCH_SIZE = 500
+
+    # DataFrame column -> (StockData field, decimal places)
+    PRICE_COLUMNS = {
+        'Open': ('open_price', 2),
+        'High': ('high_price', 2),
+        'Low': ('low_price', 2),
+        'Close': ('close_price', 2),
+    }
+    METRIC_COLUMNS = {
+        'daily_return': ('daily_return', 4),
+        'moving_avg_7': ('moving_avg_7', 2),
+        'week_52_high': ('week_52_high', 2),
+        'week_52_low': ('week_52_low', 2),
+        'volatility_score': ('volatility_score', 4),
+        'momentum': ('momentum', 4),
+    }
+
     @classmethod
     def setup_companies(cls):
         """Create Company objects in database"""
@@ -33,23 +77,35 @@ class StockDataCollector:
             )
             if created:
                 print(f"Created company: {name}")
+                bump_on_commit(symbol)
 
     @classmethod
-    def fetch_stock_data(cls, symbol, period="1y"):
-        """Fetch stock data from Yahoo Finance"""
-        try:
-            stock = yf.Ticker(symbol)
-            hist_data = stock.history(period=period)
-
-            if hist_data.empty:
-                print(f"No data found for {symbol}")
-                return None
+    def fetch_stock_data(cls, symbol, period="1y", provider=None, retries=0, backoff=None,
+                         start=None, allow_empty=False):
+        """Fetch stock data from the data provider, retrying failures with exponential backoff"""
+        provider = provider or cls.provider
+        backoff = cls.DEFAULT_BACKOFF if backoff is None else backoff
+
+        for attempt in range(retries + 1):
+            try:
+                hist_data = provider.fetch(symbol, period=period, start=start)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    print(f"Error fetching data for {symbol}: {e}")
+                    return None
+                delay = backoff * 2 ** attempt
+                print(f"Error fetching data for {symbol} ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
 
-            return hist_data
-        except Exception as e:
-            print(f"Error fetching data for {symbol}: {e}")
+        if hist_data is None or hist_data.empty:
+            if allow_empty:
+                return pd.DataFrame(columns=cls.OHLCV_COLUMNS, index=pd.DatetimeIndex([]))
+            print(f"No data found for {symbol}")
             return None
 
+        return hist_data
+
     @classmethod
     def calculate_metrics(cls, df):
         """Calculate financial metrics"""
@@ -74,10 +130,18 @@ class StockDataCollector:
 
         return df
 
+    @staticmethod
+    def _round_or_none(value, places):
+        """Round a metric value, mapping missing/NaN values to NULL"""
+        if value is None or pd.isna(value):
+            return None
+        return round(float(value), places)
+
     @classmethod
     def save_stock_data(cls, symbol, df):
         """Save processed data to database"""
         company = Company.objects.get(symbol=symbol)
+        latest = StockData.objects.filter(company=company).order_by('-date').values_list('date', flat=True).first()
 
         records_created = 0
         for date, row in df.iterrows():
@@ -94,40 +158,235 @@ class StockDataCollector:
                     'low_price': round(float(row['Low']), 2),
                     'close_price': round(float(row['Close']), 2),
                     'volume': int(row['Volume']),
-                    'daily_return': round(float(row.get('daily_return', 0)), 4),
-                    'moving_avg_7': round(float(row.get('moving_avg_7', 0)), 2),
-                    'week_52_high': round(float(row.get('week_52_high', 0)), 2),
-                    'week_52_low': round(float(row.get('week_52_low', 0)), 2),
-                    'volatility_score': round(float(row.get('volatility_score', 0)), 4),
-                    'momentum': round(float(row.get('momentum', 0)), 4),
+                    **{
+                        field: cls._round_or_none(row.get(source), places)
+                        for source, (field, places) in cls.METRIC_COLUMNS.items()
+                    },
                 }
             )
 
             if created:
                 records_created += 1
 
+        refresh_company_summary(company)
+        bump_on_commit(symbol)
+        if latest is not None and len(df) and df.index.min().date() < latest:
+            bump_history_on_commit()
+        sync_on_commit(symbol, since=df.index.min().date() if len(df) else None)
         return records_created
 
     @classmethod
-    def collect_all_data(cls):
-        """Main method to collect all stock data"""
-        print("Setting up companies...")
-        cls.setup_companies()
+    def frame_to_columns(cls, df):
+        """Convert a processed DataFrame into StockData field columns"""
+        # Skip rows where essential data is missing
+        df = df[df['Close'].notna() & df['Open'].notna()]
+        df = df[~df.index.duplicated(keep='last')]
+
+        columns = {'date': list(pd.DatetimeIndex(df.index).date)}
+        for source, (field, places) in cls.PRICE_COLUMNS.items():
+            columns[field] = df[source].astype(float).round(places).tolist()
+        columns['volume'] = df['Volume'].fillna(0).astype('int64').tolist()
+
+        for source, (field, places) in cls.METRIC_COLUMNS.items():
+            if source not in df:
+                columns[field] = [None] * len(df)
+                continue
+            values = df[source].astype(float).round(places)
+            # NaN (e.g. incomplete rolling windows) is stored as NULL
+            columns[field] = values.astype(object).where(values.notna(), None).tolist()
+
+        return columns
 
-        for symbol in cls.INDIAN_STOCKS.keys():
-            print(f"Fetching data for {symbol}...")
+    @classmethod
+    def _upsert_columns(cls, company, columns, batch_size):
+        """Insert or update rows given as field columns, keyed on (company, date)"""
+        fields = [field for field in columns if field != 'date']
+        if connection.vendor not in UPSERT_VENDORS:
+            StockData.objects.bulk_create(
+                [
+                    StockData(company=company, **dict(zip(columns, values)))
+                    for values in zip(*columns.values())
+                ],
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['company', 'date'],
+                update_fields=fields,
+            )
+            return
 
-            # Fetch raw data
-            raw_data = cls.fetch_stock_data(symbol, period="2y")  # 2 years for 52-week calc
+        if connection.vendor == 'postgresql' and len(columns['date']) >= postgres.COPY_THRESHOLD:
+            postgres.copy_upsert(company.pk, columns)
+            return
 
-            if raw_data is not None:
-                # Calculate metrics
-                processed_data = cls.calculate_metrics(raw_data)
+        # Plain executemany skips model instances and per-value field
+        # preparation, which dominate bulk_create's cost on long histories
+        quote = connection.ops.quote_name
+        names = ['company_id'] + list(columns)
+        sql = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT (company_id, date) DO UPDATE SET {}'.format(
+            quote(StockData._meta.db_table),
+            ', '.join(quote(name) for name in names),
+            ', '.join(['%s'] * len(names)),
+            ', '.join(f'{quote(field)} = excluded.{quote(field)}' for field in fields),
+        )
+        values = dict(columns, date=[connection.ops.adapt_datefield_value(date) for date in columns['date']])
+        rows = [(company.pk, *row) for row in zip(*values.values())]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[start:start + batch_size])
+
+    @classmethod
+    def bulk_save_stock_data(cls, symbol, df, batch_size=None):
+        """Save processed data with batched upserts, returns (created, updated)"""
+        company = Company.objects.get(symbol=symbol)
+        columns = cls.frame_to_columns(df)
+        dates = columns['date']
+        if not dates:
+            return 0, 0
+
+        with transaction.atomic():
+            # One query tells us which rows the upsert will update and whether
+            # it rewrites history (stored rows after the first incoming date)
+            existing = set(
+                StockData.objects
+                .filter(company=company, date__gte=min(dates))
+                .values_list('date', flat=True)
+            )
+            cls._upsert_columns(company, columns, batch_size or cls.BULK_BATCH_SIZE)
+            refresh_company_summary(company)
+            bump_on_commit(symbol)
+            if existing and max(existing) > min(dates):
+                bump_history_on_commit()
+            # Rows before the first incoming date are untouched, so the store only appends from it
+            sync_on_commit(symbol, since=min(dates))
+
+        incoming = set(dates)
+        records_updated = len(incoming & existing)
+        return len(incoming) - records_updated, records_updated
+
+    @classmethod
+    def load_recent_history(cls, symbol, rows=None, before=None):
+        """Load the latest stored OHLCV rows for a symbol (dated before `before`, if given), oldest first
+
+        Prices before any recorded corporate action are adjusted into the
+        units of the latest row (of rows dated `before`), so rolling windows do
+        not see split jumps.
+        """
+        records = StockData.objects.filter(company_id=symbol)
+        if before is not None:
+            records = records.filter(date__lt=before)
+        records = (
+            records
+            .order_by('-date')
+            .values_list('date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+            [:rows or cls.HISTORY_WINDOW]
+        )
+        history = pd.DataFrame.from_records(list(records)[::-1], columns=['date'] + cls.OHLCV_COLUMNS)
+        history = history.set_index(pd.DatetimeIndex(history.pop('date'))).astype(float)
+
+        factors = adjustment_factors(symbol)
+        if len(factors[0]) and not history.empty:
+            price, _ = factors_for(history.index.values.astype('datetime64[D]'), factors)
+            # With `before`, into the units of rows dated `before` (an action may fall in between)
+            reference = price[-1] if before is None else factors_for(np.array([before], 'datetime64[D]'), factors)[0][0]
+            prices = ['Open', 'High', 'Low', 'Close']
+            history[prices] = history[prices].mul(price / reference, axis=0)
+        return history
+
+    @classmethod
+    def _fetch_and_process(cls, symbol, period, provider, retries, backoff, history=None):
+        """Fetch and compute metrics for one symbol (runs on a worker thread)"""
+        if history is None or history.empty:
+            raw_data = cls.fetch_stock_data(symbol, period=period, provider=provider,
+                                            retries=retries, backoff=backoff)
+            if raw_data is None:
+                return None
+            return cls.calculate_metrics(raw_data)
+
+        # Incremental: fetch only the days after the latest stored row and
+        # seed the rolling windows with the stored history
+        last_date = history.index[-1]
+        raw_data = cls.fetch_stock_data(symbol, provider=provider, retries=retries, backoff=backoff,
+                                        start=(last_date + timedelta(days=1)).date(), allow_empty=True)
+        if raw_data is None:
+            return None
+
+        new_data = raw_data[cls.OHLCV_COLUMNS].astype(float)
+        if new_data.index.tz is not None:
+            new_data.index = new_data.index.tz_localize(None)
+        new_data = new_data[new_data.index.normalize() > last_date]
+        if new_data.empty:
+            return new_data
+
+        processed_data = cls.calculate_metrics(pd.concat([history, new_data]))
+        return processed_data.iloc[len(history):]
+
+    @classmethod
+    def collect_symbols(cls, symbols, period="2y", workers=None, provider=None, retries=None, backoff=None,
+                        incremental=False):
+        """Fetch symbols concurrently and save them from a single writer, returns {symbol: (created, updated)}
+
+        A symbol whose fetch or processing fails maps to None; the others are
+        still saved.
+        """
+        workers = workers or cls.DEFAULT_WORKERS
+        retries = cls.DEFAULT_RETRIES if retries is None else retries
+        symbols = list(symbols)
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            queued = iter(symbols)
+
+            # Keep at most two fetches per worker in flight so processed frames
+            # cannot pile up in memory while the writer is busy
+            def submit_next():
+                symbol = next(queued, None)
+                if symbol is not None:
+                    print(f"Fetching data for {symbol}...")
+                    history = cls.load_recent_history(symbol) if incremental else None
+                    future = pool.submit(cls._fetch_and_process, symbol, period, provider, retries, backoff, history)
+                    pending[future] = symbol
+
+            for _ in range(workers * 2):
+                submit_next()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    symbol = pending.pop(future)
+                    submit_next()
+
+                    try:
+                        processed_data = future.result()
+                    except Exception as e:
+                        # e.g. a provider frame missing a column; one bad symbol must not stop the run
+                        print(f"Error processing data for {symbol}: {e}")
+                        processed_data = None
+                    if processed_data is None:
+                        print(f"Failed to fetch data for {symbol}")
+                        results[symbol] = None
+                        continue
+
+                    # Only this thread writes to the database
+                    records_created, records_updated = cls.bulk_save_stock_data(symbol, processed_data)
+                    results[symbol] = (records_created, records_updated)
+                    print(f"Created {records_created} and updated {records_updated} records for {symbol}")
+
+        failed = [symbol for symbol, result in results.items() if result is None]
+        if failed:
+            print(f"Failed to collect {len(failed)} of {len(symbols)} symbols: {', '.join(failed)}")
+        return results
+
+    @classmethod
+    def collect_all_data(cls, workers=None, provider=None, retries=None, backoff=None, incremental=False):
+        """Main method to collect all stock data"""
+        print("Setting up companies...")
+        cls.setup_companies()
 
-                # Save to database
-                records_created = cls.save_stock_data(symbol, processed_data)
-                print(f"Created {records_created} records for {symbol}")
-            else:
-                print(f"Failed to fetch data for {symbol}")
+        # 2 years of history for the 52-week calculations; incremental runs
+        # only fetch days after each symbol's latest stored row
+        results = cls.collect_symbols(cls.US_STOCKS.keys(), period="2y", workers=workers, provider=provider,
+                                      retries=retries, backoff=backoff, incremental=incremental)
 
-        print("Data collection completed!")
\ No newline at end of file
+        print("Data collection completed!")
+        return results
@@ -0,0 +1,145 @@
+import csv
+import io
+
+from stocks.models import StockData
+from stocks.serializers import STOCK_DATA_COLUMNS, column_values
+
+# Rows fetched per database round trip and written per output chunk / record batch
+EXPORT_CHUNK_ROWS = 10_000
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+
+def _pyarrow():
+    """Import pyarrow, which only the Parquet and Arrow formats need"""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ValueError('Parquet and Arrow exports need pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+def export_rows(symbols=None, start=None, end=None, fields=STOCK_DATA_COLUMNS, chunk_size=EXPORT_CHUNK_ROWS):
+    """(symbol, *fields) tuples ordered by symbol and date, read in chunks
+
+    Iterates the queryset instead of materialising it: PostgreSQL streams
+    through a server-side cursor, SQLite fetches chunk_size rows at a time.
+    """
+    history = StockData.objects.order_by('company_id', 'date')
+    if symbols is not None:
+        history = history.filter(company_id__in=symbols)
+    if start:
+        history = history.filter(date__gte=start)
+    if end:
+        history = history.filter(date__lte=end)
+    return column_values(history, fields, keys=('company_id',)).iterator(chunk_size=chunk_size)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands what was written since the last drain() to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def csv_chunks(rows, fields=STOCK_DATA_COLUMNS, chunk_size=EXPORT_CHUNK_ROWS):
+    """CSV with a header row, as UTF-8 byte chunks of up to chunk_size rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['symbol', *fields])
+    for batch in _batches(rows, chunk_size):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _schema(pa, fields):
+    types = {'date': pa.date32(), 'volume': pa.int64()}
+    return pa.schema([('symbol', pa.string())] + [(field, types.get(field, pa.float64())) for field in fields])
+
+
+def _record_batch(pa, schema, batch):
+    columns = zip(*batch)
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for field, values in zip(schema, columns)], schema=schema,
+    )
+
+
+def arrow_chunks(rows, fields=STOCK_DATA_COLUMNS, chunk_size=EXPORT_CHUNK_ROWS):
+    """Arrow IPC stream, one record batch of up to chunk_size rows per chunk"""
+    pa = _pyarrow()
+    schema = _schema(pa, fields)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _batches(rows, chunk_size):
+            writer.write_batch(_record_batch(pa, schema, batch))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_chunks(rows, fields=STOCK_DATA_COLUMNS, chunk_size=EXPORT_CHUNK_ROWS):
+    """Parquet file, one row group of up to chunk_size rows per chunk (the footer comes last)"""
+    pa = _pyarrow()
+    schema = _schema(pa, fields)
+    sink = _ChunkSink()
+    with pa.parquet.ParquetWriter(sink, schema, compression='snappy') as writer:
+        for batch in _batches(rows, chunk_size):
+            writer.write_batch(_record_batch(pa, schema, batch), row_group_size=chunk_size)
+            yield sink.drain()
+    yield sink.drain()
+
+
+WRITERS = {'csv': csv_chunks, 'parquet': parquet_chunks, 'arrow': arrow_chunks}
+
+
+def export_chunks(format, symbols=None, start=None, end=None, fields=STOCK_DATA_COLUMNS,
+                  chunk_size=EXPORT_CHUNK_ROWS):
+    """Byte chunks of StockData in the given format; memory stays bounded by chunk_size rows
+
+    Raises ValueError for an unknown format, or when pyarrow is missing for
+    Parquet or Arrow, before any row is read.
+    """
+    if format not in WRITERS:
+        raise ValueError(f"format must be one of {', '.join(WRITERS)}")
+    if format != 'csv':
+        _pyarrow()
+    rows = export_rows(symbols, start, end, fields, chunk_size)
+    return (chunk for chunk in WRITERS[format](rows, fields, chunk_size) if chunk)
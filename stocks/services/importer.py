@@ -0,0 +1,279 @@
+import json
+import os
+import time
+import warnings
+
+import pandas as pd
+from django.db import transaction
+
+from stocks.models import Company, StockData
+from stocks.services.corporate_actions import recompute_metrics_from
+from stocks.services.data_collector import StockDataCollector
+from stocks.services.window_metrics import recompute_metrics
+
+# Rows read, validated and saved per step (and per checkpoint)
+IMPORT_CHUNK_ROWS = 100_000
+
+# Accepted input column names (case-insensitive) for each column the import needs;
+# the export's column names are accepted too, so exports load back as-is
+COLUMN_ALIASES = {
+    'symbol': ('symbol', 'ticker'),
+    'date': ('date',),
+    'Open': ('open', 'open_price'),
+    'High': ('high', 'high_price'),
+    'Low': ('low', 'low_price'),
+    'Close': ('close', 'close_price', 'adj_close'),
+    'Volume': ('volume',),
+}
+PRICES = ['Open', 'High', 'Low', 'Close']
+
+# Largest price the price columns (10 digits, 2 decimal places) hold
+MAX_PRICE = 1e8
+SYMBOL_LENGTH = Company._meta.get_field('symbol').max_length
+
+# How derived metrics are filled: calculate_metrics per symbol on the stored tail
+# plus the new rows (and again at the end from the earliest row written out of
+# date order), SQL window functions once at the end, or left NULL
+METRIC_MODES = ('pandas', 'database', 'none')
+
+
+def read_chunks(path, chunk_size=IMPORT_CHUNK_ROWS):
+    """DataFrames of up to chunk_size rows from a CSV (optionally compressed) or Parquet file"""
+    if str(path).endswith(('.parquet', '.pq')):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError('Parquet imports need pyarrow (pip install pyarrow)')
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _column_mapping(columns):
+    by_name = {str(column).strip().lower(): column for column in columns}
+    mapping, missing = {}, []
+    for target, aliases in COLUMN_ALIASES.items():
+        source = next((by_name[alias] for alias in aliases if alias in by_name), None)
+        if source is None:
+            missing.append(target)
+        else:
+            mapping[source] = target
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)} (found {', '.join(map(str, columns))})")
+    return mapping
+
+
+def clean_chunk(frame):
+    """Validate and coerce one chunk with vectorized checks, returns (valid rows, {reason: rejected rows})
+
+    Valid rows have a stripped symbol that fits Company.symbol, a naive
+    midnight date, float prices with low <= open/close <= high and a
+    non-negative volume (missing volume becomes 0). Within the chunk the last
+    row of a (symbol, date) pair wins.
+    """
+    mapping = _column_mapping(frame.columns)
+    frame = frame[list(mapping)].rename(columns=mapping)
+
+    symbol = frame['symbol'].astype('string').str.strip()
+    date = pd.to_datetime(frame['date'], format='ISO8601', errors='coerce')
+    unparsed = date.isna() & frame['date'].notna()
+    if unparsed.any():
+        # Other vendor formats (e.g. 01/31/2024) are parsed value by value
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            date[unparsed] = pd.to_datetime(frame['date'][unparsed], errors='coerce')
+    if date.dt.tz is not None:
+        date = date.dt.tz_localize(None)
+    prices = frame[PRICES].apply(pd.to_numeric, errors='coerce')
+    volume = pd.to_numeric(frame['Volume'], errors='coerce').fillna(0)
+
+    checks = {
+        'invalid_symbol': symbol.isna() | (symbol == '') | (symbol.str.len() > SYMBOL_LENGTH),
+        'invalid_date': date.isna(),
+        'invalid_price': (prices.isna() | (prices <= 0) | (prices >= MAX_PRICE)).any(axis=1),
+        'inconsistent_range': (
+            (prices['High'] < prices[['Open', 'Close', 'Low']].max(axis=1))
+            | (prices['Low'] > prices[['Open', 'Close']].min(axis=1))
+        ),
+        'invalid_volume': volume < 0,
+    }
+    rejected, reasons = pd.Series(False, index=frame.index), {}
+    for reason, failed in checks.items():
+        failed = failed.fillna(True) & ~rejected
+        if failed.any():
+            reasons[reason] = int(failed.sum())
+            rejected |= failed
+
+    cleaned = pd.DataFrame({'symbol': symbol, 'date': date.dt.normalize(), **prices, 'Volume': volume})[~rejected]
+    duplicated = cleaned.duplicated(['symbol', 'date'], keep='last')
+    if duplicated.any():
+        reasons['duplicate'] = int(duplicated.sum())
+        cleaned = cleaned[~duplicated]
+    return cleaned, reasons
+
+
+def _with_metrics(symbol, rows):
+    """calculate_metrics over the stored rows preceding `rows` plus `rows`, returns `rows` with metrics"""
+    history = StockDataCollector.load_recent_history(symbol, before=rows.index[0].date())
+    processed = StockDataCollector.calculate_metrics(pd.concat([history, rows]))
+    return processed.iloc[len(history):]
+
+
+class Checkpoint:
+    """Progress of an import, saved after every committed chunk so a failed run can resume
+
+    Stored as JSON next to the input (<path>.checkpoint.json) together with
+    the input's size and mtime and the chunk size, so it is never applied to
+    a different file or chunking.
+    """
+
+    def __init__(self, path, chunk_size):
+        self.path = f'{path}.checkpoint.json'
+        stat = os.stat(path)
+        self.source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'chunk_size': chunk_size}
+        self.chunks = 0
+        self.symbols = set()
+        # {symbol: earliest date} whose later stored rows need their metrics recomputed
+        self.stale = {}
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['source'] != self.source:
+            raise ValueError(f'{self.path} was written for a different input file or chunk size')
+        self.chunks, self.symbols = state['chunks'], set(state['symbols'])
+        self.stale = {symbol: pd.Timestamp(date) for symbol, date in state['stale'].items()}
+
+    def save(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({
+                'source': self.source, 'chunks': self.chunks, 'symbols': sorted(self.symbols),
+                'stale': {symbol: date.date().isoformat() for symbol, date in self.stale.items()},
+            }, f)
+        os.replace(temporary, self.path)
+
+    def delete(self):
+        if self.exists():
+            os.remove(self.path)
+
+
+def _add(totals, counts):
+    for key, value in counts.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+def import_file(path, chunk_size=IMPORT_CHUNK_ROWS, metrics='pandas', dry_run=False, resume=False,
+                create_companies=False, progress=None):
+    """Load a CSV/Parquet history file into StockData chunk by chunk, returns a report dict
+
+    Each chunk is validated, gets its metrics (see METRIC_MODES) and is
+    upserted through StockDataCollector.bulk_save_stock_data in one
+    transaction; the checkpoint then records it, and resume=True skips the
+    chunks a failed run already committed. Files need not be sorted: when a
+    chunk lands before or among a symbol's stored rows, its metrics and
+    those of every later row are recomputed once all chunks are in. Rows of symbols without a
+    Company are rejected unless create_companies is set. dry_run does every
+    step except writing (metrics still read stored history) and reports
+    per-stage throughput. Counts in the report cover this run only;
+    progress(report) is called after every chunk.
+    """
+    if metrics not in METRIC_MODES:
+        raise ValueError(f"metrics must be one of {', '.join(METRIC_MODES)}")
+
+    checkpoint = Checkpoint(path, chunk_size)
+    if not dry_run and checkpoint.exists():
+        if not resume:
+            raise ValueError(f'{checkpoint.path} exists from an interrupted import: resume it or delete it')
+        checkpoint.load()
+
+    report = {
+        'chunks': 0, 'skipped_chunks': checkpoint.chunks,
+        'rows': 0, 'valid': 0, 'created': 0, 'updated': 0, 'recomputed': 0, 'rejected': {},
+        'seconds': {'read': 0.0, 'validate': 0.0, 'metrics': 0.0, 'save': 0.0},
+    }
+    known = set(Company.objects.values_list('symbol', flat=True))
+    symbols = set(checkpoint.symbols)
+    stale = dict(checkpoint.stale)
+    seconds = report['seconds']
+
+    chunks = read_chunks(path, chunk_size)
+    index = 0
+    while True:
+        start = time.perf_counter()
+        frame = next(chunks, None)
+        seconds['read'] += time.perf_counter() - start
+        if frame is None:
+            break
+        index += 1
+        if index <= report['skipped_chunks']:
+            continue
+
+        start = time.perf_counter()
+        cleaned, reasons = clean_chunk(frame)
+        unknown = ~cleaned['symbol'].isin(known)
+        if unknown.any() and not create_companies:
+            reasons['unknown_symbol'] = int(unknown.sum())
+            cleaned = cleaned[~unknown]
+        new_companies = sorted(set(cleaned['symbol'][unknown])) if create_companies else []
+        groups = [
+            (symbol, rows.drop(columns='symbol').set_index('date').sort_index())
+            for symbol, rows in cleaned.groupby('symbol', sort=False)
+        ]
+        seconds['validate'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if metrics == 'pandas':
+            groups = [(symbol, _with_metrics(symbol, rows)) for symbol, rows in groups]
+        seconds['metrics'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if not dry_run:
+            with transaction.atomic():
+                Company.objects.bulk_create(
+                    [Company(symbol=symbol, name=symbol) for symbol in new_companies], ignore_conflicts=True
+                )
+                for symbol, rows in groups:
+                    created, updated = StockDataCollector.bulk_save_stock_data(symbol, rows)
+                    _add(report, {'created': created, 'updated': updated})
+                    # Other stored rows on or after the first new date: the new rows' windows
+                    # missed them, and their own windows missed the new rows
+                    first = rows.index[0]
+                    if metrics == 'pandas' and (
+                        StockData.objects.filter(company_id=symbol, date__gte=first.date()).count() > len(rows)
+                    ):
+                        stale[symbol] = min(stale.get(symbol, first), first)
+        known.update(new_companies)
+        symbols.update(symbol for symbol, _ in groups)
+        seconds['save'] += time.perf_counter() - start
+
+        _add(report, {'chunks': 1, 'rows': len(frame), 'valid': len(cleaned)})
+        _add(report['rejected'], reasons)
+        if not dry_run:
+            checkpoint.chunks = index
+            checkpoint.symbols = symbols
+            checkpoint.stale = stale
+            checkpoint.save()
+        if progress:
+            progress(report)
+
+    start = time.perf_counter()
+    if metrics == 'database' and not dry_run and symbols:
+        report['recomputed'] = recompute_metrics(sorted(symbols))
+    elif metrics == 'pandas' and not dry_run:
+        for symbol, since in sorted(stale.items()):
+            with transaction.atomic():
+                report['recomputed'] += recompute_metrics_from(symbol, since.date())
+    seconds['metrics'] += time.perf_counter() - start
+
+    if not dry_run:
+        checkpoint.delete()
+    report['symbols'] = len(symbols)
+    total = sum(seconds.values())
+    report['rows_per_second'] = round(report['rows'] / total, 1) if total else None
+    report['seconds'] = {stage: round(value, 3) for stage, value in seconds.items()}
+    return report
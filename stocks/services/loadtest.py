@@ -0,0 +1,58 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+# Read endpoints exercised by the load test, as (sync path, async path) pairs
+LOADTEST_ENDPOINTS = {
+    'stock_data': ('/stocks/api/data/{symbol}/', '/stocks/api/async/data/{symbol}/'),
+    'stock_summary': ('/stocks/api/summary/{symbol}/', '/stocks/api/async/summary/{symbol}/'),
+    'compare_stocks': (
+        '/stocks/api/compare/?symbol1={symbol}&symbol2={other}',
+        '/stocks/api/async/compare/?symbol1={symbol}&symbol2={other}',
+    ),
+    'stock_insights': ('/stocks/api/insights/{symbol}/', '/stocks/api/async/insights/{symbol}/'),
+}
+
+
+def serves_cached(url, timeout=30):
+    """Whether the server behind url answers through the response cache (it then sets ETags)
+
+    With the cache on, every request after the first is a cache hit, so a
+    load test would compare cache lookups rather than the sync and async views.
+    """
+    return 'ETag' in requests.get(url, timeout=timeout).headers
+
+
+def run_load(url, requests_total=1000, concurrency=100, timeout=30):
+    """Issue requests_total GETs to url from `concurrency` threads, returns throughput and latency stats"""
+    local = threading.local()
+
+    def fetch(_):
+        # One keep-alive session per thread
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.get(url, timeout=timeout).status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fetch, range(requests_total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for _, latency in results]) * 1000
+    return {
+        'requests': requests_total,
+        'concurrency': concurrency,
+        'errors': sum(1 for ok, _ in results if not ok),
+        'requests_per_second': round(requests_total / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+    }
@@ -0,0 +1,160 @@
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+slow_query_logger = logging.getLogger('stocks.slow_queries')
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class RequestStats:
+    """Database and render work attributed to one in-flight request"""
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = 0.0
+
+    @property
+    def view(self):
+        return view_name(self.request)
+
+
+# Stats of the request being handled; copied into sync_to_async threads, so
+# async views' ORM calls are attributed too
+current_request = ContextVar('stocks_current_request', default=None)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name or match._func_path) if match else 'unmatched'
+
+
+class Histogram:
+    """Prometheus histogram with one label set per view"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labels + (('le', str(bound)),), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._series = {}
+
+    def inc(self, labels, value=1):
+        self._series[labels] = self._series.get(labels, 0) + value
+
+    def samples(self):
+        for labels, value in sorted(self._series.items()):
+            yield self.name, labels, value
+
+
+class MetricsRegistry:
+    """Per-process request metrics, rendered in the Prometheus text format
+
+    Each worker process keeps its own registry; scrape every worker (or run a
+    single one) to see the whole picture.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter('stocks_http_requests_total', 'Requests by view and status code')
+            self.latency = Histogram(
+                'stocks_http_request_duration_seconds', 'Request latency by view', LATENCY_BUCKETS)
+            self.queries = Histogram(
+                'stocks_db_queries_per_request', 'Database queries per request by view', QUERY_COUNT_BUCKETS)
+            self.db_time = Histogram(
+                'stocks_db_duration_seconds', 'Database time per request by view', LATENCY_BUCKETS)
+            self.render_time = Histogram(
+                'stocks_render_duration_seconds', 'Response serialization time per request by view',
+                LATENCY_BUCKETS)
+            self.response_bytes = Histogram(
+                'stocks_http_response_bytes', 'Response body size by view', BYTES_BUCKETS)
+
+    def record(self, stats, status_code, seconds, response_bytes):
+        labels = (('view', stats.view),)
+        with self._lock:
+            self.requests.inc(labels + (('status', str(status_code)),))
+            self.latency.observe(labels, seconds)
+            self.queries.observe(labels, stats.queries)
+            self.db_time.observe(labels, stats.query_seconds)
+            self.render_time.observe(labels, stats.render_seconds)
+            self.response_bytes.observe(labels, response_bytes)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = [self.requests, self.latency, self.queries, self.db_time, self.render_time, self.response_bytes]
+            for metric in metrics:
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                for name, labels, value in metric.samples():
+                    label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+                    lines.append(f'{name}{{{label_text}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper: times queries of the current request and logs slow ones"""
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+        threshold = getattr(settings, 'STOCKS_SLOW_QUERY_MS', None)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            slow_query_logger.warning(
+                'Slow query in %s (%.1f ms): %s', stats.view, elapsed * 1000, sql,
+                extra={'view': stats.view, 'duration_ms': elapsed * 1000, 'sql': sql},
+            )
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver adding record_query to every new database connection"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,55 @@
+import csv
+import io
+
+from django.db import connection, transaction
+
+from stocks.models import StockData
+
+# Rows below which a plain executemany upsert beats COPY's staging overhead
+COPY_THRESHOLD = 1000
+
+STAGING_TABLE = 'stocks_stockdata_staging'
+
+
+def _copy_rows(cursor, sql, rows):
+    """COPY rows through the driver's native API (psycopg 3 or psycopg2)"""
+    raw = cursor.cursor
+    if hasattr(raw, 'copy'):
+        with raw.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+        return
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    raw.copy_expert(f'{sql} WITH (FORMAT csv)', buffer)
+
+
+def copy_upsert(company_id, columns):
+    """Upsert rows given as StockData field columns with COPY into a staging table and one merge
+
+    COPY streams the rows without per-statement parsing or parameter binding;
+    the INSERT ... SELECT ... ON CONFLICT then merges them in a single
+    statement. The staging table is a session temp table emptied on commit.
+    """
+    table = connection.ops.quote_name(StockData._meta.db_table)
+    quote = connection.ops.quote_name
+    fields = [field for field in columns if field != 'date']
+    names = ', '.join(quote(name) for name in ['company_id', 'date'] + fields)
+    rows = [(company_id, *values) for values in zip(columns['date'], *(columns[field] for field in fields))]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DELETE ROWS AS '
+            f'SELECT {names} FROM {table} WITH NO DATA'
+        )
+        # Earlier upserts in the same transaction leave their rows behind
+        cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+        _copy_rows(cursor, f'COPY {STAGING_TABLE} ({names}) FROM STDIN', rows)
+        cursor.execute(
+            f'INSERT INTO {table} ({names}) SELECT {names} FROM {STAGING_TABLE} '
+            f'ON CONFLICT (company_id, date) DO UPDATE SET '
+            + ', '.join(f'{quote(field)} = excluded.{quote(field)}' for field in fields)
+        )
+
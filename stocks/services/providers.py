@@ -0,0 +1,53 @@
+import time
+import zlib
+
+import pandas as pd
+import yfinance as yf
+
+from stocks.services.synthetic import generate_ohlcv
+
+
+class YahooFinanceProvider:
+    """Fetches daily OHLCV history from Yahoo Finance"""
+
+    def fetch(self, symbol, period="1y", start=None):
+        if start is not None:
+            return yf.Ticker(symbol).history(start=start)
+        return yf.Ticker(symbol).history(period=period)
+
+
+class SyntheticProvider:
+    """Offline provider serving seeded random-walk history, for tests and benchmarks"""
+
+    # Approximate trading days per yfinance period string
+    PERIOD_DAYS = {
+        '1mo': 21,
+        '3mo': 63,
+        '6mo': 126,
+        '1y': 252,
+        '2y': 504,
+        '5y': 1260,
+        '10y': 2520,
+    }
+
+    def __init__(self, seed=0, latency=0.0, days=None, failures=None):
+        self.seed = seed
+        self.latency = latency
+        self.days = days
+        # symbol -> number of fetches that raise before one succeeds
+        self.failures = dict(failures or {})
+
+    def fetch(self, symbol, period="1y", start=None):
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.failures.get(symbol, 0) > 0:
+            self.failures[symbol] -= 1
+            raise ConnectionError(f"Simulated fetch failure for {symbol}")
+
+        days = self.days or self.PERIOD_DAYS.get(period, 252)
+        # Stable per-symbol seed so repeated runs produce identical data
+        data = generate_ohlcv(days, seed=self.seed + zlib.crc32(symbol.encode()))
+        if start is not None:
+            data = data[data.index >= pd.Timestamp(start)]
+        return data
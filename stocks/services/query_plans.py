@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+# Hot read endpoints and the URL used to exercise each one
+HOT_ENDPOINTS = {
+    'stock_data': '/stocks/api/data/{symbol}/',
+    'stock_data_page': '/stocks/api/data/{symbol}/?order=asc&limit=100&fields=close_price',
+    'stock_summary': '/stocks/api/summary/{symbol}/',
+    'compare_stocks': '/stocks/api/compare/?symbol1={symbol}&symbol2={other}',
+    'compare_many': '/stocks/api/compare/?symbols={symbol},{other}&days=30',
+    'stock_insights': '/stocks/api/insights/{symbol}/',
+    'stock_insights_batch': '/stocks/api/insights/?days=60',
+    'dashboard': '/stocks/api/dashboard/{symbol}/',
+    'screener': '/stocks/api/screener/?sort=-momentum&limit=20',
+}
+
+# Plan fragments that mean a full scan or an extra sort of StockData
+PLAN_PROBLEMS = {
+    'sqlite': ['USE TEMP B-TREE', 'SCAN stocks_stockdata'],
+    'postgresql': ['Seq Scan on stocks_stockdata', 'Sort  ('],
+}
+
+
+def local_client():
+    """Test client whose Host header passes ALLOWED_HOSTS outside the test runner"""
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')]
+    return Client(HTTP_HOST=hosts[0] if hosts else 'localhost')
+
+
+def explain(sql, params=None):
+    """Return the query plan for a SQL statement as a list of lines"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    """Plan lines that indicate a table scan or a sort instead of an index walk"""
+    markers = PLAN_PROBLEMS.get(connection.vendor, [])
+    return [line for line in plan if any(marker in line for marker in markers)]
+
+
+def audit_endpoint(url):
+    """Request a URL (bypassing the response cache) and explain every StockData query it issues"""
+    with override_settings(STOCKS_API_CACHE_ENABLED=False), CaptureQueriesContext(connection) as captured:
+        response = local_client().get(url)
+
+    report = []
+    for query in captured.captured_queries:
+        sql = query['sql']
+        if 'stocks_stockdata' not in sql or not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        # Captured SQL has parameters inlined, so it can be explained as-is
+        plan = explain(sql)
+        report.append({'sql': sql, 'plan': plan, 'problems': plan_problems(plan)})
+    return response.status_code, report
+
+
+def audit_hot_queries(symbol, other):
+    """Audit every hot endpoint, returns {endpoint: (status code, query reports)}"""
+    return {
+        name: audit_endpoint(url.format(symbol=symbol, other=other))
+        for name, url in HOT_ENDPOINTS.items()
+    }
@@ -0,0 +1,34 @@
+from django.conf import settings
+
+# Performance profile applied to every new SQLite connection. WAL lets readers
+# keep reading while a writer commits (journal_mode persists in the file);
+# synchronous=NORMAL only syncs at checkpoints, which is durable enough with WAL.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,          # KiB, i.e. a 64 MB page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Pragmas that write to the database file, skipped on read-only connections
+WRITE_PRAGMAS = ('journal_mode',)
+
+
+def is_read_only(connection):
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
+
+def apply_pragmas(connection, pragmas):
+    """Run PRAGMA statements on an open SQLite connection"""
+    for name, value in pragmas.items():
+        if is_read_only(connection) and name in WRITE_PRAGMAS:
+            continue
+        # The raw sqlite3 connection: no query logging or execute wrappers
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """connection_created receiver applying SQLITE_PRAGMAS unless STOCKS_SQLITE_TUNING is off"""
+    if connection.vendor == 'sqlite' and getattr(settings, 'STOCKS_SQLITE_TUNING', True):
+        apply_pragmas(connection, SQLITE_PRAGMAS)
@@ -0,0 +1,186 @@
+import math
+from collections import deque
+
+# Window lengths, matching StockDataCollector.calculate_metrics
+MOVING_AVG_WINDOW = 7
+MOMENTUM_WINDOW = 20
+VOLATILITY_WINDOW = 30
+WEEK_52_WINDOW = 252
+
+NAN = float('nan')
+
+
+class RingBuffer:
+    """Fixed-size window of the latest values with a running sum
+
+    The sum is recomputed from the window each time it wraps, so rounding
+    error from the add/subtract updates never builds up over long streams.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = [0.0] * size
+        self.count = 0
+        self.position = 0
+        self.total = 0.0
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    @property
+    def oldest(self):
+        """Value that the next push will evict"""
+        return self.values[self.position] if self.full else None
+
+    def push(self, value):
+        """Add a value, returning the evicted one (None while filling)"""
+        evicted = self.oldest
+        if evicted is not None:
+            self.total -= evicted
+        else:
+            self.count += 1
+
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.size
+        self.total += value
+        if self.position == 0:
+            self.total = math.fsum(self.values)
+        return evicted
+
+    @property
+    def wrapped(self):
+        """Whether the last push completed a pass over the window"""
+        return self.position == 0 and self.count > 0
+
+    def mean(self):
+        return self.total / self.size if self.full else NAN
+
+
+class MonotonicWindow:
+    """Sliding-window max (or min) using a monotonic deque, amortized O(1) per push"""
+
+    def __init__(self, size, maximum=True):
+        self.size = size
+        self.maximum = maximum
+        self.window = deque()
+        self.index = -1
+
+    def _dominates(self, new, old):
+        return new >= old if self.maximum else new <= old
+
+    def push(self, value):
+        self.index += 1
+        while self.window and self._dominates(value, self.window[-1][1]):
+            self.window.pop()
+        self.window.append((self.index, value))
+        if self.window[0][0] <= self.index - self.size:
+            self.window.popleft()
+
+    def value(self):
+        return self.window[0][1] if self.index + 1 >= self.size else NAN
+
+
+class RollingVariance:
+    """Sliding-window sample variance using Welford-style add/replace updates
+
+    Mean and M2 are recomputed exactly from the window whenever it wraps.
+    """
+
+    def __init__(self, size):
+        self.buffer = RingBuffer(size)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value):
+        evicted = self.buffer.push(value)
+        if evicted is None:
+            # Window still filling: standard Welford add
+            n = self.buffer.count
+            delta = value - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Window full: replace the evicted value in one step
+            old_mean = self.mean
+            self.mean += (value - evicted) / self.buffer.size
+            self.m2 += (value - evicted) * (value - self.mean + evicted - old_mean)
+            self.m2 = max(self.m2, 0.0)
+        if self.buffer.wrapped:
+            values = self.buffer.values[:self.buffer.count]
+            self.mean = math.fsum(values) / len(values)
+            self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+
+    def std(self):
+        if not self.buffer.full or self.buffer.size < 2:
+            return NAN
+        return math.sqrt(self.m2 / (self.buffer.size - 1))
+
+
+class SymbolMetricsState:
+    """Rolling metric state for one symbol, updated in constant time per bar"""
+
+    def __init__(self):
+        self.closes_7 = RingBuffer(MOVING_AVG_WINDOW)
+        self.closes_20 = RingBuffer(MOMENTUM_WINDOW)
+        self.highs = MonotonicWindow(WEEK_52_WINDOW, maximum=True)
+        self.lows = MonotonicWindow(WEEK_52_WINDOW, maximum=False)
+        self.returns = RollingVariance(VOLATILITY_WINDOW)
+        self.latest = None
+
+    def update(self, open_price, high_price, low_price, close_price):
+        """Apply one bar and return its metrics, keyed like calculate_metrics columns
+
+        Raises ValueError, leaving the state untouched, for a bar with a
+        non-finite price or a non-positive open: one such value would poison
+        the running sums for every later bar.
+        """
+        prices = (open_price, high_price, low_price, close_price)
+        if not all(math.isfinite(price) for price in prices) or open_price <= 0:
+            raise ValueError(f'Invalid bar: open={open_price}, high={high_price}, low={low_price}, close={close_price}')
+        daily_return = (close_price - open_price) / open_price
+
+        # Close from MOMENTUM_WINDOW bars ago is evicted by this push
+        close_20_ago = self.closes_20.push(close_price)
+        self.closes_7.push(close_price)
+        self.highs.push(high_price)
+        self.lows.push(low_price)
+        self.returns.push(daily_return)
+
+        self.latest = {
+            'daily_return': daily_return,
+            'moving_avg_7': self.closes_7.mean(),
+            'week_52_high': self.highs.value(),
+            'week_52_low': self.lows.value(),
+            'volatility_score': self.returns.std() * 100,
+            'momentum': (
+                (close_price - close_20_ago) / close_20_ago * 100
+                if close_20_ago is not None else NAN
+            ),
+        }
+        return self.latest
+
+
+class StreamingMetricsEngine:
+    """Holds per-symbol rolling state so intraday ticks avoid recomputing over history"""
+
+    def __init__(self):
+        self.states = {}
+
+    def update(self, symbol, open_price, high_price, low_price, close_price):
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = SymbolMetricsState()
+        return state.update(float(open_price), float(high_price), float(low_price), float(close_price))
+
+    def replay(self, symbol, df):
+        """Feed an OHLC DataFrame (oldest first) through the engine, returns one metrics dict per row"""
+        return [
+            self.update(symbol, open_price, high_price, low_price, close_price)
+            for open_price, high_price, low_price, close_price
+            in df[['Open', 'High', 'Low', 'Close']].itertuples(index=False)
+        ]
+
+    def latest(self, symbol):
+        state = self.states.get(symbol)
+        return state.latest if state else None
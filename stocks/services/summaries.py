@@ -0,0 +1,59 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Max, Min, Q
+
+from stocks.models import Company, CompanySummary, StockData
+
+TRAILING_WINDOW = timedelta(weeks=52)
+
+# Latest-row StockData metrics copied onto the summary for the screener
+LATEST_METRICS = ('daily_return', 'volatility_score', 'momentum')
+
+
+def refresh_company_summary(company):
+    """Rebuild one company's CompanySummary from its StockData, returns None if it has no data"""
+    history = StockData.objects.filter(company=company)
+    latest = history.order_by('-date').values('date', 'close_price', *LATEST_METRICS).first()
+    if latest is None:
+        CompanySummary.objects.filter(company=company).delete()
+        return None
+
+    trailing = Q(date__gt=latest['date'] - TRAILING_WINDOW)
+    totals = history.aggregate(
+        week_52_high=Max('week_52_high'),
+        week_52_low=Min('week_52_low'),
+        average_close=Avg('close_price'),
+        trailing_high=Max('high_price', filter=trailing),
+        trailing_low=Min('low_price', filter=trailing),
+        trailing_average_close=Avg('close_price', filter=trailing),
+    )
+
+    distance = None
+    if totals['trailing_high']:
+        distance = ((1 - latest['close_price'] / totals['trailing_high']) * 100).quantize(Decimal('0.0001'))
+
+    summary, _ = CompanySummary.objects.update_or_create(
+        company=company,
+        defaults={
+            'current_price': latest['close_price'],
+            'last_updated': latest['date'],
+            'distance_from_high': distance,
+            **{field: latest[field] for field in LATEST_METRICS},
+            **totals,
+        }
+    )
+    return summary
+
+
+def refresh_summaries(symbols=None):
+    """Rebuild summaries for the given symbols (default: every company), returns the number refreshed"""
+    companies = Company.objects.all()
+    if symbols:
+        companies = companies.filter(symbol__in=symbols)
+
+    refreshed = 0
+    for company in companies:
+        if refresh_company_summary(company) is not None:
+            refreshed += 1
+    return refreshed
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+def business_days(days, end=None):
+    """DatetimeIndex of the `days` weekdays ending at `end` (default today)"""
+    end = np.datetime64(pd.Timestamp(end or pd.Timestamp.today()).date(), 'D')
+    dates = np.busday_offset(end, np.arange(1 - days, 1), roll='backward')
+    index = pd.DatetimeIndex(dates.astype('datetime64[s]'))
+    # Nanosecond resolution (pandas' default) whenever the range allows it
+    try:
+        return index.as_unit('ns')
+    except (OverflowError, pd.errors.OutOfBoundsDatetime):
+        return index
+
+
+def generate_ohlcv(days, seed=0, start_price=100.0, end=None, drift=0.0003, volatility=0.02):
+    """Generate a yfinance-shaped OHLCV DataFrame from a seeded random walk"""
+    rng = np.random.default_rng(seed)
+    index = business_days(days, end)
+
+    log_returns = rng.normal(drift, volatility, days)
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate(([start_price], close[:-1])) * (1 + rng.normal(0, volatility / 4, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, days)))
+    volume = rng.integers(1_000_000, 5_000_000, days)
+
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+        index=index,
+    )
+
+
+# Symbols generated per vectorized block; part of the seed contract, since a
+# different block size would draw different random numbers
+UNIVERSE_BLOCK = 256
+TRADING_DAYS = 252
+
+
+def generate_universe(symbols, days, seed=0, end=None, start_price=(20.0, 500.0),
+                      annual_drift=(-0.05, 0.20), annual_volatility=(0.15, 0.60), market_share=0.4):
+    """Yield (index, OHLCV DataFrame) for a seeded universe of geometric Brownian motions
+
+    Each symbol's log returns mix a shared market factor (market_share of its
+    variance) with idiosyncratic noise, so symbols are realistically
+    correlated. Per-symbol start price, drift and volatility are drawn
+    uniformly from the given ranges. Paths are generated UNIVERSE_BLOCK
+    symbols at a time as (days x symbols) arrays; the same seed always yields
+    the same universe.
+    """
+    index = business_days(days, end)
+    dt = 1 / TRADING_DAYS
+    market = np.random.default_rng([seed, 0]).standard_normal(days)
+
+    for block_start in range(0, symbols, UNIVERSE_BLOCK):
+        width = min(UNIVERSE_BLOCK, symbols - block_start)
+        rng = np.random.default_rng([seed, 1 + block_start // UNIVERSE_BLOCK])
+        # Always draw a full block so a symbol's path does not depend on `symbols`
+        price0 = rng.uniform(*start_price, UNIVERSE_BLOCK)[:width]
+        mu = rng.uniform(*annual_drift, UNIVERSE_BLOCK)[:width]
+        sigma = rng.uniform(*annual_volatility, UNIVERSE_BLOCK)[:width]
+        base_volume = np.exp(rng.uniform(np.log(2e5), np.log(5e7), UNIVERSE_BLOCK))[:width]
+        noise = rng.standard_normal((days, UNIVERSE_BLOCK))[:, :width]
+        gaps, wicks_high, wicks_low, volume_noise = (
+            rng.standard_normal((days, UNIVERSE_BLOCK))[:, :width] for _ in range(4)
+        )
+
+        shocks = np.sqrt(market_share) * market[:, None] + np.sqrt(1 - market_share) * noise
+        log_returns = (mu - sigma ** 2 / 2) * dt + sigma * np.sqrt(dt) * shocks
+        close = price0 * np.exp(np.cumsum(log_returns, axis=0))
+
+        daily_sigma = sigma * np.sqrt(dt)
+        previous_close = np.vstack([price0, close[:-1]])
+        open_ = previous_close * np.exp(gaps * daily_sigma / 4)
+        high = np.maximum(open_, close) * np.exp(np.abs(wicks_high) * daily_sigma / 2)
+        low = np.minimum(open_, close) * np.exp(-np.abs(wicks_low) * daily_sigma / 2)
+        # Busier days on bigger moves
+        volume = base_volume * np.exp(0.3 * volume_noise + 5 * np.abs(log_returns))
+
+        for column in range(width):
+            yield block_start + column, pd.DataFrame(
+                {
+                    'Open': open_[:, column],
+                    'High': high[:, column],
+                    'Low': low[:, column],
+                    'Close': close[:, column],
+                    'Volume': volume[:, column].astype('int64'),
+                },
+                index=index,
+            )
@@ -0,0 +1,140 @@
+from django.db import connection, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Func, Max, Min, Sum, Value, When, Window
+from django.db.models.expressions import RowRange
+from django.db.models.functions import Greatest, Lag, NullIf, Round, RowNumber, Sqrt
+from django.db.models.lookups import Exact, GreaterThanOrEqual
+
+from stocks.models import Company, CorporateAction, StockData
+from stocks.services.cache import bump_history_on_commit, bump_on_commit
+from stocks.services.columnar_store import sync_on_commit
+from stocks.services.corporate_actions import recompute_affected_metrics
+from stocks.services.data_collector import StockDataCollector
+from stocks.services.summaries import refresh_summaries
+
+# Trailing window lengths in rows, matching StockDataCollector.calculate_metrics
+MOVING_AVERAGE_ROWS = 7
+WEEK_52_ROWS = 252
+VOLATILITY_ROWS = 30
+MOMENTUM_ROWS = 20
+
+# An integer zero keeps PostgreSQL's NULLIF(numeric, ...) numeric
+ZERO = Value(0, output_field=FloatField())
+
+# Annotation prefix; annotations may not reuse the model's field names
+PREFIX = 'new_'
+
+
+class Real(Func):
+    """A decimal column used in division
+
+    SQLite stores whole-number decimals as integers, which would make the
+    division truncate, so it is cast to REAL there. PostgreSQL keeps numeric:
+    SUM(numeric) has an inverse transition, so its sliding windows stay
+    linear, whereas SUM(double precision) re-adds the whole frame per row.
+    """
+
+    template = '%(expressions)s'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, template='CAST(%(expressions)s AS REAL)', **extra_context)
+
+
+def _over(expression, rows=None):
+    """expression over the company's rows by date, limited to the trailing `rows` rows"""
+    return Window(
+        expression,
+        partition_by=F('company_id'),
+        order_by=F('date').asc(),
+        frame=RowRange(start=-(rows - 1), end=0) if rows else None,
+    )
+
+
+def _when_full(rows, expression, counted=None):
+    """expression, or NULL until the trailing window holds `rows` values, like pandas' rolling()
+
+    Windows over always-present columns are full from the rows-th row on;
+    pass `counted` to count the non-NULL values of a nullable expression.
+    """
+    if counted is None:
+        condition = GreaterThanOrEqual(_over(RowNumber()), rows)
+    else:
+        condition = Exact(_over(Count(counted), rows), rows)
+    return Case(When(condition, then=expression), output_field=FloatField())
+
+
+def metrics_queryset(symbols=None):
+    """StockData ids annotated with every derived metric, computed by SQL window functions
+
+    Works from the stored (rounded) prices, so values can differ from the
+    pandas implementation in the last rounded digit.
+    """
+    open_price, close_price = Real('open_price'), Real('close_price')
+    daily_return = (close_price - open_price) / NullIf(open_price, ZERO)
+
+    # SQLite has no STDDEV window function: sample variance from running sums,
+    # clamped at zero against rounding error
+    n = VOLATILITY_ROWS
+    total = _over(Sum(daily_return), n)
+    squares = _over(Sum(daily_return * daily_return), n)
+    variance = Greatest((squares - total * total / Value(float(n))) / Value(float(n - 1)), Value(0.0))
+
+    previous_close = _over(Lag(close_price, MOMENTUM_ROWS))
+    metrics = {
+        'daily_return': daily_return,
+        'moving_avg_7': _when_full(MOVING_AVERAGE_ROWS, _over(Avg('close_price'), MOVING_AVERAGE_ROWS)),
+        'week_52_high': _when_full(WEEK_52_ROWS, _over(Max('high_price'), WEEK_52_ROWS)),
+        'week_52_low': _when_full(WEEK_52_ROWS, _over(Min('low_price'), WEEK_52_ROWS)),
+        'volatility_score': _when_full(n, Sqrt(variance) * Value(100.0), counted=daily_return),
+        'momentum': (close_price - previous_close) / NullIf(previous_close, ZERO) * Value(100.0),
+    }
+
+    places = {field: places for field, places in StockDataCollector.METRIC_COLUMNS.values()}
+    queryset = StockData.objects.all()
+    if symbols is not None:
+        queryset = queryset.filter(company_id__in=list(symbols))
+    return queryset.values('id').annotate(**{
+        f'{PREFIX}{field}': Round(expression, places[field], output_field=FloatField())
+        for field, expression in metrics.items()
+    })
+
+
+def recompute_metrics(symbols=None):
+    """Recompute every derived metric inside the database with one UPDATE ... FROM, returns rows updated
+
+    Covers the given symbols (default: all); rows whose windows span a
+    corporate action are then redone by recompute_affected_metrics, and what
+    depends on the metrics is refreshed. The window query is built with Django expressions and
+    compiled for the current backend (SQLite 3.33+ or PostgreSQL); no rows
+    are loaded into Python.
+    """
+    queryset = metrics_queryset(symbols)
+    select, params = queryset.query.get_compiler(connection=connection).as_sql()
+
+    quote = connection.ops.quote_name
+    table = quote(StockData._meta.db_table)
+    fields = [field for field, _ in StockDataCollector.METRIC_COLUMNS.values()]
+    sql = 'UPDATE {table} SET {assignments} FROM ({select}) AS metrics WHERE {table}.{id} = metrics.{id}'.format(
+        table=table,
+        assignments=', '.join(f'{quote(field)} = metrics.{quote(PREFIX + field)}' for field in fields),
+        select=select,
+        id=quote('id'),
+    )
+    symbols = list(Company.objects.values_list('symbol', flat=True)) if symbols is None else list(symbols)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            updated = cursor.rowcount
+
+        # Windows spanning a split or dividend need prices in one unit
+        actions = CorporateAction.objects.filter(company_id__in=symbols).order_by('ex_date')
+        for symbol, ex_date in actions.values_list('company_id', 'ex_date'):
+            recompute_affected_metrics(symbol, ex_date)
+
+        # 52-week summaries, cached responses and the columnar store read the metrics
+        refresh_summaries(symbols)
+        for symbol in symbols:
+            bump_on_commit(symbol)
+            sync_on_commit(symbol)
+        bump_history_on_commit()
+    return updated
@@ -17,8 +17,9 @@ class StockDashboard {
 
     async loadCompanies() {
         try {
-            const response = await fetch('/stocks/api/companies/');
-            this.companies = await response.json();
+            const response = await fetch('/stocks/api/dashboard/');
+            const dashboard = await response.json();
+            this.companies = dashboard.companies;
             this.renderCompaniesList();
             this.populateComparisonSelects();
         } catch (error) {
@@ -55,36 +56,28 @@ class StockDashboard {
         document.getElementById('companyName').textContent = company.name;
         document.getElementById('companySymbol').textContent = company.symbol;
 
-        // Load company data
-        await this.loadCompanyData(company.symbol);
-        await this.loadCompanySummary(company.symbol);
+        // Load series, summary and insights in one request
+        await this.loadCompanyDashboard(company.symbol);
     }
 
-    async loadCompanyData(symbol) {
+    async loadCompanyDashboard(symbol) {
         try {
-            const response = await fetch(`/stocks/api/data/${symbol}/`);
-            const data = await response.json();
-
-            this.renderPriceChart(data);
-            this.renderPerformanceChart(data);
-        } catch (error) {
-            console.error('Error loading company data:', error);
-        }
-    }
-
-    async loadCompanySummary(symbol) {
-        try {
-            const response = await fetch(`/stocks/api/summary/${symbol}/`);
-            const summary = await response.json();
-
-            this.updateCompanyInfo(summary);
-            this.renderKeyMetrics(summary);
+            const response = await fetch(`/stocks/api/dashboard/${symbol}/`);
+            const dashboard = await response.json();
+            const stock = dashboard.stocks[symbol];
+
+            this.renderPriceChart(stock.series.columns);
+            this.renderPerformanceChart(stock.series.columns);
+            if (stock.summary) {
+                this.updateCompanyInfo(stock.summary, stock.insights);
+                this.renderKeyMetrics(stock.summary);
+            }
         } catch (error) {
-            console.error('Error loading company summary:', error);
+            console.error('Error loading company dashboard:', error);
         }
     }
 
-    renderPriceChart(stockData) {
+    renderPriceChart(columns) {
         const ctx = document.getElementById('priceChart').getContext('2d');
 
         // Destroy existing chart
@@ -92,8 +85,9 @@ class StockDashboard {
             this.priceChart.destroy();
         }
 
-        const dates = stockData.map(item => new Date(item.date).toLocaleDateString()).reverse();
-        const prices = stockData.map(item => parseFloat(item.close_price)).reverse();
+        // Series columns are newest first
+        const dates = columns.date.map(date => new Date(date).toLocaleDateString()).reverse();
+        const prices = [...columns.close_price].reverse();
 
         this.priceChart = new Chart(ctx, {
             type: 'line',
@@ -126,14 +120,14 @@ class StockDashboard {
         });
     }
 
-    renderPerformanceChart(stockData) {
+    renderPerformanceChart(columns) {
         const ctx = document.getElementById('performanceChart').getContext('2d');
 
         if (this.performanceChart) {
             this.performanceChart.destroy();
         }
 
-        const returns = stockData.map(item => parseFloat(item.daily_return) * 100).reverse();
+        const returns = columns.daily_return.map(value => (value || 0) * 100).reverse();
         const colors = returns.map(r => r >= 0 ? '#28a745' : '#dc3545');
 
         this.performanceChart = new Chart(ctx, {
@@ -159,11 +153,10 @@ class StockDashboard {
         });
     }
 
-    updateCompanyInfo(summary) {
+    updateCompanyInfo(summary, insights) {
         document.getElementById('currentPrice').textContent = `$${parseFloat(summary.current_price).toFixed(2)}`;
 
-        // Calculate daily change (you might want to get this from the latest data)
-        const changePercent = 0; // This should come from your data
+        const changePercent = insights ? insights.key_metrics.daily_change_percent : 0;
         const changeElement = document.getElementById('priceChange');
         changeElement.textContent = `${changePercent >= 0 ? '+' : ''}${changePercent.toFixed(2)}% Today`;
         changeElement.className = changePercent >= 0 ? 'text-success' : 'text-danger';
@@ -1,3 +1,1227 @@
-from django.test import TestCase
+import base64
+import importlib.util
+import io
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .models import Company, CompanySummary, CorporateAction, StockData
+from .routers import READ_ALIAS, ReadReplicaRouter, api_request
+from .serializers import STOCK_DATA_COLUMNS, column_values
+from .services import postgres
+from .services.backtest import Rule, load_universe, run_backtest, run_grid, simulate, summarize
+from .services.benchmarks import drop_seeded, find_regressions, seed_history
+from .services.columnar_store import get_store, sync_store
+from .services.corporate_actions import record_corporate_action
+from .services.correlation import RollingMoments, build_moments, reset_moments, top_peers
+from .services.data_collector import StockDataCollector
+from .services.export import export_chunks
+from .services.importer import import_file
+from .services.metrics import REGISTRY
+from .services.providers import SyntheticProvider
+from .services.sqlite import SQLITE_PRAGMAS
+from .services.query_plans import audit_hot_queries
+from .services.streaming import StreamingMetricsEngine
+from .services.summaries import refresh_summaries
+from .services.synthetic import generate_ohlcv, generate_universe
+from .services.window_metrics import recompute_metrics
+
+
+def _without_ids(rows):
+    return [{key: value for key, value in row.items() if key != 'id'} for row in rows]
+
+
+class BulkIngestionTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='TEST', name='Test Company')
+        self.frame = StockDataCollector.calculate_metrics(generate_ohlcv(300, seed=1))
+
+    def test_bulk_save_reports_created_and_updated(self):
+        created, updated = StockDataCollector.bulk_save_stock_data('TEST', self.frame.iloc[:200], batch_size=64)
+        self.assertEqual((created, updated), (200, 0))
+
+        created, updated = StockDataCollector.bulk_save_stock_data('TEST', self.frame, batch_size=64)
+        self.assertEqual((created, updated), (100, 200))
+        self.assertEqual(StockData.objects.filter(company_id='TEST').count(), 300)
+
+    def test_bulk_save_matches_per_row_path(self):
+        StockDataCollector.save_stock_data('TEST', self.frame)
+        expected = list(StockData.objects.order_by('date').values())
+        StockData.objects.all().delete()
+
+        StockDataCollector.bulk_save_stock_data('TEST', self.frame)
+        actual = list(StockData.objects.order_by('date').values())
+        self.assertEqual(_without_ids(actual), _without_ids(expected))
+
+
+class CollectionPipelineTests(TestCase):
+    def setUp(self):
+        for symbol in ('AAA', 'BBB', 'CCC'):
+            Company.objects.create(symbol=symbol, name=f'{symbol} Corp')
+
+    def test_collect_symbols_retries_and_saves_every_symbol(self):
+        provider = SyntheticProvider(days=60, failures={'BBB': 2})
+        results = StockDataCollector.collect_symbols(
+            ['AAA', 'BBB', 'CCC'], workers=2, provider=provider, retries=2, backoff=0
+        )
+
+        self.assertEqual(results, {symbol: (60, 0) for symbol in ('AAA', 'BBB', 'CCC')})
+        self.assertEqual(StockData.objects.count(), 180)
+
+    def test_collect_symbols_gives_up_after_retries(self):
+        provider = SyntheticProvider(days=60, failures={'BBB': 5})
+        results = StockDataCollector.collect_symbols(
+            ['AAA', 'BBB'], workers=2, provider=provider, retries=1, backoff=0
+        )
+
+        self.assertIsNone(results['BBB'])
+        self.assertFalse(StockData.objects.filter(company_id='BBB').exists())
+
+    def test_collect_symbols_survives_a_symbol_that_fails_processing(self):
+        class MalformedProvider(SyntheticProvider):
+            def fetch(self, symbol, period="1y", start=None):
+                data = super().fetch(symbol, period, start)
+                return data.drop(columns='Close') if symbol == 'BBB' else data
+
+        results = StockDataCollector.collect_symbols(
+            ['AAA', 'BBB', 'CCC'], workers=1, provider=MalformedProvider(days=60), retries=0
+        )
+
+        self.assertEqual(results, {'AAA': (60, 0), 'BBB': None, 'CCC': (60, 0)})
+        self.assertEqual(StockData.objects.filter(company_id__in=['AAA', 'CCC']).count(), 120)
+
+
+class IncrementalUpdateTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='INC', name='Incremental Corp')
+        self.provider = SyntheticProvider(days=300)
+        self.full = StockDataCollector.calculate_metrics(self.provider.fetch('INC'))
+
+    def test_incremental_run_only_adds_new_days(self):
+        StockDataCollector.bulk_save_stock_data('INC', self.full.iloc[:295])
+
+        results = StockDataCollector.collect_symbols(['INC'], provider=self.provider, incremental=True)
+        self.assertEqual(results['INC'], (5, 0))
+
+        stored = StockData.objects.filter(company_id='INC').order_by('date')
+        self.assertEqual(stored.count(), 300)
+        for row, (_, expected) in zip(stored.reverse()[:5], self.full.iloc[::-1].iterrows()):
+            self.assertAlmostEqual(float(row.moving_avg_7), expected['moving_avg_7'], places=1)
+            self.assertAlmostEqual(float(row.week_52_high), expected['week_52_high'], places=1)
+            self.assertAlmostEqual(float(row.volatility_score), expected['volatility_score'], places=2)
+            self.assertAlmostEqual(float(row.momentum), expected['momentum'], places=1)
+
+    def test_incremental_run_is_noop_when_up_to_date(self):
+        StockDataCollector.bulk_save_stock_data('INC', self.full)
+
+        results = StockDataCollector.collect_symbols(['INC'], provider=self.provider, incremental=True)
+        self.assertEqual(results['INC'], (0, 0))
+
+
+class StreamingMetricsTests(SimpleTestCase):
+    def test_replay_matches_calculate_metrics(self):
+        history = generate_ohlcv(600, seed=7)
+        expected = StockDataCollector.calculate_metrics(history)
+
+        engine = StreamingMetricsEngine()
+        streamed = pd.DataFrame(engine.replay('SYM', history), index=history.index)
+
+        for column in streamed.columns:
+            np.testing.assert_allclose(
+                streamed[column].to_numpy(), expected[column].to_numpy(),
+                rtol=1e-9, atol=1e-12, err_msg=column
+            )
+        self.assertEqual(engine.latest('SYM'), streamed.iloc[-1].to_dict())
+
+    def test_invalid_bars_are_rejected_without_touching_state(self):
+        engine = StreamingMetricsEngine()
+        history = generate_ohlcv(60, seed=2)
+        engine.replay('SYM', history.iloc[:59])
+        for bar in ((float('nan'), 2, 1, 1), (1, float('inf'), 1, 1), (0, 1, 1, 1)):
+            with self.subTest(bar=bar), self.assertRaises(ValueError):
+                engine.update('SYM', *bar)
+        expected = StockDataCollector.calculate_metrics(history).iloc[-1]
+        latest = engine.replay('SYM', history.iloc[59:])[-1]
+        self.assertAlmostEqual(latest['volatility_score'], expected['volatility_score'], places=9)
+        self.assertAlmostEqual(latest['moving_avg_7'], expected['moving_avg_7'], places=9)
+
+    def test_running_sums_do_not_drift(self):
+        # Huge early prices leave rounding error in add/subtract sums unless they are resynced
+        history = generate_ohlcv(400, seed=4)
+        history.iloc[:100] *= 1e12
+        expected = StockDataCollector.calculate_metrics(history.iloc[-60:]).iloc[-1]
+        latest = StreamingMetricsEngine().replay('SYM', history)[-1]
+        self.assertAlmostEqual(latest['moving_avg_7'], expected['moving_avg_7'], places=9)
+        self.assertAlmostEqual(latest['volatility_score'], expected['volatility_score'], places=9)
+
+
+class StockSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Company.objects.create(symbol='SUM', name='Summary Corp')
+        self.frame = StockDataCollector.calculate_metrics(generate_ohlcv(400, seed=3))
+        StockDataCollector.bulk_save_stock_data('SUM', self.frame)
+
+    def test_summary_is_a_single_lookup(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/stocks/api/summary/SUM/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertAlmostEqual(float(data['current_price']), self.frame['Close'].iloc[-1], places=2)
+        self.assertAlmostEqual(float(data['week_52_high']), self.frame['week_52_high'].max(), places=2)
+
+    def test_trailing_window_uses_last_52_weeks(self):
+        data = self.client.get('/stocks/api/summary/SUM/?window=trailing').json()
+
+        trailing = self.frame[self.frame.index > self.frame.index[-1] - pd.Timedelta(weeks=52)]
+        self.assertAlmostEqual(float(data['week_52_high']), trailing['High'].max(), places=2)
+        self.assertAlmostEqual(float(data['week_52_low']), trailing['Low'].min(), places=2)
+
+    def test_missing_summary_is_rebuilt(self):
+        CompanySummary.objects.all().delete()
+        self.assertEqual(self.client.get('/stocks/api/summary/SUM/').status_code, 200)
+        self.assertTrue(CompanySummary.objects.filter(company_id='SUM').exists())
+
+    def test_unknown_symbol_is_404(self):
+        self.assertEqual(self.client.get('/stocks/api/summary/NOPE/').status_code, 404)
+
+
+@skipUnless(connection.vendor == 'sqlite', "PostgreSQL's cost-based plans for tiny test tables are not "
+            "representative; run `manage.py benchmark query_plans` at scale instead")
+class QueryPlanTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=5, rows=300)
+        refresh_summaries(self.symbols)
+
+    def test_hot_queries_use_indexes_without_sorts(self):
+        for endpoint, (status_code, report) in audit_hot_queries(*self.symbols[:2]).items():
+            self.assertEqual(status_code, 200, endpoint)
+            for query in report:
+                self.assertEqual(query['problems'], [], f"{endpoint}: {query['sql']}\n{query['plan']}")
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Company.objects.create(symbol='CCH', name='Cache Corp')
+        self.frame = StockDataCollector.calculate_metrics(generate_ohlcv(100, seed=5))
+        StockDataCollector.bulk_save_stock_data('CCH', self.frame.iloc[:90])
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get('/stocks/api/data/CCH/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/stocks/api/data/CCH/')
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_ingestion_invalidates_symbol(self):
+        first = self.client.get('/stocks/api/data/CCH/')
+        with self.captureOnCommitCallbacks(execute=True):
+            StockDataCollector.bulk_save_stock_data('CCH', self.frame)
+
+        second = self.client.get('/stocks/api/data/CCH/')
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()[0]['date'], str(self.frame.index[-1].date()))
+
+    def test_spaced_symbol_list_is_invalidated(self):
+        Company.objects.create(symbol='CCI', name='Cache Inc')
+        StockDataCollector.bulk_save_stock_data('CCI', self.frame.iloc[:90])
+        url = '/stocks/api/compare/?symbols=CCH,%20CCI&days=20'
+        first = self.client.get(url).json()
+        self.assertEqual(sorted(first['performance']), ['CCH', 'CCI'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockDataCollector.bulk_save_stock_data('CCI', StockDataCollector.calculate_metrics(generate_ohlcv(90, seed=9)))
+        second = self.client.get(url).json()
+        self.assertNotEqual(second['performance']['CCI'], first['performance']['CCI'])
+        # Symbols match exactly, in ?symbols= as in the URL path
+        for url in ('/stocks/api/compare/?symbols=cch,CCI&days=20', '/stocks/api/data/cch/'):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get('/stocks/api/insights/CCH/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/stocks/api/insights/CCH/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            file_cache = {'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            }}
+            with override_settings(CACHES=file_cache):
+                first = self.client.get('/stocks/api/summary/CCH/')
+                with self.assertNumQueries(0):
+                    second = self.client.get('/stocks/api/summary/CCH/')
+        self.assertEqual(second.json(), first.json())
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class StockDataLayoutTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='LAY', name='Layout Corp')
+        StockDataCollector.bulk_save_stock_data(
+            'LAY', StockDataCollector.calculate_metrics(generate_ohlcv(50, seed=9))
+        )
+
+    def test_rows_layout_has_no_per_row_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/stocks/api/data/LAY/')
+        self.assertEqual(len(response.json()), 30)
+
+    def test_columns_layout_matches_rows_layout(self):
+        rows = self.client.get('/stocks/api/data/LAY/').json()
+        with self.assertNumQueries(2):
+            payload = self.client.get('/stocks/api/data/LAY/?layout=columns').json()
+
+        self.assertEqual(payload['company'], {'symbol': 'LAY', 'name': 'Layout Corp'})
+        self.assertEqual(payload['count'], 30)
+        self.assertEqual(payload['columns']['date'], [row['date'] for row in rows])
+        for field in ('close_price', 'volume', 'momentum'):
+            expected = [None if row[field] is None else float(row[field]) for row in rows]
+            self.assertEqual(payload['columns'][field], expected)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class StockDataPaginationTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='PAG', name='Paging Corp')
+        self.frame = StockDataCollector.calculate_metrics(generate_ohlcv(120, seed=11))
+        StockDataCollector.bulk_save_stock_data('PAG', self.frame)
+        self.dates = [str(date.date()) for date in self.frame.index]
+
+    def _pages(self, url):
+        while url:
+            payload = self.client.get(url).json()
+            yield payload
+            url = payload['next_cursor'] and f"/stocks/api/data/PAG/?order=asc&limit=50&cursor={payload['next_cursor']}"
+
+    def test_cursor_walks_full_history(self):
+        pages = list(self._pages('/stocks/api/data/PAG/?order=asc&limit=50'))
+
+        self.assertEqual([page['count'] for page in pages], [50, 50, 20])
+        self.assertIsNone(pages[-1]['next_cursor'])
+        dates = [row['date'] for page in pages for row in page['results']]
+        self.assertEqual(dates, self.dates)
+
+    def test_range_and_fields(self):
+        start, end = self.dates[10], self.dates[19]
+        payload = self.client.get(
+            f'/stocks/api/data/PAG/?start={start}&end={end}&fields=close_price&layout=columns'
+        ).json()
+
+        self.assertEqual(list(payload['columns']), ['date', 'close_price'])
+        self.assertEqual(payload['columns']['date'], self.dates[19:9:-1])
+        self.assertIsNone(payload['next_cursor'])
+
+    def test_invalid_parameters(self):
+        impossible_cursor = base64.urlsafe_b64encode(b'desc:2024-02-30').decode()
+        for query in ('start=yesterday', 'start=2024-02-30', 'fields=close_price,nope', 'limit=0', 'order=up',
+                      'cursor=garbage', f'cursor={impossible_cursor}'):
+            response = self.client.get(f'/stocks/api/data/PAG/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class CompareManyTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=4, rows=80)
+
+    def test_compare_many_in_two_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/stocks/api/compare/?symbols={','.join(self.symbols)}&days=30")
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+
+        returns = pd.DataFrame({
+            symbol: [float(value) for value in StockData.objects.filter(company_id=symbol)
+                     .order_by('-date').values_list('daily_return', flat=True)[:30]]
+            for symbol in self.symbols
+        })
+        for symbol in self.symbols:
+            self.assertEqual(payload['performance'][symbol]['days'], 30)
+            self.assertAlmostEqual(payload['performance'][symbol]['volatility'], returns[symbol].std() * 100, places=3)
+        np.testing.assert_allclose(payload['correlation'], returns.corr().to_numpy(), atol=1e-4)
+        self.assertEqual(sorted(payload['rankings']['volatility']), sorted(self.symbols))
+
+    def test_unknown_symbol_is_404(self):
+        response = self.client.get(f'/stocks/api/compare/?symbols={self.symbols[0]},NOPE')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class StockInsightsTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=3, rows=80)
+
+    def test_insights_in_two_queries(self):
+        symbol = self.symbols[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/stocks/api/insights/{symbol}/?days=20')
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+
+        returns = list(StockData.objects.filter(company_id=symbol)
+                       .order_by('-date').values_list('daily_return', flat=True)[:20])
+        positive = sum(1 for value in returns if value > 0)
+        self.assertEqual(payload['insights']['positive_days_ratio'], f'{positive}/20')
+        self.assertEqual(payload['key_metrics']['daily_change_percent'], round(float(returns[0]) * 100, 2))
+
+    def test_batch_matches_single_symbol(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/stocks/api/insights/')
+        self.assertEqual(response.status_code, 200)
+        batch = response.json()
+        self.assertEqual(batch['count'], len(self.symbols))
+        for result in batch['results']:
+            single = self.client.get(f"/stocks/api/insights/{result['symbol']}/").json()
+            self.assertEqual(result, single)
+
+        subset = self.client.get(f'/stocks/api/insights/?symbols={self.symbols[1]}&days=5').json()
+        self.assertEqual([result['symbol'] for result in subset['results']], [self.symbols[1]])
+
+    def test_invalid_days(self):
+        response = self.client.get(f'/stocks/api/insights/{self.symbols[0]}/?days=0')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/stocks/api/insights/NOPE/')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class ColumnarStoreTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=3, rows=120)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store_settings = override_settings(STOCKS_COLUMNAR_STORE_DIR=directory.name)
+
+    def test_collector_keeps_store_in_sync(self):
+        Company.objects.create(symbol='TEST', name='Test Company')
+        frame = StockDataCollector.calculate_metrics(generate_ohlcv(80, seed=3))
+        with self.store_settings:
+            with self.captureOnCommitCallbacks(execute=True):
+                StockDataCollector.bulk_save_stock_data('TEST', frame)
+            series = get_store().get_series('TEST', ['close_price', 'moving_avg_7'])
+
+        stored = list(StockData.objects.filter(company_id='TEST').order_by('date')
+                      .values_list('date', 'close_price', 'moving_avg_7'))
+        self.assertEqual(series['date'].astype(object).tolist(), [row[0] for row in stored])
+        np.testing.assert_array_equal(series['close_price'], [float(row[1]) for row in stored])
+        # NULL metrics (incomplete rolling windows) are stored as NaN
+        self.assertTrue(np.isnan(series['moving_avg_7'][0]))
+        self.assertIsInstance(series['close_price'], np.memmap)
+
+    def test_ingestion_appends_to_the_stored_history(self):
+        Company.objects.create(symbol='TEST', name='Test Company')
+        frame = StockDataCollector.calculate_metrics(generate_ohlcv(100, seed=3))
+        revised = frame.iloc[90:].assign(Close=frame['Close'].iloc[90:] * 1.01)
+        read = []
+
+        def recording(queryset):
+            read.append(list(column_values(queryset)))
+            return read[-1]
+
+        with self.store_settings, mock.patch('stocks.services.columnar_store.column_values', side_effect=recording):
+            for chunk in (frame.iloc[:80], frame.iloc[80:], revised):
+                with self.captureOnCommitCallbacks(execute=True):
+                    StockDataCollector.bulk_save_stock_data('TEST', chunk)
+            series = get_store().get_series('TEST')
+
+        # Only the first sync reads the whole history
+        self.assertEqual([len(rows) for rows in read], [80, 20, 10])
+        stored = column_values(StockData.objects.filter(company_id='TEST').order_by('date'))
+        for field, values in zip(STOCK_DATA_COLUMNS, zip(*stored)):
+            expected = np.asarray([np.nan if value is None else value for value in values], dtype=series[field].dtype)
+            np.testing.assert_array_equal(series[field], expected, field)
+
+    def test_get_series_range(self):
+        symbol = self.symbols[0]
+        dates = list(StockData.objects.filter(company_id=symbol).order_by('date').values_list('date', flat=True))
+        with self.store_settings:
+            sync_store(self.symbols)
+            series = get_store().get_series(symbol, ['volume'], start=dates[10], end=dates[19])
+            self.assertIsNone(get_store().get_series('NOPE'))
+        self.assertEqual(series['date'].astype(object).tolist(), dates[10:20])
+        self.assertEqual(len(series['volume']), 10)
+
+    def test_api_fast_path_matches_database(self):
+        symbol = self.symbols[0]
+        urls = [
+            f'/stocks/api/data/{symbol}/?layout=columns',
+            f'/stocks/api/data/{symbol}/?limit=50',
+            f'/stocks/api/data/{symbol}/?order=asc&limit=50&fields=close_price,momentum&layout=columns',
+            f"/stocks/api/compare/?symbols={','.join(self.symbols)}&days=30",
+            '/stocks/api/insights/?days=20',
+        ]
+        expected = [self.client.get(url).json() for url in urls]
+        with self.store_settings:
+            sync_store()
+            for url, payload in zip(urls, expected):
+                self.assertEqual(self.client.get(url).json(), payload, url)
+
+            # Walk the full history through cursors: only the company lookup per page
+            cursor, seen = None, 0
+            with self.assertNumQueries(3):
+                while True:
+                    page = self.client.get(
+                        f'/stocks/api/data/{symbol}/?limit=50' + (f'&cursor={cursor}' if cursor else '')
+                    ).json()
+                    seen += page['count']
+                    cursor = page['next_cursor']
+                    if not cursor:
+                        break
+        self.assertEqual(seen, 120)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=2, rows=60)
+        refresh_summaries(self.symbols)
+
+    async def test_async_endpoints_match_drf_endpoints(self):
+        symbol, other = self.symbols
+        paths = [
+            'companies/',
+            f'data/{symbol}/',
+            f'data/{symbol}/?layout=columns',
+            f'data/{symbol}/?limit=10&order=asc',
+            f'summary/{symbol}/?window=trailing',
+            f'compare/?symbol1={symbol}&symbol2={other}',
+            f'compare/?symbols={symbol},{other}&days=20',
+            f'insights/{symbol}/?days=20',
+            'summary/NOPE/',
+            'compare/?symbol1=NOPE&symbol2=NOPE',
+        ]
+        for path in paths:
+            expected = await self.async_client.get(f'/stocks/api/{path}')
+            actual = await self.async_client.get(f'/stocks/api/async/{path}')
+            self.assertEqual(actual.status_code, expected.status_code, path)
+            self.assertEqual(actual.json(), expected.json(), path)
+
+    async def test_async_cache_and_etag(self):
+        url = f'/stocks/api/async/summary/{self.symbols[0]}/'
+        with self.settings(STOCKS_API_CACHE_ENABLED=True):
+            await cache.aclear()
+            first = await self.async_client.get(url)
+            second = await self.async_client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 304)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=3, rows=80)
+        refresh_summaries(self.symbols)
+
+    def test_dashboard_matches_individual_endpoints(self):
+        symbol = self.symbols[0]
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/stocks/api/dashboard/{symbol}/')
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+
+        self.assertEqual(payload['companies'], self.client.get('/stocks/api/companies/').json())
+        stock = payload['stocks'][symbol]
+        columns = self.client.get(f'/stocks/api/data/{symbol}/?layout=columns').json()
+        self.assertEqual(stock['series'], {'count': columns['count'], 'columns': columns['columns']})
+        self.assertEqual(stock['summary'], self.client.get(f'/stocks/api/summary/{symbol}/').json())
+        self.assertEqual(stock['insights'], self.client.get(f'/stocks/api/insights/{symbol}/').json())
+
+    def test_multi_symbol_dashboard(self):
+        response = self.client.get(f"/stocks/api/dashboard/?symbols={','.join(self.symbols[1:])}&days=10")
+        payload = response.json()
+        self.assertEqual(list(payload['stocks']), self.symbols[1:])
+        for symbol in self.symbols[1:]:
+            self.assertEqual(payload['stocks'][symbol]['series']['count'], 30)
+            self.assertEqual(payload['stocks'][symbol]['insights']['insights']['positive_days_ratio'][-3:], '/10')
+
+        companies_only = self.client.get('/stocks/api/dashboard/').json()
+        self.assertEqual((len(companies_only['companies']), companies_only['stocks']), (3, {}))
+        self.assertEqual(self.client.get('/stocks/api/dashboard/NOPE/').status_code, 404)
+
+
+@override_settings(STOCKS_API_CACHE_ENABLED=False)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.symbols = seed_history(symbols=2, rows=40)
+        refresh_summaries(self.symbols)
+        REGISTRY.reset()
+
+    def _samples(self):
+        text = self.client.get('/metrics').content.decode()
+        return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+    def test_metrics_per_view(self):
+        symbol = self.symbols[0]
+        self.client.get(f'/stocks/api/summary/{symbol}/')
+        self.client.get(f'/stocks/api/summary/{symbol}/')
+        self.client.get('/stocks/api/summary/NOPE/')
+        self.client.get(f'/stocks/api/async/summary/{symbol}/')
+        samples = self._samples()
+
+        view = 'view="api_stock_summary"'
+        self.assertEqual(samples[f'stocks_http_requests_total{{{view},status="200"}}'], '2')
+        self.assertEqual(samples[f'stocks_http_requests_total{{{view},status="404"}}'], '1')
+        self.assertEqual(samples[f'stocks_http_request_duration_seconds_count{{{view}}}'], '3')
+        # One summary lookup per hit; the miss also looks up the company
+        self.assertEqual(float(samples[f'stocks_db_queries_per_request_sum{{{view}}}']), 4)
+        self.assertGreater(float(samples[f'stocks_render_duration_seconds_sum{{{view}}}']), 0)
+        self.assertGreater(float(samples[f'stocks_http_response_bytes_sum{{{view}}}']), 0)
+        self.assertEqual(float(samples['stocks_db_queries_per_request_sum{view="api_async_stock_summary"}']), 1)
+        self.assertNotIn('view="metrics"', ''.join(samples))
+
+    def test_slow_query_log(self):
+        with self.settings(STOCKS_SLOW_QUERY_MS=0), self.assertLogs('stocks.slow_queries') as logs:
+            self.client.get(f'/stocks/api/insights/{self.symbols[0]}/')
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(logs.records[0].view, 'api_insights')
+        self.assertIn('stocks_stockdata', logs.records[1].sql)
+
+
+class SyntheticUniverseTests(TestCase):
+    def test_universe_is_reproducible_and_consistent(self):
+        small = dict(generate_universe(3, 300, seed=7))
+        large = dict(generate_universe(300, 300, seed=7))
+        for i, frame in small.items():
+            pd.testing.assert_frame_equal(frame, large[i])
+        self.assertFalse(small[0].equals(dict(generate_universe(1, 300, seed=8))[0]))
+
+        frame = small[1]
+        self.assertTrue((frame['High'] >= frame[['Open', 'Close']].max(axis=1)).all())
+        self.assertTrue((frame['Low'] <= frame[['Open', 'Close']].min(axis=1)).all())
+
+    def test_add_sample_data_uses_collector_metrics(self):
+        call_command('add_sample_data', symbols=2, days=60, seed=3, stdout=io.StringIO())
+        stdout = io.StringIO()
+        call_command('add_sample_data', symbols=3, days=60, seed=3, stdout=stdout)
+        self.assertIn('Created 1 companies, 2 already existed', stdout.getvalue())
+        self.assertEqual(StockData.objects.count(), 180)
+
+        expected = StockDataCollector.calculate_metrics(dict(generate_universe(1, 60, seed=3))[0])
+        latest = StockData.objects.filter(company_id='AAPL').order_by('-date').first()
+        self.assertAlmostEqual(float(latest.moving_avg_7), expected['moving_avg_7'].iloc[-1], places=2)
+        self.assertAlmostEqual(float(latest.close_price), expected['Close'].iloc[-1], places=2)
+        self.assertTrue(CompanySummary.objects.filter(company_id='GOOGL').exists())
+
+    def test_benchmark_rejects_sizes_a_suite_does_not_take(self):
+        with self.assertRaisesMessage(CommandError, 'The ingestion suite does not take --symbols'):
+            call_command('benchmark', 'ingestion', symbols=5, stdout=io.StringIO())
+
+    def test_benchmarks_never_adopt_existing_companies(self):
+        Company.objects.create(symbol='BENCH', name='Real Bench Inc')
+        StockDataCollector.bulk_save_stock_data('BENCH', StockDataCollector.calculate_metrics(generate_ohlcv(30)))
+        with self.assertRaisesMessage(CommandError, 'Benchmark symbols already exist: BENCH'):
+            call_command('benchmark', 'ingestion', rows=30, stdout=io.StringIO())
+        self.assertEqual(StockData.objects.filter(company_id='BENCH').count(), 30)
+
+    def test_dropping_seeded_symbols_clears_cache_and_store(self):
+        tickers = seed_history(symbols=2, rows=30)
+        url = f'/stocks/api/data/{tickers[0]}/'
+        with tempfile.TemporaryDirectory() as root, override_settings(STOCKS_COLUMNAR_STORE_DIR=root):
+            sync_store(tickers)
+            self.assertEqual(self.client.get(url).status_code, 200)
+            drop_seeded(tickers)
+            self.assertEqual(get_store().symbols(), [])
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_find_regressions(self):
+        baseline = [{'endpoint': 'a', 'p50_ms': 10.0}, {'endpoint': 'b', 'rows_per_second': 1000.0}]
+        current = [{'endpoint': 'a', 'p50_ms': 13.0}, {'endpoint': 'b', 'rows_per_second': 900.0}]
+        regressions = find_regressions(baseline, current, tolerance=0.2)
+        self.assertEqual([(r['result'], r['metric']) for r in regressions], [({'endpoint': 'a'}, 'p50_ms')])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Set DATABASE_URL to a PostgreSQL database to run these tests')
+class PostgresFastPathTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='TEST', name='Test Company')
+        self.frame = StockDataCollector.calculate_metrics(generate_ohlcv(1300, seed=5))
+
+    def _rows(self):
+        return _without_ids(StockData.objects.filter(company_id='TEST').order_by('date').values())
+
+    def test_copy_upsert_matches_executemany(self):
+        StockDataCollector.bulk_save_stock_data('TEST', self.frame.iloc[:200], batch_size=64)
+        created, updated = StockDataCollector.bulk_save_stock_data('TEST', self.frame)
+        self.assertEqual((created, updated), (1100, 200))
+        copied = self._rows()
+
+        # Chunks below COPY_THRESHOLD take the executemany path
+        StockData.objects.all().delete()
+        chunk = postgres.COPY_THRESHOLD - 1
+        for start in range(0, len(self.frame), chunk):
+            StockDataCollector.bulk_save_stock_data('TEST', self.frame.iloc[start:start + chunk], batch_size=64)
+        self.assertEqual(copied, self._rows())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite performance profile')
+class SQLiteProfileTests(SimpleTestCase):
+    def _open(self, name):
+        wrapper = connections['default'].__class__(dict(connection.settings_dict, NAME=name), alias='profile')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_new_connections_get_the_profile(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'profile.sqlite3')
+            writer = self._open(path)
+            pragmas = {name: writer.connection.execute(f'PRAGMA {name}').fetchone()[0] for name in SQLITE_PRAGMAS}
+            self.assertEqual(pragmas, {
+                'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -64000,
+                'mmap_size': 256 * 1024 * 1024, 'temp_store': 2,
+            })
+
+            writer.connection.execute('CREATE TABLE t (x)')
+            reader = self._open(f'file:{path}?mode=ro')
+            self.assertEqual(reader.connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            with self.assertRaises(OperationalError):
+                with reader.cursor() as cursor:
+                    cursor.execute('INSERT INTO t VALUES (1)')
+
+    @override_settings(STOCKS_SQLITE_TUNING=False)
+    def test_tuning_can_be_disabled(self):
+        with tempfile.TemporaryDirectory() as root:
+            wrapper = self._open(os.path.join(root, 'plain.sqlite3'))
+            self.assertEqual(wrapper.connection.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+
+
+class ReadRoutingTests(TestCase):
+    def test_router_uses_read_alias_only_for_api_requests(self):
+        router = ReadReplicaRouter()
+        with mock.patch.dict(connections.settings, {READ_ALIAS: connections.settings['default']}):
+            self.assertIsNone(router.db_for_read(StockData))
+            token = api_request.set(True)
+            try:
+                # The test transaction keeps reads on default
+                self.assertIsNone(router.db_for_read(StockData))
+                with mock.patch.object(connections['default'], 'in_atomic_block', False):
+                    self.assertEqual(router.db_for_read(StockData), READ_ALIAS)
+            finally:
+                api_request.reset(token)
+        self.assertFalse(router.allow_migrate(READ_ALIAS, 'stocks'))
+
+        token = api_request.set(True)
+        try:
+            # No 'read' alias configured
+            self.assertIsNone(router.db_for_read(StockData))
+        finally:
+            api_request.reset(token)
+
+    def test_middleware_marks_api_views(self):
+        seen = []
+
+        def record(router, model, **hints):
+            seen.append(api_request.get())
+
+        Company.objects.create(symbol='TEST', name='Test Company')
+        with mock.patch.object(ReadReplicaRouter, 'db_for_read', autospec=True, side_effect=record):
+            self.client.get('/stocks/api/companies/')
+            self.assertTrue(seen and all(seen))
+            seen.clear()
+            self.client.get('/stocks/api/async/companies/')
+            self.assertTrue(seen and all(seen))
+            seen.clear()
+            self.client.get('/stocks/')
+            self.assertFalse(any(seen))
+        self.assertFalse(api_request.get())
+
+
+class WindowMetricsTests(TestCase):
+    def test_database_metrics_match_pandas(self):
+        Company.objects.create(symbol='TEST', name='Test Company')
+        Company.objects.create(symbol='OTHER', name='Other Company')
+        StockDataCollector.bulk_save_stock_data('TEST', StockDataCollector.calculate_metrics(generate_ohlcv(300, seed=4)))
+        StockDataCollector.bulk_save_stock_data('OTHER', StockDataCollector.calculate_metrics(generate_ohlcv(40, seed=5)))
+        expected = list(StockData.objects.order_by('company_id', 'date').values())
+        StockData.objects.update(
+            daily_return=None, moving_avg_7=None, week_52_high=None, week_52_low=None,
+            volatility_score=None, momentum=None,
+        )
+
+        self.assertEqual(recompute_metrics(), 340)
+        # Stored prices are rounded to cents, so allow a last-digit difference
+        tolerance = {
+            'daily_return': 2e-4, 'moving_avg_7': 0.011, 'week_52_high': 0, 'week_52_low': 0,
+            'volatility_score': 0.01, 'momentum': 0.05,
+        }
+        for want, got in zip(expected, StockData.objects.order_by('company_id', 'date').values()):
+            for field, delta in tolerance.items():
+                if want[field] is None:
+                    self.assertIsNone(got[field], field)
+                else:
+                    self.assertAlmostEqual(float(got[field]), float(want[field]), delta=delta, msg=field)
+
+        self.assertEqual(recompute_metrics(['OTHER']), 40)
+        self.assertIsNotNone(CompanySummary.objects.get(company_id='TEST').week_52_high)
+
+
+class CorporateActionTests(TestCase):
+    def setUp(self):
+        Company.objects.create(symbol='TEST', name='Test Company')
+        # A 2-for-1 split at row 300: traded prices halve and volume doubles from then on
+        self.series = generate_ohlcv(600, seed=9)
+        traded = self.series.copy()
+        traded.iloc[300:, :4] /= 2
+        traded.iloc[300:, 4] *= 2
+        self.split_date = self.series.index[300].date()
+        StockDataCollector.bulk_save_stock_data('TEST', StockDataCollector.calculate_metrics(traded))
+        self.before = list(StockData.objects.order_by('date').values())
+
+    def test_split_recomputes_only_spanning_windows(self):
+        action = record_corporate_action('TEST', self.split_date, CorporateAction.SPLIT, '2')
+        self.assertEqual((action.factor, action.cumulative_volume_factor), (Decimal('0.5'), Decimal(2)))
+
+        after = list(StockData.objects.order_by('date').values())
+        self.assertEqual(after[:300], self.before[:300])
+        self.assertEqual(after[552:], self.before[552:])
+
+        # Windows spanning the split now match the unsplit series, in post-split units
+        expected = StockDataCollector.calculate_metrics(self.series)
+        for i in (301, 310, 400, 551):
+            row = after[i]
+            self.assertEqual(row['close_price'], self.before[i]['close_price'])
+            self.assertAlmostEqual(float(row['moving_avg_7']), expected['moving_avg_7'].iloc[i] / 2, delta=0.01)
+            self.assertAlmostEqual(float(row['week_52_high']), expected['week_52_high'].iloc[i] / 2, delta=0.01)
+            self.assertAlmostEqual(float(row['momentum']), expected['momentum'].iloc[i], delta=0.05)
+
+        # The in-database recompute defers to the same adjusted windows
+        recompute_metrics(['TEST'])
+        recomputed = StockData.objects.get(company_id='TEST', date=after[310]['date'])
+        self.assertAlmostEqual(float(recomputed.moving_avg_7), float(after[310]['moving_avg_7']), delta=0.011)
+
+        history = StockDataCollector.load_recent_history('TEST', rows=400)
+        np.testing.assert_allclose(history['Close'].to_numpy(), self.series['Close'].iloc[200:].to_numpy() / 2, atol=0.01)
+
+    def test_adjusted_series_on_read(self):
+        record_corporate_action('TEST', self.split_date, CorporateAction.SPLIT, 2)
+        dividend = self.series.index[500].date()
+        action = record_corporate_action('TEST', dividend, CorporateAction.DIVIDEND, '0.5')
+        previous_close = StockData.objects.get(company_id='TEST', date=self.series.index[499].date()).close_price
+        self.assertEqual(action.factor, (1 - Decimal('0.5') / previous_close).quantize(Decimal('1e-12')))
+
+        raw = {row['date'].isoformat(): row for row in self.before}
+        url = '/stocks/api/data/TEST/?adjusted=1&order=asc&limit=1000&fields=close_price,volume,moving_avg_7'
+        with tempfile.TemporaryDirectory() as root:
+            for store in (None, root):
+                with self.subTest(store=store), override_settings(STOCKS_COLUMNAR_STORE_DIR=store):
+                    sync_store(['TEST'])
+                    results = self.client.get(url).json()['results']
+                    self.assertEqual(len(results), 600)
+                    for i, factor, volume in ((100, 0.5 * float(action.factor), 2), (400, float(action.factor), 1),
+                                              (550, 1, 1)):
+                        row = results[i]
+                        self.assertAlmostEqual(row['close_price'], float(raw[row['date']]['close_price']) * factor, places=3)
+                        self.assertEqual(row['volume'], raw[row['date']]['volume'] * volume)
+
+        self.assertEqual(self.client.get('/stocks/api/data/TEST/?adjusted=yes').status_code, 400)
+
+    def test_invalid_actions(self):
+        for kind, value in ((CorporateAction.SPLIT, '0'), (CorporateAction.DIVIDEND, '100000'), ('merger', '1')):
+            with self.assertRaises(ValueError):
+                record_corporate_action('TEST', self.split_date, kind, value)
+        with self.assertRaises(ValueError):
+            record_corporate_action('TEST', self.series.index[0].date(), CorporateAction.DIVIDEND, '1')
+
+
+class BacktestTests(TestCase):
+    def setUp(self):
+        self.symbols = ['AAA', 'BBB', 'CCC']
+        for symbol in self.symbols:
+            Company.objects.create(symbol=symbol, name=symbol)
+        for i, frame in generate_universe(len(self.symbols), 120, seed=5):
+            StockDataCollector.bulk_save_stock_data(self.symbols[i], StockDataCollector.calculate_metrics(frame))
+        self.rule = Rule('momentum > threshold and close_price > moving_avg_7')
+
+    def test_matches_day_by_day_simulation(self):
+        universe = load_universe(self.symbols, self.rule.fields)
+        result = run_backtest(universe, self.rule, {'threshold': 1.0}, cost_bps=10)
+
+        rows = {(row.company_id, row.date): row for row in StockData.objects.all()}
+        dates = sorted({date for _, date in rows})
+        equity, weights, curve = 1.0, {}, []
+        for previous, date in zip([None] + dates, dates):
+            daily = sum(
+                weight * (float(rows[symbol, date].close_price) / float(rows[symbol, previous].close_price) - 1)
+                for symbol, weight in weights.items()
+            )
+            chosen = [
+                symbol for symbol in self.symbols
+                if rows[symbol, date].momentum is not None and rows[symbol, date].moving_avg_7 is not None
+                and rows[symbol, date].momentum > 1 and rows[symbol, date].close_price > rows[symbol, date].moving_avg_7
+            ]
+            new = {symbol: 1 / len(chosen) for symbol in chosen}
+            turnover = sum(abs(new.get(symbol, 0) - weights.get(symbol, 0)) for symbol in self.symbols)
+            equity *= 1 + daily - turnover * 10 / 10_000
+            curve.append(equity)
+            weights = new
+
+        self.assertEqual(result['curves']['date'][0], dates[0].isoformat())
+        np.testing.assert_allclose(result['curves']['equity'], curve, atol=1e-5)
+        self.assertAlmostEqual(result['stats']['max_drawdown'], min(result['curves']['drawdown']))
+
+    def test_grid_in_shared_memory_pool_matches_serial(self):
+        universe = load_universe(self.symbols, self.rule.fields)
+        grid = {'threshold': [-1.0, 0.0, 1.0, 2.0]}
+        serial = run_grid(universe, self.rule, grid)
+        self.assertEqual([result['parameters'] for result in serial], [{'threshold': value} for value in grid['threshold']])
+        self.assertEqual(run_grid(universe, self.rule, grid, workers=2), serial)
+
+    def test_returns_are_adjusted_for_corporate_actions(self):
+        dates = list(StockData.objects.filter(company_id='AAA').order_by('date').values_list('date', flat=True))
+        before = run_backtest(load_universe(self.symbols, []), Rule('close_price > 0'))
+        # A 2-for-1 split stored the way a provider reports it: prices halve from ex_date
+        StockData.objects.filter(company_id='AAA', date__gte=dates[60]).update(close_price=F('close_price') / 2)
+        record_corporate_action('AAA', dates[60], CorporateAction.SPLIT, '2')
+
+        after = run_backtest(load_universe(self.symbols, []), Rule('close_price > 0'))
+        np.testing.assert_allclose(after['curves']['equity'], before['curves']['equity'], atol=1e-3)
+
+    def test_nan_values_do_not_signal(self):
+        universe = load_universe(self.symbols, ['momentum'])
+        signal = Rule('momentum').evaluate(universe.fields, {})
+        np.testing.assert_array_equal(signal[:20], False)
+        self.assertFalse(Rule('momentum and close_price').evaluate(universe.fields, {})[:20].any())
+
+    def test_mixed_operand_types_evaluate(self):
+        universe = load_universe(self.symbols, ['momentum'])
+        momentum = universe.fields['momentum']
+        np.testing.assert_array_equal(
+            Rule('momentum & 1').evaluate(universe.fields, {}), Rule('momentum and 1').evaluate(universe.fields, {}))
+        np.testing.assert_array_equal(
+            Rule('-(momentum > 0) + abs(momentum < 0) > 0').evaluate(universe.fields, {}), momentum < 0)
+        np.testing.assert_array_equal(
+            Rule('~momentum | (1 / 0 < 0)').evaluate(universe.fields, {}), np.isnan(momentum) | (momentum == 0))
+
+    def test_ruined_equity_stays_at_zero(self):
+        # Swapping symbols turns over twice the book, so a 75% cost takes equity below zero
+        signal = np.array([[True, False], [False, True], [True, False]])
+        daily, equity, drawdown, turnover = simulate(signal, np.zeros(signal.shape), cost_bps=7_500)
+        np.testing.assert_array_equal(equity, [0.25, 0.0, 0.0])
+        stats = summarize(daily, equity, drawdown, turnover)
+        self.assertEqual((stats['total_return'], stats['annual_return'], stats['max_drawdown']), (-1.0, -1.0, -1.0))
+
+    def test_rules_are_restricted(self):
+        for text in ("__import__('os').system('true')", 'close_price.real > 1', 'momentum > "1"', 'lambda: 1', 'x >'):
+            with self.subTest(rule=text), self.assertRaises(ValueError):
+                Rule(text)
+        rule = Rule('not (abs(momentum) < 2 * limit) or -daily_return >= 0.01')
+        self.assertEqual((rule.fields, rule.parameters), (['daily_return', 'momentum'], ['limit']))
+
+    def test_api(self):
+        url = '/stocks/api/backtest/?symbols=AAA,BBB&rule=momentum > threshold&cost_bps=5'
+        single = self.client.get(url + '&param=threshold=0&format=json').json()
+        self.assertEqual(len(single['curves']['equity']), 120)
+        self.assertEqual(single['parameters'], {'threshold': 0.0})
+
+        grid = self.client.get(url + '&param=threshold=0,1,2').json()
+        self.assertEqual([result['parameters']['threshold'] for result in grid['results']], [0.0, 1.0, 2.0])
+        self.assertEqual(grid['results'][0]['stats'], single['stats'])
+
+        for query in ('&param=threshold=0&param=other=1', '', '&param=threshold=x', '&param=threshold',
+                      '&param=threshold=0&rule=open(1)', '&param=threshold=0&cost_bps=nan',
+                      '&param=threshold=0&cost_bps=inf', '&param=threshold=0&cost_bps=-1',
+                      '&param=threshold=0&cost_bps=10001'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(url + query).status_code, 400)
+        self.assertEqual(
+            self.client.get('/stocks/api/backtest/?symbols=NOPE&rule=momentum > 0').status_code, 404)
+        self.assertEqual(self.client.get(
+            '/stocks/api/backtest/?symbols=AAA&rule=momentum %26 1 | close_price').status_code, 200)
+
+
+class ScreenerTests(TestCase):
+    def setUp(self):
+        sectors = ['Technology', 'Technology', 'Energy', 'Energy', None]
+        self.symbols = [f'S{i}' for i in range(len(sectors))]
+        for symbol, sector in zip(self.symbols, sectors):
+            Company.objects.create(symbol=symbol, name=symbol, sector=sector)
+        for i, frame in generate_universe(len(self.symbols), 60, seed=11):
+            StockDataCollector.bulk_save_stock_data(self.symbols[i], StockDataCollector.calculate_metrics(frame))
+
+    def test_snapshot_follows_ingestion(self):
+        summary = CompanySummary.objects.get(company_id='S0')
+        latest = StockData.objects.filter(company_id='S0').latest('date')
+        self.assertEqual((summary.momentum, summary.daily_return), (latest.momentum, latest.daily_return))
+        expected = (1 - latest.close_price / summary.trailing_high) * 100
+        self.assertAlmostEqual(float(summary.distance_from_high), float(expected), places=4)
+
+    def test_filters_and_ranks(self):
+        results = self.client.get('/stocks/api/screener/').json()['results']
+        momentum = [row['momentum'] for row in results]
+        self.assertEqual(len(results), 5)
+        self.assertEqual(momentum, sorted(momentum, reverse=True))
+
+        response = self.client.get('/stocks/api/screener/?sector=Energy,Technology&sort=volatility_score&limit=3')
+        results = response.json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertNotIn('S4', [row['symbol'] for row in results])
+        self.assertEqual([row['volatility_score'] for row in results],
+                         sorted(row['volatility_score'] for row in results))
+
+        threshold = sorted(momentum)[2]
+        results = self.client.get(f'/stocks/api/screener/?min_momentum={threshold}').json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(self.client.get('/stocks/api/screener/?max_current_price=1e300').json()['count'], 5)
+
+        for query in ('sort=name', 'limit=0', 'min_momentum=high', 'min_momentum=nan', 'max_current_price=inf',
+                      'min_distance_from_high=-Infinity'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/stocks/api/screener/?{query}').status_code, 400)
+
+
+class CorrelationTests(TestCase):
+    def setUp(self):
+        reset_moments()
+        self.symbols = [f'C{i}' for i in range(4)]
+        for symbol in self.symbols:
+            Company.objects.create(symbol=symbol, name=symbol)
+        self.frames = [frame for _, frame in generate_universe(len(self.symbols), 80, seed=13)]
+        for symbol, frame in zip(self.symbols, self.frames):
+            StockDataCollector.bulk_save_stock_data(symbol, StockDataCollector.calculate_metrics(frame.iloc[:70]))
+
+    def test_rank_one_updates_match_recomputation(self):
+        rng = np.random.default_rng(0)
+        returns = rng.normal(0, 0.02, (50, 6))
+        returns[rng.random(returns.shape) < 0.1] = np.nan
+        moments = RollingMoments.from_days(range(6), 20, range(30), returns[:30])
+        for day in range(30, 50):
+            moments.push(day, returns[day])
+        replaced = rng.normal(0, 0.02, 6)
+        moments.replace_latest(replaced)
+
+        window = pd.DataFrame(np.vstack([returns[30:49], replaced]))
+        np.testing.assert_allclose(moments.matrix('correlation'), window.corr().to_numpy(), atol=1e-9)
+        np.testing.assert_allclose(moments.matrix('covariance'), window.cov().to_numpy(), atol=1e-12)
+        np.testing.assert_allclose(moments.matrix(symbols=[4, 1]), window.corr().to_numpy()[np.ix_([4, 1], [4, 1])])
+
+    def test_new_days_are_applied_incrementally(self):
+        top_peers('C0', 20)
+        for symbol, frame in zip(self.symbols, self.frames):
+            StockDataCollector.bulk_save_stock_data(symbol, StockDataCollector.calculate_metrics(frame.iloc[70:]))
+
+        with mock.patch('stocks.services.correlation.build_moments', wraps=build_moments) as build:
+            dates, peers = top_peers('C0', 20)
+        build.assert_not_called()
+        self.assertEqual(dates[-1], self.frames[0].index[-1].date())
+        self.assertEqual(len(dates), 20)
+        expected = build_moments(self.symbols, 20).peers('C0')
+        self.assertEqual(len(peers), 3)
+        for peer, fresh in zip(peers, expected):
+            self.assertEqual((peer['symbol'], peer['days']), (fresh['symbol'], fresh['days']))
+            self.assertAlmostEqual(peer['correlation'], fresh['correlation'], places=4)
+
+    def test_rewritten_history_rebuilds_the_windows(self):
+        top_peers('C0', 20)
+        # Another process restates an older day: only the shared history version tells this one
+        restated = StockDataCollector.calculate_metrics(self.frames[1].iloc[:70]).iloc[55:60]
+        restated['Close'] = restated['Open'] * 1.05
+        with self.captureOnCommitCallbacks(execute=True):
+            StockDataCollector.bulk_save_stock_data('C1', restated)
+
+        with mock.patch('stocks.services.correlation.build_moments', wraps=build_moments) as build:
+            dates, peers = top_peers('C0', 20)
+        build.assert_called_once()
+        expected = build_moments(self.symbols, 20).peers('C0')
+        self.assertEqual([peer['correlation'] for peer in peers], [peer['correlation'] for peer in expected])
+
+    def test_endpoints(self):
+        response = self.client.get('/stocks/api/correlation/C1/?window=20&limit=2')
+        peers = response.json()['peers']
+        self.assertEqual(len(peers), 2)
+        self.assertGreaterEqual(peers[0]['correlation'], peers[1]['correlation'])
+
+        response = self.client.get('/stocks/api/correlation/?window=60&symbols=C2,C0,C3')
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        archive = np.load(io.BytesIO(response.content))
+        self.assertEqual(archive['symbols'].tolist(), ['C2', 'C0', 'C3'])
+        self.assertEqual(len(archive['dates']), 60)
+        matrix = archive['matrix']
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(matrix, matrix.T)
+        np.testing.assert_allclose(np.diag(matrix), 1, atol=1e-6)
+
+        self.assertEqual(self.client.get('/stocks/api/correlation/C1/?window=30').status_code, 400)
+        self.assertEqual(self.client.get('/stocks/api/correlation/?kind=beta').status_code, 400)
+        self.assertEqual(self.client.get('/stocks/api/correlation/NOPE/').status_code, 404)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.symbols = ['EX1', 'EX2', 'EX3']
+        for symbol in self.symbols:
+            Company.objects.create(symbol=symbol, name=symbol)
+        for i, frame in generate_universe(len(self.symbols), 40, seed=17):
+            StockDataCollector.bulk_save_stock_data(self.symbols[i], StockDataCollector.calculate_metrics(frame))
+
+    def test_csv_streams_in_chunks(self):
+        chunks = list(export_chunks('csv', ['EX3', 'EX1'], chunk_size=25))
+        self.assertEqual(len(chunks), 4)
+        frame = pd.read_csv(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(list(frame.columns), ['symbol'] + STOCK_DATA_COLUMNS)
+        self.assertEqual(frame['symbol'].tolist(), ['EX1'] * 40 + ['EX3'] * 40)
+        latest = StockData.objects.filter(company_id='EX3').latest('date')
+        self.assertEqual(frame.iloc[-1]['date'], latest.date.isoformat())
+        self.assertAlmostEqual(frame.iloc[-1]['close_price'], float(latest.close_price))
+
+        response = self.client.get('/stocks/api/export/?symbols=EX2&fields=close_price&start=' + frame.iloc[30]['date'])
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'symbol,date,close_price')
+        self.assertEqual(len(lines), 11)
+
+        for query in ('output=xml', 'fields=price', 'start=yesterday', 'end=2024-02-30'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/stocks/api/export/?{query}').status_code, 400)
+        self.assertEqual(self.client.get('/stocks/api/export/?symbols=NOPE').status_code, 404)
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet_and_arrow(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        expected = pd.read_csv(io.BytesIO(b''.join(export_chunks('csv'))), parse_dates=['date'])
+        for output in ('parquet', 'arrow'):
+            with self.subTest(output=output):
+                response = self.client.get(f'/stocks/api/export/?output={output}')
+                buffer = pa.BufferReader(b''.join(response.streaming_content))
+                table = pq.read_table(buffer) if output == 'parquet' else pa.ipc.open_stream(buffer).read_all()
+                frame = table.to_pandas()
+                frame['date'] = pd.to_datetime(frame['date'])
+                self.assertEqual(table.schema.field('volume').type, pa.int64())
+                pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, 'export.csv')
+            call_command('export_stock_data', path, 'EX1', '--fields', 'volume', stderr=io.StringIO())
+            frame = pd.read_csv(path)
+        self.assertEqual(list(frame.columns), ['symbol', 'date', 'volume'])
+        self.assertEqual(len(frame), 40)
+        with self.assertRaises(CommandError):
+            call_command('export_stock_data', '-', '--start', '2024-02-30')
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.symbols = ['IM1', 'IM2']
+        for symbol in self.symbols:
+            Company.objects.create(symbol=symbol, name=symbol)
+        for i, frame in generate_universe(len(self.symbols), 300, seed=19):
+            StockDataCollector.bulk_save_stock_data(self.symbols[i], StockDataCollector.calculate_metrics(frame))
+        self.expected = list(StockData.objects.order_by('company_id', 'date').values())
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'history.csv')
+        with open(self.path, 'wb') as f:
+            for chunk in export_chunks('csv', fields=['date', 'open_price', 'high_price', 'low_price',
+                                                      'close_price', 'volume']):
+                f.write(chunk)
+            f.write(b'IM1,not-a-date,1,2,1,1,10\n'
+                    b'IM1,2030-01-01,1,0.5,1,1,10\n'
+                    b'IM2,2030-01-02,-1,1,1,1,10\n'
+                    b'NEW,2030-01-01,1,1,1,1,10\n')
+        StockData.objects.all().delete()
+
+    def assertRestored(self):
+        restored = list(StockData.objects.order_by('company_id', 'date').values())
+        self.assertEqual(len(restored), len(self.expected))
+        metrics = [field for field, _ in StockDataCollector.METRIC_COLUMNS.values()]
+        for row, expected in zip(restored[::37], self.expected[::37]):
+            for field in metrics:
+                # Recomputed from the stored (rounded) prices
+                if expected[field] is None:
+                    self.assertIsNone(row[field])
+                else:
+                    self.assertAlmostEqual(float(row[field]), float(expected[field]), delta=0.05)
+            self.assertEqual({key: row[key] for key in row if key not in metrics + ['id']},
+                             {key: expected[key] for key in expected if key not in metrics + ['id']})
+
+    def test_chunked_import_restores_history_and_metrics(self):
+        report = import_file(self.path, chunk_size=100)
+        self.assertEqual(report['chunks'], 7)
+        self.assertEqual((report['rows'], report['valid'], report['created']), (604, 600, 600))
+        self.assertEqual(report['rejected'], {
+            'invalid_date': 1, 'inconsistent_range': 1, 'invalid_price': 1, 'unknown_symbol': 1,
+        })
+        # Metrics of rows after a chunk boundary are seeded from the rows already stored
+        self.assertRestored()
+        self.assertFalse(os.path.exists(self.path + '.checkpoint.json'))
+
+    def test_out_of_order_import_recomputes_later_rows(self):
+        with open(self.path) as f:
+            header, *lines = f.readlines()
+        with open(self.path, 'w') as f:
+            f.writelines([header] + lines[::-1])
+
+        report = import_file(self.path, chunk_size=200)
+        self.assertEqual(report['created'], 600)
+        # Every chunk after the first lands before rows already stored
+        self.assertGreater(report['recomputed'], 0)
+        self.assertRestored()
+        latest = StockData.objects.filter(company_id='IM2').latest('date')
+        self.assertEqual(latest.week_52_high, self.expected[-1]['week_52_high'])
+
+    def test_resume_after_failure(self):
+        save = StockDataCollector.bulk_save_stock_data
+        calls = []
+
+        def failing_save(symbol, rows):
+            calls.append(symbol)
+            if len(calls) == 4:
+                raise OperationalError('disk I/O error')
+            return save(symbol, rows)
+
+        with mock.patch.object(StockDataCollector, 'bulk_save_stock_data', side_effect=failing_save):
+            with self.assertRaises(OperationalError):
+                import_file(self.path, chunk_size=250)
+        # The failed third chunk rolled back as a whole; the first two are committed and checkpointed
+        self.assertEqual(StockData.objects.count(), 500)
+        with self.assertRaises(ValueError):
+            import_file(self.path, chunk_size=250)
+        with self.assertRaises(ValueError):
+            import_file(self.path, chunk_size=100, resume=True)
+
+        report = import_file(self.path, chunk_size=250, resume=True)
+        self.assertEqual((report['skipped_chunks'], report['chunks'], report['created']), (2, 1, 100))
+        self.assertRestored()
+
+    def test_dry_run_and_new_companies(self):
+        report = import_file(self.path, dry_run=True, create_companies=True, metrics='none')
+        self.assertEqual((report['valid'], report['created'], report['symbols']), (601, 0, 3))
+        self.assertEqual(StockData.objects.count(), 0)
+        self.assertFalse(Company.objects.filter(symbol='NEW').exists())
+
+        stdout = io.StringIO()
+        call_command('import_stock_data', self.path, '--create-companies', '--metrics', 'database', stdout=stdout)
+        self.assertIn('601 valid', stdout.getvalue())
+        self.assertEqual(Company.objects.get(symbol='NEW').name, 'NEW')
+        latest = StockData.objects.filter(company_id='IM2').latest('date')
+        self.assertAlmostEqual(float(latest.moving_avg_7), float(self.expected[-1]['moving_avg_7']), delta=0.011)
+
+    @skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_parquet(self):
+        import_file(self.path, metrics='none')
+        path = os.path.join(self.directory.name, 'history.parquet')
+        with open(path, 'wb') as f:
+            for chunk in export_chunks('parquet'):
+                f.write(chunk)
+        StockData.objects.all().delete()
+
+        report = import_file(path, chunk_size=200)
+        self.assertEqual((report['chunks'], report['valid'], report['rejected']), (3, 600, {}))
+        self.assertRestored()
@@ -1,5 +1,6 @@
 from django.urls import path
 from . import api_views
+from . import async_views
 from . import views
 
 urlpatterns = [
@@ -9,5 +10,19 @@ urlpatterns = [
     path('api/data/<str:symbol>/', api_views.stock_data, name='api_stock_data'),
     path('api/summary/<str:symbol>/', api_views.stock_summary, name='api_stock_summary'),
     path('api/compare/', api_views.compare_stocks, name='api_compare'),
+    path('api/dashboard/', api_views.dashboard, name='api_dashboard'),
+    path('api/dashboard/<str:symbol>/', api_views.dashboard, name='api_dashboard_symbol'),
+    path('api/insights/', api_views.stock_insights_batch, name='api_insights_batch'),
     path('api/insights/<str:symbol>/', api_views.stock_insights, name='api_insights'),
+    path('api/screener/', api_views.screener, name='api_screener'),
+    path('api/correlation/', api_views.correlation_matrix, name='api_correlation_matrix'),
+    path('api/correlation/<str:symbol>/', api_views.correlated_peers, name='api_correlated_peers'),
+    path('api/export/', api_views.export_stock_data, name='api_export'),
+    path('api/backtest/', api_views.backtest, name='api_backtest'),
+    # Async (ASGI) versions of the read endpoints
+    path('api/async/companies/', async_views.companies_list, name='api_async_companies'),
+    path('api/async/data/<str:symbol>/', async_views.stock_data, name='api_async_stock_data'),
+    path('api/async/summary/<str:symbol>/', async_views.stock_summary, name='api_async_stock_summary'),
+    path('api/async/compare/', async_views.compare_stocks, name='api_async_compare'),
+    path('api/async/insights/<str:symbol>/', async_views.stock_insights, name='api_async_insights'),
 ]
\ No newline at end of file
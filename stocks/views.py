@@ -1,6 +1,8 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from .models import Company, StockData
+from .services.metrics import REGISTRY
 
 
 def dashboard(request):
@@ -34,4 +36,11 @@ def get_stock_data(request, symbol):
 
         return JsonResponse({'data': data})
     except Company.DoesNotExist:
-        return JsonResponse({'error': 'Company not found'}, status=404)
\ No newline at end of file
+        return JsonResponse({'error': 'Company not found'}, status=404)
+
+
+def metrics(request):
+    """Prometheus scrape endpoint for the request metrics middleware"""
+    if not getattr(settings, 'STOCKS_METRICS_ENABLED', True):
+        raise Http404('Metrics are disabled')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')